@@ -0,0 +1,96 @@
+import os
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# sqlite3 calls block; run them on worker threads so the event loop keeps serving
+# callbacks while SQLite works or waits for a lock. Bulk work (ingest, cleanup)
+# gets its own single thread so it never occupies the interactive workers.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+
+_executors = {}
+
+
+def _get_executor(lane):
+    executor = _executors.get(lane)
+    if executor is None:
+        workers = DB_EXECUTOR_WORKERS if lane == "interactive" else 1
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"db-{lane}")
+        _executors[lane] = executor
+    return executor
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking DB function on the interactive executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor("interactive"), functools.partial(func, *args, **kwargs))
+
+
+async def run_db_bulk(func, *args, **kwargs):
+    """Run a blocking DB function on the single bulk (ingest/maintenance) thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor("bulk"), functools.partial(func, *args, **kwargs))
+
+
+def _interactive(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
+
+
+def _bulk(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db_bulk(func, *args, **kwargs)
+    return wrapper
+
+
+def shutdown():
+    """Shutdown hook: wait for queued queries and stop the worker threads."""
+    for executor in _executors.values():
+        executor.shutdown(wait=True)
+    _executors.clear()
+
+
+# Same names and signatures as app.db, awaitable
+is_source_active = _interactive(db.is_source_active)
+toggle_source = _interactive(db.toggle_source)
+get_source_statuses = _interactive(db.get_source_statuses)
+get_source_weight = _interactive(db.get_source_weight)
+mark_as_sent = _interactive(db.mark_as_sent)
+get_unsent_news = _interactive(db.get_unsent_news)
+get_unsent_count = _interactive(db.get_unsent_count)
+claim_news = _interactive(db.claim_news)
+claim_unsent_breaking_news = _interactive(db.claim_unsent_breaking_news)
+claim_unsent_digest_news = _interactive(db.claim_unsent_digest_news)
+release_news = _interactive(db.release_news)
+get_outbound_message = _interactive(db.get_outbound_message)
+save_outbound_message = _interactive(db.save_outbound_message)
+add_reaction = _interactive(db.add_reaction)
+get_news_reactions = _interactive(db.get_news_reactions)
+get_reaction_counts = _interactive(db.get_reaction_counts)
+get_news_by_message_id = _interactive(db.get_news_by_message_id)
+get_news_stats = _interactive(db.get_news_stats)
+get_source_reaction_stats = _interactive(db.get_source_reaction_stats)
+get_top_news = _interactive(db.get_top_news)
+get_language_stats = _interactive(db.get_language_stats)
+get_source_info = _interactive(db.get_source_info)
+get_feed_cache_stats = _interactive(db.get_feed_cache_stats)
+get_llm_cache = _interactive(db.get_llm_cache)
+put_llm_cache = _interactive(db.put_llm_cache)
+
+is_duplicate_url = _bulk(db.is_duplicate_url)
+get_existing_url_keys = _bulk(db.get_existing_url_keys)
+add_news_items = _bulk(db.add_news_items)
+cleanup_old_news = _bulk(db.cleanup_old_news)
+rebuild_daily_stats = _bulk(db.rebuild_daily_stats)
+evict_llm_cache = _bulk(db.evict_llm_cache)
+get_feed_validator = _bulk(db.get_feed_validator)
+save_feed_validator = _bulk(db.save_feed_validator)
+record_feed_cache_result = _bulk(db.record_feed_cache_result)
@@ -5,13 +5,17 @@ from datetime import datetime, timedelta
 from aiogram import Bot, Dispatcher, Router
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.enums import ParseMode
 from dotenv import load_dotenv
 
-from app.db import get_connection, init_db, add_reaction, get_news_reactions
-from app.db import get_source_reaction_stats, get_news_by_message_id
+from app.db import init_db
+from app import async_db
 from app.common import TOKEN, CHANNEL_ID, logger, set_bot
+from app.llm_cache import llm_cache
+from app.ranker import source_weights
+from app.telegram_sender import telegram_sender
+from app.keyboard_updater import keyboard_updater
+from app.retention import retention
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
@@ -39,46 +43,16 @@ dp.include_router(admin_router)
 # Admin commands
 @admin_router.message(Command("stats"))
 async def cmd_stats(message: Message):
-    yesterday = datetime.now() - timedelta(days=1)
-    yesterday_str = yesterday.strftime("%Y-%m-%d %H:%M:%S")
-
-    last_week = datetime.now() - timedelta(days=7)
-    last_week_str = last_week.strftime("%Y-%m-%d %H:%M:%S")
-
-    with get_connection() as conn:
-        cursor = conn.execute(
-            "SELECT COUNT(*) FROM news_items WHERE processed_at >= ?",
-            (yesterday_str,)
-        )
-        daily_count = cursor.fetchone()[0]
-
-        cursor = conn.execute(
-            "SELECT COUNT(*) FROM news_items WHERE processed_at >= ?",
-            (last_week_str,)
-        )
-        weekly_count = cursor.fetchone()[0]
-
-        cursor = conn.execute(
-            "SELECT COUNT(*) FROM news_items WHERE impact >= 4 AND processed_at >= ?",
-            (last_week_str,)
-        )
-        breaking_count = cursor.fetchone()[0]
-
-        cursor = conn.execute(
-            """
-            SELECT source_id, COUNT(*) 
-            FROM news_items 
-            WHERE processed_at >= ? 
-            GROUP BY source_id
-            """,
-            (last_week_str,)
-        )
-        sources_stats = cursor.fetchall()
+    stats = await async_db.get_news_stats(7)
+    daily_count = stats["daily"]
+    weekly_count = stats["weekly"]
+    breaking_count = stats["breaking"]
+    sources_stats = stats["sources"]
 
     # Format stats message
     stats_message = (
         f"📊 *News Stats*\n\n"
-        f"Last 24 hours: {daily_count} news items\n"
+        f"Today (UTC): {daily_count} news items\n"
         f"Last 7 days: {weekly_count} news items\n"
         f"Breaking news (last 7 days): {breaking_count} items\n\n"
         f"*By source (last 7 days):*\n"
@@ -99,17 +73,11 @@ async def cmd_toggle_source(message: Message):
 
     source_id = parts[1]
 
-    with get_connection() as conn:
-        cursor = conn.execute("SELECT active FROM sources WHERE id = ?", (source_id,))
-        source = cursor.fetchone()
-
-        if not source:
-            await message.answer(f"Source {source_id} not found")
-            return
-
-        new_status = 1 - source[0]
-        conn.execute("UPDATE sources SET active = ? WHERE id = ?", (new_status, source_id))
-        conn.commit()
+    new_status = await async_db.toggle_source(source_id)
+    if new_status is None:
+        await message.answer(f"Source {source_id} not found")
+        return
+    await async_db.run_db(source_weights.refresh)
 
     config = scheduler.load_config()
     if source_id in config:
@@ -161,14 +129,36 @@ async def cmd_breaking(message: Message):
 
 
 
+@admin_router.message(Command("rebuild_stats"))
+async def cmd_rebuild_stats(message: Message):
+    rows = await async_db.rebuild_daily_stats()
+    await message.answer(f"Daily stats rebuilt from stored news: {rows} source-day rows")
+
+
+@admin_router.message(Command("cleanup"))
+async def cmd_cleanup(message: Message):
+    report = await retention.run()
+    if report is None:
+        await message.answer("Cleanup is already running")
+        return
+    await message.answer(
+        f"Removed {report['news']} news with {report['reactions']} reactions, "
+        f"{report['orphan_reactions']} orphaned reactions, {report['seen_entries']} seen entries, "
+        f"{report['title_index']} indexed titles, {report['outbound_messages']} send keys. "
+        f"Reclaimed {report['bytes_reclaimed'] / 1024:.0f} KB"
+        + (" (one-time full VACUUM to enable incremental auto-vacuum)" if report['full_vacuum'] else "")
+    )
+
+
 # Health check command
 @admin_router.message(Command("healthz"))
 async def cmd_healthz(message: Message):
-    with get_connection() as conn:
-        cursor = conn.execute("SELECT COUNT(*) FROM news_items WHERE sent = 0")
-        queue_count = cursor.fetchone()[0]
+    queue_count = await async_db.get_unsent_count()
 
-    await message.answer(f"OK. Queue size: {queue_count}")
+    await message.answer(
+        f"OK. Queue size: {queue_count}\nLLM cache: {llm_cache.stats_line()}\n"
+        f"Telegram: {telegram_sender.stats_line()}"
+    )
 
 
 # Команда для статистики по источникам
@@ -180,7 +170,7 @@ async def cmd_source_reactions_stats(message: Message):
     if len(parts) > 1 and parts[1].isdigit():
         period_days = int(parts[1])
 
-    stats = get_source_reaction_stats(period_days)
+    stats = await async_db.get_source_reaction_stats(period_days)
 
     if not stats:
         await message.answer(f"Нет данных о реакциях по источникам за последние {period_days} дней")
@@ -222,27 +212,7 @@ async def cmd_top_news(message: Message):
     period_date = datetime.now() - timedelta(days=period_days)
     period_str = period_date.strftime("%Y-%m-%d %H:%M:%S")
 
-    with get_connection() as conn:
-        cursor = conn.execute(
-            """
-            SELECT 
-                n.id, 
-                n.title, 
-                n.source_id,
-                n.url,
-                (SELECT COUNT(*) FROM news_reactions WHERE news_id = n.id AND reaction_type = 'like') as likes,
-                (SELECT COUNT(*) FROM news_reactions WHERE news_id = n.id AND reaction_type = 'dislike') as dislikes
-            FROM 
-                news_items n
-            WHERE
-                n.processed_at >= ?
-            ORDER BY
-                likes DESC, dislikes ASC
-            LIMIT ?
-            """,
-            (period_str, limit)
-        )
-        top_news = cursor.fetchall()
+    top_news = await async_db.get_top_news(period_str, limit)
 
     if not top_news:
         await message.answer(f"Нет данных о популярных новостях за последние {period_days} дней")
@@ -272,76 +242,22 @@ async def cmd_language_stats(message: Message):
     if len(parts) > 1 and parts[1].isdigit():
         period_days = int(parts[1])
 
-    period_date = datetime.now() - timedelta(days=period_days)
-    period_str = period_date.strftime("%Y-%m-%d %H:%M:%S")
-
-    with get_connection() as conn:
-        # Получаем общее количество новостей
-        cursor = conn.execute(
-            "SELECT COUNT(*) FROM news_items WHERE processed_at >= ?",
-            (period_str,)
-        )
-        total_count = cursor.fetchone()[0]
-
-        # Проверяем, есть ли у нас поля для отслеживания языка
-        cursor = conn.execute("PRAGMA table_info(news_items)")
-        columns = [col[1] for col in cursor.fetchall()]
-
-        if "summary_lang" not in columns:
-            # Если нет поля для языка, добавляем его
-            try:
-                logger.info("Adding summary_lang column to news_items table")
-                conn.execute("ALTER TABLE news_items ADD COLUMN summary_lang TEXT")
-                conn.commit()
-
-                # Базовая статистика после добавления
-                stats_message = (
-                    f"📊 *Статистика языка новостей за {period_days} дней*\n\n"
-                    f"Всего новостей: {total_count}\n\n"
-                    f"Поле 'summary_lang' успешно добавлено в таблицу news_items.\n"
-                    f"Статистика языка будет доступна после обработки новых новостей."
-                )
-            except Exception as e:
-                stats_message = (
-                    f"📊 *Статистика языка новостей*\n\n"
-                    f"Ошибка при добавлении поля 'summary_lang': {e}\n"
-                    f"Обратитесь к администратору системы."
-                )
-        else:
-            # Если поле есть, получаем статистику
-            cursor = conn.execute(
-                """
-                SELECT 
-                    summary_lang, 
-                    COUNT(*) as count 
-                FROM 
-                    news_items 
-                WHERE 
-                    processed_at >= ? 
-                    AND summary_lang IS NOT NULL
-                GROUP BY 
-                    summary_lang
-                ORDER BY 
-                    count DESC
-                """,
-                (period_str,)
-            )
-            lang_stats = cursor.fetchall()
+    total_count, lang_stats = await async_db.get_language_stats(period_days)
 
-            stats_message = f"📊 *Статистика языка новостей за {period_days} дней*\n\n"
-            stats_message += f"Всего новостей: {total_count}\n\n"
+    stats_message = f"📊 *Статистика языка новостей за {period_days} дней*\n\n"
+    stats_message += f"Всего новостей: {total_count}\n\n"
 
-            total_with_lang = sum(count for _, count in lang_stats)
+    total_with_lang = sum(count for _, count in lang_stats)
 
-            for lang, count in lang_stats:
-                percent = round((count / total_count) * 100, 1) if total_count > 0 else 0
-                lang_name = "Русский" if lang == "ru" else "Английский" if lang == "en" else lang
-                stats_message += f"• {lang_name}: {count} ({percent}%)\n"
+    for lang, count in lang_stats:
+        percent = round((count / total_count) * 100, 1) if total_count > 0 else 0
+        lang_name = "Русский" if lang == "ru" else "Английский" if lang == "en" else lang
+        stats_message += f"• {lang_name}: {count} ({percent}%)\n"
 
-            if total_with_lang < total_count:
-                unknown = total_count - total_with_lang
-                unknown_percent = round((unknown / total_count) * 100, 1)
-                stats_message += f"• Нет данных о языке: {unknown} ({unknown_percent}%)\n"
+    if total_with_lang < total_count:
+        unknown = total_count - total_with_lang
+        unknown_percent = round((unknown / total_count) * 100, 1)
+        stats_message += f"• Нет данных о языке: {unknown} ({unknown_percent}%)\n"
 
     await message.answer(stats_message, parse_mode=ParseMode.MARKDOWN)
 
@@ -354,11 +270,7 @@ async def cmd_list_sources(message: Message):
     config = scheduler.load_config()
 
     # Получаем статус каждого источника (включен/отключен)
-    with get_connection() as conn:
-        source_status = {}
-        cursor = conn.execute("SELECT id, active FROM sources")
-        for source_id, active in cursor.fetchall():
-            source_status[source_id] = bool(active)
+    source_status = await async_db.get_source_statuses()
 
     # Формируем сообщение со списком источников
     sources_message = "📋 *Список источников новостей*\n\n"
@@ -373,10 +285,14 @@ async def cmd_list_sources(message: Message):
         source_type = source_config.get('type', 'unknown')
         lang = source_config.get('lang', 'en')
         interval = source_config.get('interval', 15)
+        effective = scheduler.poll_intervals.effective(source_id)
 
         status = "✅" if source_status.get(source_id, True) else "❌"
 
-        source_info = f"{status} `{source_id}` - {source_type} (обновление: {interval} мин)"
+        if effective is None or round(effective) == interval:
+            source_info = f"{status} `{source_id}` - {source_type} (обновление: {interval} мин)"
+        else:
+            source_info = f"{status} `{source_id}` - {source_type} (обновление: {effective:.0f} мин, в конфиге {interval})"
 
         if lang == "ru":
             ru_sources.append(source_info)
@@ -429,46 +345,21 @@ async def cmd_source_info(message: Message):
     interval = source_config.get('interval', 0)
     url = source_config.get('url', '')
 
-    with get_connection() as conn:
-        cursor = conn.execute("SELECT active FROM sources WHERE id = ?", (source_id,))
-        source = cursor.fetchone()
-        active = bool(source[0]) if source else False
+    info = await async_db.get_source_info(source_id)
+    active = info["active"]
+    total_news = info["total_news"]
+    recent_news = info["recent_news"]
+    likes = info["likes"]
+    dislikes = info["dislikes"]
 
-        cursor = conn.execute(
-            "SELECT COUNT(*) FROM news_items WHERE source_id = ?",
-            (source_id,)
-        )
-        total_news = cursor.fetchone()[0]
-
-        # Последние новости
-        cursor = conn.execute(
-            """
-            SELECT title, impact, processed_at 
-            FROM news_items 
-            WHERE source_id = ? 
-            ORDER BY processed_at DESC 
-            LIMIT 5
-            """,
-            (source_id,)
-        )
-        recent_news = cursor.fetchall()
-
-        # Статистика реакций
-        cursor = conn.execute(
-            """
-            SELECT 
-                COUNT(DISTINCT CASE WHEN r.reaction_type = 'like' THEN r.id END) as likes,
-                COUNT(DISTINCT CASE WHEN r.reaction_type = 'dislike' THEN r.id END) as dislikes
-            FROM 
-                news_items n
-            LEFT JOIN
-                news_reactions r ON n.id = r.news_id
-            WHERE
-                n.source_id = ?
-            """,
-            (source_id,)
-        )
-        likes, dislikes = cursor.fetchone()
+    feed_cache = await async_db.get_feed_cache_stats(source_id)
+    cache_hits = feed_cache[0]['hits'] if feed_cache else 0
+    cache_misses = feed_cache[0]['misses'] if feed_cache else 0
+
+    if info["learned_weight"] is not None:
+        weight_line = f"{info['learned_weight']:g} по реакциям (в конфиге {info['weight']})"
+    else:
+        weight_line = f"{info['weight']}"
 
     # Формируем сообщение
     status = "✅ Активен" if active else "❌ Отключен"
@@ -480,7 +371,9 @@ async def cmd_source_info(message: Message):
         f"• Язык: {lang}\n"
         f"• Интервал обновления: {interval} минут\n"
         f"• Всего новостей: {total_news}\n"
-        f"• Реакции: 👍 {likes} / 👎 {dislikes}\n\n"
+        f"• Реакции: 👍 {likes} / 👎 {dislikes}\n"
+        f"• Вес: {weight_line}\n"
+        f"• Кэш фида: {cache_hits} без изменений / {cache_misses} обновлений\n\n"
     )
 
     if url:
@@ -518,6 +411,8 @@ async def cmd_help(message: Message):
 - `/reactions [дней]` - Статистика популярности новостей по реакциям
 - `/source_info [source_id]` - Детальная информация по источнику
 - `/db_status` - Показать статус базы данных
+- `/rebuild_stats` - Пересчитать дневную статистику по сохранённым новостям
+- `/cleanup` - Удалить устаревшие новости и сжать базу данных
 
 *Как пользоваться ботом:*
 1. AI News Bot автоматически собирает и публикует новости об искусственном интеллекте и технологиях
@@ -563,7 +458,7 @@ async def process_callback(callback_query: CallbackQuery):
         except ValueError:
             # Если news_id не число, пробуем найти его по message_id
             logger.warning(f"Invalid news_id format: {news_id_str}, trying to find by message_id")
-            news_id = get_news_by_message_id(callback_query.message.message_id)
+            news_id = await async_db.get_news_by_message_id(callback_query.message.message_id)
             if not news_id:
                 logger.error(f"Could not find news_id for message_id {callback_query.message.message_id}")
                 await callback_query.answer("Не удалось найти новость")
@@ -580,47 +475,19 @@ async def process_callback(callback_query: CallbackQuery):
         username = callback_query.from_user.username or callback_query.from_user.first_name
 
         # Добавляем реакцию в базу данных
-        success = add_reaction(news_id, callback_query.message.message_id, reaction_type, user_id, username)
-        if not success:
+        counts = await async_db.add_reaction(news_id, callback_query.message.message_id, reaction_type, user_id, username)
+        if counts is None:
             logger.warning(f"Failed to add reaction for user {user_id} on news {news_id}")
             await callback_query.answer("Не удалось сохранить вашу реакцию")
             return
 
-        reactions = get_news_reactions(news_id)
-        likes = 0
-        dislikes = 0
-        for r_type, count in reactions:
-            if r_type == 'like':
-                likes = count
-            elif r_type == 'dislike':
-                dislikes = count
-
-        buttons = [
-            [
-                InlineKeyboardButton(text=f"👍 {likes}", callback_data=f"reaction:{news_id}:like"),
-                InlineKeyboardButton(text=f"👎 {dislikes}", callback_data=f"reaction:{news_id}:dislike")
-            ]
-        ]
-        keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
-
-        try:
-            await bot.edit_message_reply_markup(
-                chat_id=callback_query.message.chat.id,
-                message_id=callback_query.message.message_id,
-                reply_markup=keyboard
-            )
+        # Отвечаем сразу, а кнопки обновятся с задержкой: правки одного сообщения объединяются
+        if reaction_type == 'like':
+            await callback_query.answer("Спасибо за ваш лайк! 👍")
+        else:
+            await callback_query.answer("Спасибо за ваш фидбек! 👎")
 
-            if reaction_type == 'like':
-                await callback_query.answer("Спасибо за ваш лайк! 👍")
-            else:
-                await callback_query.answer("Спасибо за ваш фидбек! 👎")
-
-        except Exception as e:
-            if "Too Many Requests" in str(e) or "Flood control" in str(e):
-                await callback_query.answer("Слишком много действий! Попробуйте через несколько секунд.")
-            else:
-                logger.error(f"Ошибка при обновлении кнопок: {e}")
-                await callback_query.answer("Произошла ошибка при обработке реакции")
+        keyboard_updater.schedule(bot, callback_query.message.chat.id, callback_query.message.message_id, news_id)
     except Exception as e:
         logger.error(f"Unexpected error in callback processing: {e}")
         try:
@@ -636,7 +503,11 @@ async def start_services():
     await scheduler.init_scheduler()
 
     logger.info("Starting bot")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await keyboard_updater.close()
+        await scheduler.shutdown()
 
 
 if __name__ == "__main__":
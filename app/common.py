@@ -2,6 +2,7 @@ import logging
 import os
 import html
 import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
 import sentry_sdk
@@ -48,22 +49,42 @@ def set_bot(bot):
 def get_bot():
     return bot_instance
 
+# Service labels and leftover anchor markup removed after tag stripping, in one pass
+_LABELS_RE = re.compile(r'url статьи:|URL:|<a href\s*=\s*["\'][^"\']*["\'].*?>|</a>')
+_SPACES_RE = re.compile(r'\s+')
+
+
 def clean_html(text):
     """Полная очистка текста от HTML-тегов, сущностей и служебных меток"""
     if not text:
         return ""
 
-    soup = BeautifulSoup(text, "html.parser")
-    clean_text = soup.get_text(separator=" ", strip=True)
+    # Plain text has nothing for the HTML parser or unescape to do
+    if "<" in text or "&" in text:
+        soup = BeautifulSoup(text, "html.parser")
+        text = html.unescape(soup.get_text(separator=" ", strip=True))
 
-    clean_text = html.unescape(clean_text)
+    text = _LABELS_RE.sub('', text)
+    return _SPACES_RE.sub(' ', text).strip()
 
-    clean_text = re.sub(r'url статьи:', '', clean_text)
-    clean_text = re.sub(r'URL:', '', clean_text)
-    clean_text = re.sub(r'Комментарии URL:', '', clean_text)
-    clean_text = re.sub(r'<a href\s*=\s*["\'][^"\']*["\'].*?>', '', clean_text)
-    clean_text = re.sub(r'</a>', '', clean_text)
 
-    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+TRACKING_PARAMS = {"ref", "fbclid", "gclid", "yclid"}
 
-    return clean_text
+def normalize_url(url):
+    """Canonical form of a URL for deduplication: lowercase host, no fragment, no tracking params"""
+    if not url:
+        return ""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    if not parts.scheme or not parts.netloc:
+        return url
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
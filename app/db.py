@@ -1,10 +1,15 @@
 from dotenv import load_dotenv
 import sqlite3
 import os
+import time
+import queue
+import threading
 from datetime import datetime, timedelta
 import logging
 from contextlib import contextmanager
 
+from app.common import normalize_url
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -15,17 +20,32 @@ load_dotenv(dotenv_path=env_path)
 
 DB_PATH = os.getenv("DB_URL", "app/database/news.db")
 
+# news_items.sent: queued -> claimed by a sender -> sent
+SENT_PENDING = 0
+SENT_DONE = 1
+SENT_CLAIMED = 2
+BREAKING_IMPACT = 4
+
+# Ranking: the stored score is static; freshness decays to zero over this window and is added at selection time
+FRESHNESS_WINDOW_HOURS = float(os.getenv("FRESHNESS_WINDOW_HOURS", "48"))
+RANK_SQL = (
+    f"(score + MAX(0.0, {FRESHNESS_WINDOW_HOURS} - "
+    f"(julianday('now') - COALESCE(julianday(published), julianday(processed_at))) * 24))"
+)
+
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS sources (
     id TEXT PRIMARY KEY,
     name TEXT,
     weight INTEGER DEFAULT 1,
-    active BOOLEAN DEFAULT 1
+    active BOOLEAN DEFAULT 1,
+    learned_weight REAL
 );
 
 CREATE TABLE IF NOT EXISTS news_items (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     url TEXT UNIQUE,
+    url_key TEXT,
     title TEXT,
     source_id TEXT REFERENCES sources(id),
     published TIMESTAMP,
@@ -35,7 +55,9 @@ CREATE TABLE IF NOT EXISTS news_items (
     summary_lang TEXT,
     message_id INTEGER NULL,
     processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    sent BOOLEAN DEFAULT 0
+    sent BOOLEAN DEFAULT 0,
+    likes INTEGER DEFAULT 0,
+    dislikes INTEGER DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS news_reactions (
@@ -49,23 +71,159 @@ CREATE TABLE IF NOT EXISTS news_reactions (
     UNIQUE(news_id, user_id)
 );
 
+CREATE TABLE IF NOT EXISTS feed_validators (
+    source_id TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    hits INTEGER DEFAULT 0,
+    misses INTEGER DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS seen_entries (
+    source_id TEXT,
+    entry_key TEXT,
+    seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source_id, entry_key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS llm_cache (
+    cache_key TEXT PRIMARY KEY,
+    response TEXT,
+    created_at REAL,
+    last_access REAL
+);
+
+CREATE TABLE IF NOT EXISTS title_index (
+    title TEXT,
+    source_id TEXT,
+    created_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    idempotency_key TEXT PRIMARY KEY,
+    chat_id TEXT,
+    message_id INTEGER,
+    sent_at REAL
+);
+
+-- Daily rollups maintained on insert and reaction, read by the admin commands
+CREATE TABLE IF NOT EXISTS source_daily_stats (
+    day TEXT,
+    source_id TEXT,
+    news_count INTEGER DEFAULT 0,
+    breaking_count INTEGER DEFAULT 0,
+    impact_sum INTEGER DEFAULT 0,
+    likes INTEGER DEFAULT 0,
+    dislikes INTEGER DEFAULT 0,
+    PRIMARY KEY (day, source_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS language_daily_stats (
+    day TEXT,
+    lang TEXT,
+    news_count INTEGER DEFAULT 0,
+    PRIMARY KEY (day, lang)
+) WITHOUT ROWID;
+
 -- Optimization: Add indexes for faster lookups
 CREATE INDEX IF NOT EXISTS idx_news_url ON news_items(url);
 CREATE INDEX IF NOT EXISTS idx_news_sent ON news_items(sent);
 CREATE INDEX IF NOT EXISTS idx_news_processed_at ON news_items(processed_at);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access);
+CREATE INDEX IF NOT EXISTS idx_title_index_created ON title_index(created_at);
+CREATE INDEX IF NOT EXISTS idx_seen_entries_seen_at ON seen_entries(seen_at);
+CREATE INDEX IF NOT EXISTS idx_outbound_sent_at ON outbound_messages(sent_at);
 """
 
+AUTO_VACUUM_INCREMENTAL = 2
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+
+# Applied once per connection when it is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+    "PRAGMA temp_store=MEMORY",
+)
+
+class ConnectionPool:
+    """
+    Small pool of long-lived SQLite connections, usable from any thread.
+    Up to `size` idle connections are kept open; if all are busy an extra one
+    is opened and closed on release, so a borrower never blocks on the pool.
+    """
+
+    def __init__(self, path, size=DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=20, check_same_thread=False) # Increase timeout for concurrent access
+        conn.row_factory = sqlite3.Row # Return rows as dict-like objects
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        if self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None or _pool.path != DB_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.path != DB_PATH:
+                if _pool is not None:
+                    _pool.close()
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+def close_connections():
+    """Shutdown hook: close every pooled connection."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
 @contextmanager
 def get_connection():
-    """Context manager for DB connections with optimized settings."""
-    conn = sqlite3.connect(DB_PATH, timeout=20) # Increase timeout for concurrent access
-    conn.row_factory = sqlite3.Row # Return rows as dict-like objects
+    """Context manager borrowing a pooled connection; uncommitted work is rolled back on return."""
+    pool = get_pool()
+    conn = pool.acquire()
     try:
-        # Enable WAL mode for better concurrency
-        conn.execute("PRAGMA journal_mode=WAL")
         yield conn
     finally:
-        conn.close()
+        pool.release(conn)
 
 def init_db():
     """Initialize database and ensure all columns exist."""
@@ -74,6 +232,14 @@ def init_db():
         os.makedirs(db_dir, exist_ok=True)
         
     with get_connection() as conn:
+        # Incremental auto-vacuum lets retention hand freed pages back to the filesystem
+        # in small steps. The setting only takes effect with a VACUUM (the file is already
+        # in WAL mode): instant while the file is empty, a full rewrite once it holds data,
+        # so existing files are switched by the retention pass (enable_incremental_vacuum).
+        if not conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone():
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+
         conn.executescript(SCHEMA)
         
         # Check for missing columns (migration safety)
@@ -84,14 +250,51 @@ def init_db():
             conn.execute("ALTER TABLE news_items ADD COLUMN summary_lang TEXT")
             conn.commit()
             
+        if "url_key" not in columns:
+            # Dedup key of the stored link, backfilled once from the existing URLs
+            conn.execute("ALTER TABLE news_items ADD COLUMN url_key TEXT")
+            rows = conn.execute("SELECT id, url FROM news_items").fetchall()
+            conn.executemany(
+                "UPDATE news_items SET url_key = ? WHERE id = ?",
+                [(normalize_url(row['url']), row['id']) for row in rows]
+            )
+            conn.commit()
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_news_url_key ON news_items(url_key)")
+
         if "message_id" not in columns:
             conn.execute("ALTER TABLE news_items ADD COLUMN message_id INTEGER NULL")
             conn.commit()
 
+        if "likes" not in columns:
+            # Denormalized reaction counters, backfilled once from news_reactions
+            conn.execute("ALTER TABLE news_items ADD COLUMN likes INTEGER DEFAULT 0")
+            conn.execute("ALTER TABLE news_items ADD COLUMN dislikes INTEGER DEFAULT 0")
+            conn.execute(
+                """
+                UPDATE news_items SET
+                    likes = (SELECT COUNT(*) FROM news_reactions r WHERE r.news_id = news_items.id AND r.reaction_type = 'like'),
+                    dislikes = (SELECT COUNT(*) FROM news_reactions r WHERE r.news_id = news_items.id AND r.reaction_type = 'dislike')
+                WHERE id IN (SELECT DISTINCT news_id FROM news_reactions)
+                """
+            )
+            conn.commit()
+
+        cursor = conn.execute("PRAGMA table_info(sources)")
+        if "learned_weight" not in [col[1] for col in cursor.fetchall()]:
+            conn.execute("ALTER TABLE sources ADD COLUMN learned_weight REAL")
+            conn.commit()
+
+        # Rollup tables added to an existing database start empty
+        has_stats = conn.execute("SELECT 1 FROM source_daily_stats LIMIT 1").fetchone()
+        has_news = conn.execute("SELECT 1 FROM news_items LIMIT 1").fetchone()
+    if has_news and not has_stats:
+        rebuild_daily_stats()
+
 def add_source(source_id, name, weight=1, active=True):
     with get_connection() as conn:
         conn.execute(
-            "INSERT OR IGNORE INTO sources (id, name, weight, active) VALUES (?, ?, ?, ?)",
+            "INSERT INTO sources (id, name, weight, active) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET weight = excluded.weight",
             (source_id, name, weight, int(active))
         )
         conn.commit()
@@ -110,8 +313,8 @@ def is_source_active(source_id):
 def is_duplicate_url(url, days=3):
     with get_connection() as conn:
         cursor = conn.execute(
-            "SELECT 1 FROM news_items WHERE url = ? AND processed_at > datetime('now', '-' || ? || ' days')",
-            (url, days)
+            "SELECT 1 FROM news_items WHERE url_key = ? AND processed_at > datetime('now', '-' || ? || ' days')",
+            (normalize_url(url), days)
         )
         return cursor.fetchone() is not None
 
@@ -119,19 +322,87 @@ def add_news_item(url, title, source_id, published, score, impact, summary, summ
     if is_duplicate_url(url):
         return False
     with get_connection() as conn:
-        conn.execute(
+        cursor = conn.execute(
             """
-            INSERT INTO news_items (url, title, source_id, published, score, impact, summary, summary_lang)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO news_items (url, url_key, title, source_id, published, score, impact, summary, summary_lang)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (url, title, source_id, published, score, impact, summary, summary_lang)
+            (url, normalize_url(url), title, source_id, published, score, impact, summary, summary_lang)
         )
+        _add_to_daily_stats(conn, [cursor.lastrowid])
         conn.commit()
     return True
 
+def get_existing_url_keys(keys):
+    """Return which of the given URL keys (normalize_url) are already stored, one set-based query per 500 keys."""
+    keys = list(dict.fromkeys(k for k in keys if k))
+    existing = set()
+    with get_connection() as conn:
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = conn.execute(f"SELECT url_key FROM news_items WHERE url_key IN ({placeholders})", chunk)
+            existing.update(row['url_key'] for row in cursor.fetchall())
+    return existing
+
+NEWS_ITEM_FIELDS = ("url", "url_key", "title", "source_id", "published", "score", "impact", "summary", "summary_lang")
+
+def add_news_items(items):
+    """
+    Bulk ingest in a single transaction: set-based duplicate check, executemany insert.
+    Duplicates are matched on url_key, derived from "url" when a row does not carry it.
+    Returns the items that were actually stored, each with its new "id".
+    """
+    candidates = {}
+    for item in items:
+        if not item.get("url"):
+            continue
+        if not item.get("url_key"):
+            item["url_key"] = normalize_url(item["url"])
+        if item["url_key"] not in candidates:
+            candidates[item["url_key"]] = item
+    if not candidates:
+        return []
+
+    keys = list(candidates)
+    placeholders = ",".join("?" * len(keys))
+    with get_connection() as conn:
+        try:
+            # Write lock up front: the rollups count exactly the rows inserted here
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(f"SELECT url_key FROM news_items WHERE url_key IN ({placeholders})", keys)
+            existing = {row['url_key'] for row in cursor.fetchall()}
+            new_items = [item for key, item in candidates.items() if key not in existing]
+            if not new_items:
+                conn.rollback()
+                return []
+
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO news_items (url, url_key, title, source_id, published, score, impact, summary, summary_lang)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [tuple(item.get(field) for field in NEWS_ITEM_FIELDS) for item in new_items]
+            )
+            new_urls = [item["url"] for item in new_items]
+            cursor = conn.execute(
+                f"SELECT id, url FROM news_items WHERE url IN ({','.join('?' * len(new_urls))})",
+                new_urls
+            )
+            ids = {row['url']: row['id'] for row in cursor.fetchall()}
+            _add_to_daily_stats(conn, list(ids.values()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    for item in new_items:
+        item["id"] = ids.get(item["url"])
+    return new_items
+
 def get_unsent_news():
     with get_connection() as conn:
-        cursor = conn.execute("SELECT * FROM news_items WHERE sent = 0 ORDER BY score DESC")
+        cursor = conn.execute(f"SELECT * FROM news_items WHERE sent = 0 ORDER BY {RANK_SQL} DESC")
         return [dict(row) for row in cursor.fetchall()]
 
 def mark_as_sent(news_id, message_id=None):
@@ -148,31 +419,95 @@ def get_source_weight(source_id: str) -> int:
         result = cursor.fetchone()
         return int(result['weight']) if result else 1
 
+def get_source_weights(learned=True):
+    """{source_id: weight}; the learned weight replaces the configured one where set."""
+    column = "COALESCE(learned_weight, weight)" if learned else "weight"
+    with get_connection() as conn:
+        cursor = conn.execute(f"SELECT id, {column} AS weight FROM sources")
+        return {row['id']: row['weight'] for row in cursor.fetchall()}
+
+def get_reaction_rollups(days):
+    """(source_id, age in days, likes, dislikes) per source and day of the last `days` days, from the rollups."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            f"""
+            SELECT source_id, julianday(date('now')) - julianday(day) AS age, likes, dislikes
+            FROM source_daily_stats
+            WHERE day >= {SINCE_DAY} AND (likes > 0 OR dislikes > 0)
+            """,
+            (days,)
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+def save_learned_weights(weights):
+    """Store {source_id: learned weight}; None clears it."""
+    with get_connection() as conn:
+        conn.executemany(
+            "UPDATE sources SET learned_weight = ? WHERE id = ?",
+            [(weight, source_id) for source_id, weight in weights.items()]
+        )
+        conn.commit()
+
 def add_reaction(news_id, message_id, reaction_type, user_id, username):
+    """
+    Toggle a user's reaction and keep news_items.likes/dislikes and the daily
+    rollup in step, in one write transaction. Returns the new (likes, dislikes), or None on error.
+    """
     with get_connection() as conn:
         try:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM news_items WHERE id = ?", (news_id,)).fetchone() is None:
+                # Removed by retention; a reaction row would be an orphan
+                conn.rollback()
+                logger.info(f"Reaction to news {news_id}, which is no longer stored")
+                return None
             cursor = conn.execute(
                 "SELECT reaction_type FROM news_reactions WHERE news_id = ? AND user_id = ?",
                 (news_id, user_id)
             )
             existing = cursor.fetchone()
+            delta = {"like": 0, "dislike": 0}
 
             if existing:
+                delta[existing['reaction_type']] -= 1
                 if existing['reaction_type'] == reaction_type:
                     conn.execute("DELETE FROM news_reactions WHERE news_id = ? AND user_id = ?", (news_id, user_id))
                 else:
                     conn.execute("UPDATE news_reactions SET reaction_type = ? WHERE news_id = ? AND user_id = ?", 
                                 (reaction_type, news_id, user_id))
+                    delta[reaction_type] += 1
             else:
                 conn.execute(
                     "INSERT INTO news_reactions (news_id, message_id, reaction_type, user_id, username) VALUES (?, ?, ?, ?, ?)",
                     (news_id, message_id, reaction_type, user_id, username)
                 )
+                delta[reaction_type] += 1
+
+            conn.execute(
+                "UPDATE news_items SET likes = likes + ?, dislikes = dislikes + ? WHERE id = ?",
+                (delta["like"], delta["dislike"], news_id)
+            )
+            conn.execute(
+                """
+                UPDATE source_daily_stats SET likes = likes + ?, dislikes = dislikes + ?
+                WHERE (day, source_id) = (SELECT date(processed_at), COALESCE(source_id, '') FROM news_items WHERE id = ?)
+                """,
+                (delta["like"], delta["dislike"], news_id)
+            )
+
+            row = conn.execute("SELECT likes, dislikes FROM news_items WHERE id = ?", (news_id,)).fetchone()
             conn.commit()
-            return True
+            return (row['likes'], row['dislikes']) if row else (0, 0)
         except Exception as e:
+            conn.rollback()
             logger.error(f"Error adding reaction: {e}")
-            return False
+            return None
+
+def get_reaction_counts(news_id):
+    """(likes, dislikes) of a news item from its counters."""
+    with get_connection() as conn:
+        row = conn.execute("SELECT likes, dislikes FROM news_items WHERE id = ?", (news_id,)).fetchone()
+        return (row['likes'], row['dislikes']) if row else (0, 0)
 
 def get_news_reactions(news_id):
     with get_connection() as conn:
@@ -188,9 +523,568 @@ def get_news_by_message_id(message_id):
         result = cursor.fetchone()
         return result['id'] if result else None
 
-def cleanup_old_news(days=30):
+def get_feed_validator(source_id):
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "SELECT etag, last_modified, content_hash FROM feed_validators WHERE source_id = ?",
+            (source_id,)
+        )
+        result = cursor.fetchone()
+        return dict(result) if result else None
+
+def save_feed_validator(source_id, etag, last_modified, content_hash):
     with get_connection() as conn:
-        cursor = conn.execute("DELETE FROM news_items WHERE processed_at < datetime('now', '-' || ? || ' days')", (days,))
-        count = cursor.rowcount
+        conn.execute(
+            """
+            INSERT INTO feed_validators (source_id, etag, last_modified, content_hash, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source_id) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content_hash = excluded.content_hash,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (source_id, etag, last_modified, content_hash)
+        )
+        conn.commit()
+
+def record_feed_cache_result(source_id, hit):
+    """Count a poll as a hit (unchanged feed) or a miss (new content)."""
+    column = "hits" if hit else "misses"
+    with get_connection() as conn:
+        conn.execute(
+            f"""
+            INSERT INTO feed_validators (source_id, {column}) VALUES (?, 1)
+            ON CONFLICT(source_id) DO UPDATE SET {column} = {column} + 1
+            """,
+            (source_id,)
+        )
+        conn.commit()
+
+def get_feed_cache_stats(source_id=None):
+    with get_connection() as conn:
+        if source_id:
+            cursor = conn.execute(
+                "SELECT source_id, hits, misses FROM feed_validators WHERE source_id = ?",
+                (source_id,)
+            )
+        else:
+            cursor = conn.execute("SELECT source_id, hits, misses FROM feed_validators ORDER BY source_id")
+        return [dict(row) for row in cursor.fetchall()]
+
+def get_seen_entry_keys(source_id, keys):
+    """Return the subset of entry keys already recorded for the source."""
+    keys = list(keys)
+    seen = set()
+    with get_connection() as conn:
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = conn.execute(
+                f"SELECT entry_key FROM seen_entries WHERE source_id = ? AND entry_key IN ({placeholders})",
+                (source_id, *chunk)
+            )
+            seen.update(row['entry_key'] for row in cursor.fetchall())
+    return seen
+
+def add_seen_entry_keys(source_id, keys):
+    with get_connection() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO seen_entries (source_id, entry_key) VALUES (?, ?)",
+            [(source_id, key) for key in keys]
+        )
+        conn.commit()
+
+def get_seen_entry_history(days=7):
+    """
+    Publish history per source: entries first seen in the last `days`, skipping the
+    first hour after a source's first poll (the initial backfill of the whole feed).
+    Returns {source_id: (new_entries, minutes_observed)}.
+    """
+    window = f"-{int(days)} days"
+    with get_connection() as conn:
+        cursor = conn.execute(
+            """
+            WITH first AS (
+                SELECT source_id, MAX(datetime(MIN(seen_at), '+1 hour'), datetime('now', ?)) AS since
+                FROM seen_entries
+                GROUP BY source_id
+            )
+            SELECT
+                f.source_id,
+                (SELECT COUNT(*) FROM seen_entries s WHERE s.source_id = f.source_id AND s.seen_at > f.since) AS new_entries,
+                (julianday('now') - julianday(f.since)) * 1440 AS minutes
+            FROM first f
+            """,
+            (window,)
+        )
+        return {
+            row['source_id']: (row['new_entries'], row['minutes'])
+            for row in cursor.fetchall() if row['minutes'] > 0
+        }
+
+def get_llm_cache(cache_key, max_age_seconds):
+    now = time.time()
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "SELECT response FROM llm_cache WHERE cache_key = ? AND created_at > ?",
+            (cache_key, now - max_age_seconds)
+        )
+        result = cursor.fetchone()
+        if not result:
+            return None
+        conn.execute("UPDATE llm_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+        conn.commit()
+        return result['response']
+
+def put_llm_cache(cache_key, response):
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (cache_key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+            (cache_key, response, now, now)
+        )
         conn.commit()
-        return count
+
+def evict_llm_cache(max_entries, max_age_seconds):
+    """Drop expired entries, then the least recently used ones above max_entries."""
+    with get_connection() as conn:
+        cursor = conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (time.time() - max_age_seconds,))
+        removed = cursor.rowcount
+        cursor = conn.execute(
+            """
+            DELETE FROM llm_cache WHERE cache_key IN (
+                SELECT cache_key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (max_entries,)
+        )
+        removed += cursor.rowcount
+        conn.commit()
+        return removed
+
+def load_recent_titles(since):
+    """Titles indexed after `since` (unix time) as (title, source_id, created_at)."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "SELECT title, source_id, created_at FROM title_index WHERE created_at >= ? ORDER BY created_at",
+            (since,)
+        )
+        return [(row['title'], row['source_id'], row['created_at']) for row in cursor.fetchall()]
+
+def add_recent_titles(rows):
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO title_index (title, source_id, created_at) VALUES (?, ?, ?)", rows)
+        conn.commit()
+
+def get_outbound_message(idempotency_key):
+    """message_id of a Telegram message already posted under this key, or None."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "SELECT message_id FROM outbound_messages WHERE idempotency_key = ?", (idempotency_key,)
+        )
+        row = cursor.fetchone()
+        return row['message_id'] if row else None
+
+def save_outbound_message(idempotency_key, chat_id, message_id):
+    with get_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO outbound_messages (idempotency_key, chat_id, message_id, sent_at) VALUES (?, ?, ?, ?)",
+            (idempotency_key, str(chat_id), message_id, time.time())
+        )
+        conn.commit()
+
+def toggle_source(source_id):
+    """Flip a source's active flag. Returns the new status (0/1), or None if the source is unknown."""
+    with get_connection() as conn:
+        cursor = conn.execute("SELECT active FROM sources WHERE id = ?", (source_id,))
+        source = cursor.fetchone()
+        if not source:
+            return None
+        new_status = 1 - source[0]
+        conn.execute("UPDATE sources SET active = ? WHERE id = ?", (new_status, source_id))
+        conn.commit()
+        return new_status
+
+def get_source_statuses():
+    with get_connection() as conn:
+        cursor = conn.execute("SELECT id, active FROM sources")
+        return {row['id']: bool(row['active']) for row in cursor.fetchall()}
+
+def get_unsent_count():
+    with get_connection() as conn:
+        cursor = conn.execute("SELECT COUNT(*) FROM news_items WHERE sent = 0")
+        return cursor.fetchone()[0]
+
+def _claim_news(query, params):
+    """Select unsent rows and move them to SENT_CLAIMED in one write transaction."""
+    with get_connection() as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+            if rows:
+                ids = [row['id'] for row in rows]
+                conn.execute(
+                    f"UPDATE news_items SET sent = {SENT_CLAIMED} WHERE id IN ({','.join('?' * len(ids))})",
+                    ids
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return rows
+
+def claim_news(news_ids):
+    """Claim the given rows for sending; rows already claimed or sent are skipped."""
+    news_ids = list(news_ids)
+    if not news_ids:
+        return []
+    return _claim_news(
+        f"SELECT * FROM news_items WHERE sent = {SENT_PENDING} AND id IN ({','.join('?' * len(news_ids))}) "
+        f"ORDER BY {RANK_SQL} DESC",
+        news_ids
+    )
+
+def claim_unsent_breaking_news(limit=20):
+    return _claim_news(
+        f"SELECT * FROM news_items WHERE sent = {SENT_PENDING} AND impact >= {BREAKING_IMPACT} "
+        f"ORDER BY {RANK_SQL} DESC LIMIT ?",
+        (limit,)
+    )
+
+def claim_unsent_digest_news(limit=40):
+    return _claim_news(
+        f"SELECT * FROM news_items WHERE sent = {SENT_PENDING} AND impact < {BREAKING_IMPACT} "
+        f"ORDER BY impact DESC, {RANK_SQL} DESC LIMIT ?",
+        (limit,)
+    )
+
+def release_news(news_ids):
+    """Return claimed rows to the unsent state after a failed send."""
+    news_ids = list(news_ids)
+    if not news_ids:
+        return
+    with get_connection() as conn:
+        conn.execute(
+            f"UPDATE news_items SET sent = {SENT_PENDING} "
+            f"WHERE sent = {SENT_CLAIMED} AND id IN ({','.join('?' * len(news_ids))})",
+            news_ids
+        )
+        conn.commit()
+
+def release_stale_claims():
+    """Startup hook: rows left claimed by a crashed process go back to the queue."""
+    with get_connection() as conn:
+        cursor = conn.execute(f"UPDATE news_items SET sent = {SENT_PENDING} WHERE sent = {SENT_CLAIMED}")
+        conn.commit()
+        return cursor.rowcount
+
+# Aggregates of news_items rows matching {where}, merged into the daily rollups
+SOURCE_DAILY_STATS_SQL = f"""
+INSERT INTO source_daily_stats (day, source_id, news_count, breaking_count, impact_sum, likes, dislikes)
+SELECT date(processed_at), COALESCE(source_id, ''), COUNT(*),
+       COALESCE(SUM(impact >= {BREAKING_IMPACT}), 0), COALESCE(SUM(impact), 0),
+       COALESCE(SUM(likes), 0), COALESCE(SUM(dislikes), 0)
+FROM news_items WHERE {{where}}
+GROUP BY 1, 2
+ON CONFLICT (day, source_id) DO UPDATE SET
+    news_count = news_count + excluded.news_count,
+    breaking_count = breaking_count + excluded.breaking_count,
+    impact_sum = impact_sum + excluded.impact_sum,
+    likes = likes + excluded.likes,
+    dislikes = dislikes + excluded.dislikes
+"""
+
+LANGUAGE_DAILY_STATS_SQL = """
+INSERT INTO language_daily_stats (day, lang, news_count)
+SELECT date(processed_at), summary_lang, COUNT(*)
+FROM news_items WHERE summary_lang IS NOT NULL AND {where}
+GROUP BY 1, 2
+ON CONFLICT (day, lang) DO UPDATE SET news_count = news_count + excluded.news_count
+"""
+
+def _add_to_daily_stats(conn, news_ids):
+    """Count freshly inserted rows into the rollups, inside the caller's transaction."""
+    for i in range(0, len(news_ids), 500):
+        chunk = news_ids[i:i + 500]
+        where = f"id IN ({','.join('?' * len(chunk))})"
+        conn.execute(SOURCE_DAILY_STATS_SQL.format(where=where), chunk)
+        conn.execute(LANGUAGE_DAILY_STATS_SQL.format(where=where), chunk)
+
+def rebuild_daily_stats():
+    """
+    Recompute the rollups from news_items. Days whose rows were already
+    removed by cleanup_old_news are lost. Returns the number of (day, source) rows.
+    """
+    with get_connection() as conn:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM source_daily_stats")
+            conn.execute("DELETE FROM language_daily_stats")
+            conn.execute(SOURCE_DAILY_STATS_SQL.format(where="1"))
+            conn.execute(LANGUAGE_DAILY_STATS_SQL.format(where="1"))
+            count = conn.execute("SELECT COUNT(*) FROM source_daily_stats").fetchone()[0]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    logger.info(f"Rebuilt daily stats: {count} source-day rows")
+    return count
+
+# Stats windows cover the last `days` calendar days (UTC, like processed_at), today included
+SINCE_DAY = "date('now', '-' || (? - 1) || ' days')"
+
+def get_news_stats(days=7):
+    """Counts for /stats from the rollups: today, last `days` days, breaking and per source."""
+    with get_connection() as conn:
+        daily_count = conn.execute(
+            "SELECT COALESCE(SUM(news_count), 0) FROM source_daily_stats WHERE day >= date('now')"
+        ).fetchone()[0]
+        weekly_count, breaking_count = conn.execute(
+            f"SELECT COALESCE(SUM(news_count), 0), COALESCE(SUM(breaking_count), 0) "
+            f"FROM source_daily_stats WHERE day >= {SINCE_DAY}",
+            (days,)
+        ).fetchone()
+        cursor = conn.execute(
+            f"""
+            SELECT source_id, SUM(news_count)
+            FROM source_daily_stats
+            WHERE day >= {SINCE_DAY}
+            GROUP BY source_id
+            """,
+            (days,)
+        )
+        sources_stats = [tuple(row) for row in cursor.fetchall()]
+    return {
+        "daily": daily_count,
+        "weekly": weekly_count,
+        "breaking": breaking_count,
+        "sources": sources_stats,
+    }
+
+def get_source_reaction_stats(days=30):
+    """Per source: (source_id, news_count, likes, dislikes) for news processed in the last `days` days."""
+    with get_connection() as conn:
+        cursor = conn.execute(
+            f"""
+            SELECT
+                source_id,
+                SUM(news_count) as news_count,
+                SUM(likes) as likes,
+                SUM(dislikes) as dislikes
+            FROM
+                source_daily_stats
+            WHERE
+                day >= {SINCE_DAY}
+            GROUP BY
+                source_id
+            ORDER BY
+                likes DESC
+            """,
+            (days,)
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+def get_top_news(since, limit=10):
+    with get_connection() as conn:
+        cursor = conn.execute(
+            """
+            SELECT 
+                n.id, 
+                n.title, 
+                n.source_id,
+                n.url,
+                n.likes,
+                n.dislikes
+            FROM 
+                news_items n
+            WHERE
+                n.processed_at >= ?
+            ORDER BY
+                n.likes DESC, n.dislikes ASC
+            LIMIT ?
+            """,
+            (since, limit)
+        )
+        return [tuple(row) for row in cursor.fetchall()]
+
+def get_language_stats(days=7):
+    """Returns (total_count, [(summary_lang, count), ...]) for news processed in the last `days` days."""
+    with get_connection() as conn:
+        total_count = conn.execute(
+            f"SELECT COALESCE(SUM(news_count), 0) FROM source_daily_stats WHERE day >= {SINCE_DAY}", (days,)
+        ).fetchone()[0]
+        cursor = conn.execute(
+            f"""
+            SELECT 
+                lang, 
+                SUM(news_count) as count 
+            FROM 
+                language_daily_stats 
+            WHERE 
+                day >= {SINCE_DAY}
+            GROUP BY 
+                lang
+            ORDER BY 
+                count DESC
+            """,
+            (days,)
+        )
+        return total_count, [tuple(row) for row in cursor.fetchall()]
+
+def get_source_info(source_id):
+    """Status, totals, reactions and the latest news of one source for /source_info."""
+    with get_connection() as conn:
+        cursor = conn.execute("SELECT active, weight, learned_weight FROM sources WHERE id = ?", (source_id,))
+        source = cursor.fetchone()
+        active = bool(source['active']) if source else False
+
+        total_news, likes, dislikes = conn.execute(
+            """
+            SELECT COALESCE(SUM(news_count), 0), COALESCE(SUM(likes), 0), COALESCE(SUM(dislikes), 0)
+            FROM source_daily_stats WHERE source_id = ?
+            """,
+            (source_id,)
+        ).fetchone()
+
+        cursor = conn.execute(
+            """
+            SELECT title, impact, processed_at 
+            FROM news_items 
+            WHERE source_id = ? 
+            ORDER BY processed_at DESC 
+            LIMIT 5
+            """,
+            (source_id,)
+        )
+        recent_news = [tuple(row) for row in cursor.fetchall()]
+
+    return {
+        "active": active,
+        "weight": source['weight'] if source else None,
+        "learned_weight": source['learned_weight'] if source else None,
+        "total_news": total_news,
+        "recent_news": recent_news,
+        "likes": likes,
+        "dislikes": dislikes,
+    }
+
+def delete_old_news_batch(cutoff, limit):
+    """
+    Delete up to `limit` news items processed before `cutoff` (unix time), with
+    their reactions, in one short write transaction. Items claimed for sending
+    are left alone; the daily rollups are not touched. Returns (news, reactions) removed.
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        ids = [row['id'] for row in conn.execute(
+            """
+            SELECT id FROM news_items
+            WHERE processed_at < datetime(?, 'unixepoch') AND sent != ?
+            ORDER BY processed_at
+            LIMIT ?
+            """,
+            (cutoff, SENT_CLAIMED, limit)
+        ).fetchall()]
+        if not ids:
+            conn.rollback()
+            return 0, 0
+        placeholders = ",".join("?" * len(ids))
+        reactions = conn.execute(f"DELETE FROM news_reactions WHERE news_id IN ({placeholders})", ids).rowcount
+        news = conn.execute(f"DELETE FROM news_items WHERE id IN ({placeholders})", ids).rowcount
+        conn.commit()
+        return news, reactions
+
+def delete_orphan_reactions_batch(after_id, limit):
+    """
+    Scan the next `limit` reactions after id `after_id` and delete those whose
+    news item is gone. Returns (removed, last scanned id), the id None once the table is done.
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        last_id = conn.execute(
+            "SELECT MAX(id) FROM (SELECT id FROM news_reactions WHERE id > ? ORDER BY id LIMIT ?)",
+            (after_id, limit)
+        ).fetchone()[0]
+        if last_id is None:
+            conn.rollback()
+            return 0, None
+        removed = conn.execute(
+            """
+            DELETE FROM news_reactions
+            WHERE id > ? AND id <= ?
+              AND NOT EXISTS (SELECT 1 FROM news_items n WHERE n.id = news_reactions.news_id)
+            """,
+            (after_id, last_id)
+        ).rowcount
+        conn.commit()
+        return removed, last_id
+
+# Batched deletes of expired bookkeeping rows; parameters are (cutoff unix time, limit)
+EXPIRED_ROWS_SQL = {
+    "seen_entries": """
+        DELETE FROM seen_entries WHERE (source_id, entry_key) IN (
+            SELECT source_id, entry_key FROM seen_entries WHERE seen_at < datetime(?, 'unixepoch') LIMIT ?
+        )
+    """,
+    "title_index": """
+        DELETE FROM title_index WHERE rowid IN (
+            SELECT rowid FROM title_index WHERE created_at < ? LIMIT ?
+        )
+    """,
+    "outbound_messages": """
+        DELETE FROM outbound_messages WHERE rowid IN (
+            SELECT rowid FROM outbound_messages WHERE sent_at < ? LIMIT ?
+        )
+    """,
+}
+
+def delete_expired_rows_batch(table, cutoff, limit):
+    """Delete up to `limit` rows of a table in EXPIRED_ROWS_SQL older than `cutoff` (unix time)."""
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        removed = conn.execute(EXPIRED_ROWS_SQL[table], (cutoff, limit)).rowcount
+        conn.commit()
+        return removed
+
+def get_storage_stats():
+    """Page size, page count and free pages of the database file."""
+    with get_connection() as conn:
+        return {
+            pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+            for pragma in ("page_size", "page_count", "freelist_count", "auto_vacuum")
+        }
+
+def incremental_vacuum(pages):
+    """Return up to `pages` free pages to the filesystem. Returns the number of pages released."""
+    with get_connection() as conn:
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        # executescript steps the pragma to completion; execute() would free a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        return before - conn.execute("PRAGMA page_count").fetchone()[0]
+
+def enable_incremental_vacuum():
+    """
+    Switch an existing file to incremental auto-vacuum: one full VACUUM that rewrites
+    the whole file and holds the write lock until done. Returns the seconds it took.
+    """
+    with get_connection() as conn:
+        start = time.perf_counter()
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        return time.perf_counter() - start
+
+def optimize():
+    """Refresh query planner statistics where SQLite considers them stale."""
+    with get_connection() as conn:
+        conn.execute("PRAGMA optimize")
+
+def cleanup_old_news(days=30, batch_size=500):
+    """Delete news older than `days` in batches, with their reactions. Returns the number of news removed."""
+    cutoff = time.time() - days * 86400
+    total = 0
+    while True:
+        news, _ = delete_old_news_batch(cutoff, batch_size)
+        total += news
+        if news < batch_size:
+            return total
@@ -1,10 +1,103 @@
 import abc
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from app import async_db
+from app.db import save_feed_validator
+from app.parsing import parse_pool
+
+logger = logging.getLogger(__name__)
 
 class BaseFetcher(abc.ABC):
-    def __init__(self, source_id, url, lang):
+    # Key of the parser in app.parsing.PARSERS
+    feed_type = None
+
+    def __init__(self, source_id, url, lang, http=None):
         self.source_id = source_id
         self.url = url
         self.lang = lang
+        self.http = http
+        self._pending_validator = None
+        self.validator = {}
+
+    @asynccontextmanager
+    async def session(self):
+        """Yield the shared pooled session, or a one-off session when running standalone."""
+        if self.http is not None:
+            yield await self.http.get_session()
+        else:
+            async with aiohttp.ClientSession() as session:
+                yield session
+
+    @asynccontextmanager
+    async def open_if_changed(self, headers=None, **kwargs):
+        """
+        Conditional GET of self.url.
+        Sends If-None-Match / If-Modified-Since from the stored validators (kept in
+        self.validator) and yields the response with its body still unread, or None
+        when the feed is not modified (304) or the request failed.
+        """
+        self.validator = await async_db.get_feed_validator(self.source_id) or {}
+        request_headers = dict(headers or {})
+        if self.validator.get("etag"):
+            request_headers["If-None-Match"] = self.validator["etag"]
+        if self.validator.get("last_modified"):
+            request_headers["If-Modified-Since"] = self.validator["last_modified"]
+
+        async with self.session() as session:
+            async with session.get(self.url, headers=request_headers, **kwargs) as response:
+                if response.status == 304:
+                    logger.info(f"[{self.source_id}] Not modified (304)")
+                    await async_db.record_feed_cache_result(self.source_id, hit=True)
+                    yield None
+                elif response.status != 200:
+                    logger.error(f"[{self.source_id}] Failed to fetch: HTTP {response.status}")
+                    yield None
+                else:
+                    yield response
+
+    async def get_if_changed(self, headers=None, **kwargs):
+        """
+        Conditional GET of the whole body.
+        Returns the body, or None when the feed is unchanged (304 or same hash) or the request failed.
+        """
+        async with self.open_if_changed(headers, **kwargs) as response:
+            if response is None:
+                return None
+            content = await response.read()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        validator = self.validator
+        content_hash = hashlib.sha256(content).hexdigest()
+        if content_hash == validator.get("content_hash"):
+            logger.info(f"[{self.source_id}] Body unchanged since last poll")
+            await async_db.record_feed_cache_result(self.source_id, hit=True)
+            if etag != validator.get("etag") or last_modified != validator.get("last_modified"):
+                await async_db.save_feed_validator(self.source_id, etag, last_modified, content_hash)
+            return None
+
+        await async_db.record_feed_cache_result(self.source_id, hit=False)
+        self._pending_validator = (etag, last_modified, content_hash)
+        return content
+
+    def commit_validator(self):
+        """
+        Persist validators of the last fetched body once its items went through the pipeline.
+        Blocking: run it on the DB executor.
+        """
+        if self._pending_validator is None:
+            return
+        etag, last_modified, content_hash = self._pending_validator
+        save_feed_validator(self.source_id, etag, last_modified, content_hash)
+        self._pending_validator = None
+
+    async def parse(self, content):
+        """Parse a fetched body in the parse pool, off the event loop. Items come back unnormalized."""
+        return await parse_pool.parse(self.feed_type, content, self.source_id, self.lang)
 
     @abc.abstractmethod
     async def fetch(self):
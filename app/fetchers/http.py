@@ -0,0 +1,61 @@
+import os
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+HTTP_LIMIT = int(os.getenv("FETCHER_HTTP_LIMIT", "50"))
+HTTP_LIMIT_PER_HOST = int(os.getenv("FETCHER_HTTP_LIMIT_PER_HOST", "4"))
+HTTP_DNS_TTL = int(os.getenv("FETCHER_HTTP_DNS_TTL", "600"))
+HTTP_KEEPALIVE = float(os.getenv("FETCHER_HTTP_KEEPALIVE", "120"))
+HTTP_TIMEOUT = float(os.getenv("FETCHER_HTTP_TIMEOUT", "30"))
+
+
+class FetcherHTTP:
+    """
+    Long-lived aiohttp session shared by all fetchers.
+    Keeps connections alive between polls, caches DNS lookups and caps
+    the number of simultaneous connections per host.
+    """
+
+    def __init__(self, limit=HTTP_LIMIT, limit_per_host=HTTP_LIMIT_PER_HOST,
+                 dns_ttl=HTTP_DNS_TTL, keepalive=HTTP_KEEPALIVE, timeout=HTTP_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use."""
+        if self._session is not None and not self._session.closed:
+            return self._session
+
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_ttl,
+                    keepalive_timeout=self.keepalive,
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                )
+                logger.info(
+                    f"Opened shared fetcher session (limit={self.limit}, per_host={self.limit_per_host})"
+                )
+            return self._session
+
+    async def close(self):
+        """Shutdown hook: close the session and its pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed shared fetcher session")
+        self._session = None
@@ -1,28 +1,97 @@
-import aiohttp
-import feedparser
+from contextlib import aclosing
+from xml.etree.ElementTree import ParseError
+
+from app import async_db
 from app.fetchers.base import BaseFetcher
-from app.common import clean_html
+from app.parsing import RSSStreamParser, RSS_STREAM_CHUNK_SIZE
+
+# Streaming stops after this many already seen entries in a row
+SEEN_STREAK = 20
+
+async def iterate(items):
+    for item in items:
+        yield item
 
 class RSSFetcher(BaseFetcher):
+    feed_type = "rss"
+
+    def __init__(self, source_id, url, lang, http=None, stream=False, max_items=None, is_seen=None,
+                 seen_streak=SEEN_STREAK):
+        super().__init__(source_id, url, lang, http=http)
+        self.stream = stream
+        # Cap on new entries per poll; seen entries do not count towards it
+        self.max_items = max_items
+        # async callable(item) -> bool, lets the cap skip known entries and streaming stop early
+        self.is_seen = is_seen
+        self.seen_streak = seen_streak
+
     async def fetch(self):
         print(f"[{self.source_id}] Fetching RSS feed from {self.url}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.url) as response:
-                    content = await response.read()
-
-            feed = feedparser.parse(content)
-            return [
-                {
-                    "title": clean_html(entry.get("title", "")),
-                    "link": entry.get("link", ""),
-                    "summary": clean_html(entry.get("summary", "")),
-                    "published": entry.get("published", ""),
-                    "source": self.source_id,
-                    "lang": self.lang
-                }
-                for entry in feed.entries
-            ]
+            if self.stream:
+                items = await self.fetch_stream()
+                if items is not None:
+                    return items
+                print(f"[{self.source_id}] Malformed XML, falling back to feedparser")
+
+            content = await self.get_if_changed()
+            if content is None:
+                return []
+
+            items = await self.parse(content)
+            if not self.max_items:
+                return items
+            # The whole body is parsed already: look past any run of seen entries
+            new_items = []
+            await self.collect_new(iterate(items), new_items, seen_streak=None)
+            return new_items
         except Exception as e:
             print(f"[{self.source_id}] Error fetching RSS: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    async def fetch_stream(self):
+        """
+        Read the body in chunks and parse entries as they arrive, skipping seen ones.
+        Stops after max_items new entries or seen_streak seen entries in a row,
+        leaving the rest of the body unread. Returns None when the XML is malformed.
+        """
+        items = []
+        async with self.open_if_changed() as response:
+            if response is None:
+                return []
+            # No body hash: the body is usually not read to the end
+            self._pending_validator = (response.headers.get("ETag"), response.headers.get("Last-Modified"), None)
+            try:
+                async with aclosing(self.stream_entries(response)) as entries:
+                    await self.collect_new(entries, items, self.seen_streak)
+            except ParseError as e:
+                print(f"[{self.source_id}] XML error at entry {len(items)}: {e}")
+                self._pending_validator = None
+                # The feedparser fallback fetches again and records the result
+                return None
+            await async_db.record_feed_cache_result(self.source_id, hit=False)
+
+        print(f"[{self.source_id}] Streamed {len(items)} new entries")
+        return items
+
+    async def collect_new(self, entries, items, seen_streak):
+        """Append unseen entries to `items` until max_items of them or `seen_streak` seen ones in a row."""
+        streak = 0
+        async for item in entries:
+            if self.is_seen is not None and await self.is_seen(item):
+                streak += 1
+                if seen_streak and streak >= seen_streak:
+                    break
+                continue
+            streak = 0
+            items.append(item)
+            if self.max_items and len(items) >= self.max_items:
+                break
+
+    async def stream_entries(self, response):
+        parser = RSSStreamParser(self.source_id, self.lang)
+        async for chunk in response.content.iter_chunked(RSS_STREAM_CHUNK_SIZE):
+            for item in parser.feed(chunk):
+                yield item
+        for item in parser.close():
+            yield item
@@ -1,7 +1,8 @@
-import aiohttp
 from app.fetchers.base import BaseFetcher
 
 class TAAFTFetcher(BaseFetcher):
+    feed_type = "api"
+
     async def fetch(self):
         print(f"[{self.source_id}] Fetching from TAAFT API: {self.url}")
         headers = {
@@ -12,29 +13,15 @@ class TAAFTFetcher(BaseFetcher):
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.url, headers=headers) as response:
-                    if response.status != 200:
-                        print(f"[{self.source_id}] Failed to fetch: HTTP {response.status}")
-                        return []
-
-                    try:
-                        data = await response.json()
-                    except Exception as e:
-                        print(f"[{self.source_id}] Failed to parse JSON: {e}")
-                        return []
+            content = await self.get_if_changed(headers=headers)
+            if content is None:
+                return []
 
-            return [
-                {
-                    "title": entry.get("name", ""),
-                    "link": entry.get("url", ""),
-                    "summary": entry.get("description", ""),
-                    "published": entry.get("published_at", ""),
-                    "source": self.source_id,
-                    "lang": self.lang
-                }
-                for entry in data
-            ]
+            try:
+                return await self.parse(content)
+            except ValueError as e:
+                print(f"[{self.source_id}] Failed to parse JSON: {e}")
+                return []
         except Exception as e:
             print(f"[{self.source_id}] Error fetching data: {e}")
             return []
\ No newline at end of file
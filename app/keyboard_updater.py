@@ -0,0 +1,101 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Tuple
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from app import async_db
+from app.scheduler import build_reaction_keyboard
+
+logger = logging.getLogger(__name__)
+
+# At most one keyboard edit per message per this many seconds
+REACTION_EDIT_WINDOW = float(os.getenv("REACTION_EDIT_WINDOW", "3"))
+EDIT_ATTEMPTS = 3
+# Forget per-message state once this many messages are tracked
+MAX_TRACKED_MESSAGES = 5000
+
+
+class KeyboardUpdater:
+    """
+    Coalesces reaction keyboard edits per message.
+    The first click on a quiet message is shown right away; clicks arriving
+    within the window after an edit are merged into one trailing edit that
+    reads the latest counters when it fires.
+    """
+
+    def __init__(self, window: float = REACTION_EDIT_WINDOW):
+        self.window = window
+        self._tasks: Dict[Tuple[int, int], asyncio.Task] = {}
+        self._last_edit: Dict[Tuple[int, int], float] = {}
+        self._rendered: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self.edits = 0
+        self.coalesced = 0
+
+    def schedule(self, bot, chat_id: int, message_id: int, news_id: int):
+        """Request a keyboard refresh; returns immediately."""
+        key = (chat_id, message_id)
+        if key in self._tasks:
+            self.coalesced += 1
+            return
+        self._prune()
+        self._tasks[key] = asyncio.create_task(self._update(bot, key, news_id))
+
+    def _prune(self):
+        if len(self._last_edit) < MAX_TRACKED_MESSAGES:
+            return
+        cutoff = time.monotonic() - self.window
+        for key in [key for key, at in self._last_edit.items() if at < cutoff and key not in self._tasks]:
+            self._last_edit.pop(key, None)
+            self._rendered.pop(key, None)
+
+    async def _update(self, bot, key, news_id):
+        chat_id, message_id = key
+        try:
+            for _ in range(EDIT_ATTEMPTS):
+                delay = self._last_edit.get(key, float("-inf")) + self.window - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Clicks from here on schedule the next edit, one window later
+                if self._tasks.get(key) is asyncio.current_task():
+                    del self._tasks[key]
+                self._last_edit[key] = time.monotonic()
+
+                counts = await async_db.get_reaction_counts(news_id)
+                if counts == self._rendered.get(key):
+                    return
+                try:
+                    await bot.edit_message_reply_markup(
+                        chat_id=chat_id, message_id=message_id,
+                        reply_markup=build_reaction_keyboard(news_id, *counts)
+                    )
+                except TelegramRetryAfter as e:
+                    logger.warning(f"Keyboard edit for message {message_id} throttled for {e.retry_after}s")
+                    self._last_edit[key] = time.monotonic() + e.retry_after - self.window
+                    continue
+                except TelegramBadRequest as e:
+                    if "not modified" not in str(e):
+                        raise
+                self._rendered[key] = counts
+                self.edits += 1
+                return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to update reaction keyboard of message {message_id}: {e}")
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+
+    async def close(self):
+        """Shutdown hook: drop pending edits."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+keyboard_updater = KeyboardUpdater()
@@ -0,0 +1,66 @@
+import os
+from functools import lru_cache
+
+from langdetect import DetectorFactory, detect_langs
+
+# langdetect is randomized; a fixed seed makes the fallback deterministic
+DetectorFactory.seed = 0
+
+# Russian tech titles are full of Latin product names, English ones have no Cyrillic:
+# a modest Cyrillic share already means Russian, while English needs near-pure Latin
+CYRILLIC_RU_RATIO = float(os.getenv("LANG_CYRILLIC_RU_RATIO", "0.2"))
+LATIN_EN_RATIO = float(os.getenv("LANG_LATIN_EN_RATIO", "0.95"))
+LANG_CACHE_SIZE = int(os.getenv("LANG_CACHE_SIZE", "4096"))
+MIN_TEXT_LENGTH = 10
+MIN_LETTERS = 6
+
+# Cyrillic letters that do not occur in Russian (Ukrainian, Belarusian, ...)
+NON_RUSSIAN_CYRILLIC = set("іїєґўІЇЄҐЎ")
+
+
+def script_counts(text: str):
+    """Count Cyrillic and Latin letters in text."""
+    cyrillic = latin = 0
+    for ch in text:
+        if "а" <= ch <= "я" or "А" <= ch <= "Я" or ch in "ёЁ":
+            cyrillic += 1
+        elif "a" <= ch <= "z" or "A" <= ch <= "Z":
+            latin += 1
+        elif ch in NON_RUSSIAN_CYRILLIC:
+            return 0, 0
+    return cyrillic, latin
+
+
+def detect_by_script(text: str):
+    """Fast path: 'ru' or 'en' decided by script shares, None when ambiguous."""
+    cyrillic, latin = script_counts(text)
+    letters = cyrillic + latin
+    if letters < MIN_LETTERS:
+        return None
+    if cyrillic / letters >= CYRILLIC_RU_RATIO:
+        return "ru"
+    if latin / letters >= LATIN_EN_RATIO:
+        return "en"
+    return None
+
+
+def detect_by_model(text: str) -> str:
+    """Slow path: seeded langdetect, only trusted at probability >= 0.9."""
+    try:
+        langs = detect_langs(text)
+        if langs and langs[0].prob >= 0.9:
+            return langs[0].lang
+    except Exception:
+        pass
+    return "unknown"
+
+
+@lru_cache(maxsize=LANG_CACHE_SIZE)
+def detect_language(text: str) -> str:
+    """
+    Detect language: script ratio first, langdetect only for mixed or
+    non-Russian Cyrillic text. Results are memoized per text.
+    """
+    if not text or len(text.strip()) < MIN_TEXT_LENGTH:
+        return "unknown"
+    return detect_by_script(text) or detect_by_model(text)
@@ -0,0 +1,68 @@
+import os
+import logging
+from typing import Dict, Iterable, Tuple
+
+from app.db import get_reaction_rollups, get_source_weights, save_learned_weights
+
+logger = logging.getLogger(__name__)
+
+LEARNED_WEIGHTS = os.getenv("LEARNED_WEIGHTS", "1") == "1"
+# Reactions older than this are ignored; within it they fade with the half-life
+LEARNING_WINDOW_DAYS = int(os.getenv("LEARNING_WINDOW_DAYS", "30"))
+LEARNING_HALF_LIFE_DAYS = float(os.getenv("LEARNING_HALF_LIFE_DAYS", "7"))
+# How many (decayed) reactions the global like rate counts as, per source
+LEARNING_PRIOR_STRENGTH = float(os.getenv("LEARNING_PRIOR_STRENGTH", "10"))
+# Bounds of the learned multiplier applied to the configured weight
+LEARNED_WEIGHT_MIN = float(os.getenv("LEARNED_WEIGHT_MIN", "0.5"))
+LEARNED_WEIGHT_MAX = float(os.getenv("LEARNED_WEIGHT_MAX", "2.0"))
+LEARNING_INTERVAL_HOURS = float(os.getenv("LEARNING_INTERVAL_HOURS", "6"))
+
+
+def decayed_counts(rows: Iterable[Tuple[str, float, int, int]],
+                   half_life: float = LEARNING_HALF_LIFE_DAYS) -> Dict[str, Tuple[float, float]]:
+    """{source_id: (likes, dislikes)} with each day's counts halved every `half_life` days of age."""
+    counts: Dict[str, Tuple[float, float]] = {}
+    for source_id, age, likes, dislikes in rows:
+        factor = 0.5 ** (max(age, 0.0) / half_life)
+        total_likes, total_dislikes = counts.get(source_id, (0.0, 0.0))
+        counts[source_id] = (total_likes + likes * factor, total_dislikes + dislikes * factor)
+    return counts
+
+
+def learn_multipliers(counts: Dict[str, Tuple[float, float]],
+                      prior_strength: float = LEARNING_PRIOR_STRENGTH,
+                      low: float = LEARNED_WEIGHT_MIN, high: float = LEARNED_WEIGHT_MAX) -> Dict[str, float]:
+    """
+    Like rate of each source relative to the overall one, smoothed towards it:
+    (likes + m * k) / (likes + dislikes + k) / m, where m is the overall like rate
+    and k the prior strength, so a source with a handful of reactions stays near 1.
+    """
+    total_likes = sum(likes for likes, _ in counts.values())
+    total = total_likes + sum(dislikes for _, dislikes in counts.values())
+    if total <= 0:
+        return {}
+    mean = total_likes / total
+    if mean <= 0:
+        return {source_id: low for source_id in counts}
+    multipliers = {}
+    for source_id, (likes, dislikes) in counts.items():
+        rate = (likes + mean * prior_strength) / (likes + dislikes + prior_strength)
+        multipliers[source_id] = min(high, max(low, rate / mean))
+    return multipliers
+
+
+def update_learned_weights(days: int = LEARNING_WINDOW_DAYS) -> Dict[str, float]:
+    """
+    Recompute sources.learned_weight from the reaction rollups of the last `days` days.
+    Sources without reactions in the window get their configured weight back.
+    Reads one row per source and day, so the cost does not grow with the number of reactions.
+    """
+    multipliers = learn_multipliers(decayed_counts(get_reaction_rollups(days)))
+    weights = {
+        source_id: round(weight * multipliers[source_id], 3) if source_id in multipliers else None
+        for source_id, weight in get_source_weights(learned=False).items()
+    }
+    save_learned_weights(weights)
+    learned = {source_id: weight for source_id, weight in weights.items() if weight is not None}
+    logger.info(f"Learned weights of {len(learned)} sources from reactions of the last {days} days")
+    return learned
@@ -0,0 +1,82 @@
+import os
+import hashlib
+import logging
+import unicodedata
+import re
+from typing import Optional
+
+from app import async_db
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_DAYS", "14")) * 86400
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+# Run eviction once per this many writes instead of on every put
+EVICT_EVERY = 200
+
+
+def normalize_content(content: str) -> str:
+    """Collapse whitespace and unicode forms so trivially different inputs share a key."""
+    content = unicodedata.normalize("NFC", content or "")
+    return re.sub(r'\s+', ' ', content).strip()
+
+
+def prompt_id(prompt: str) -> str:
+    """Short fingerprint of a prompt: editing a prompt invalidates its cached answers."""
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class LLMCache:
+    """On-disk (SQLite) cache of OpenRouter answers keyed by model, prompt and content hash."""
+
+    def __init__(self, enabled=LLM_CACHE_ENABLED, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, content: str, json_mode: bool = False) -> str:
+        content_hash = hashlib.sha256(normalize_content(content).encode("utf-8")).hexdigest()
+        return f"{model}|{prompt_id(prompt)}|{int(json_mode)}|{content_hash}"
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            response = await async_db.get_llm_cache(key, self.ttl)
+        except Exception as e:
+            logger.error(f"LLM cache read failed: {e}")
+            response = None
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def put(self, key: str, response: str):
+        if not self.enabled or not response:
+            return
+        try:
+            await async_db.put_llm_cache(key, response)
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                removed = await async_db.evict_llm_cache(self.max_entries, self.ttl)
+                if removed:
+                    logger.info(f"LLM cache evicted {removed} entries")
+        except Exception as e:
+            logger.error(f"LLM cache write failed: {e}")
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats_line(self) -> str:
+        return f"{self.hit_rate:.0%} hits ({self.hits} hits / {self.misses} misses)"
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,97 @@
+import os
+import heapq
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from app.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Defaults match the OpenRouter free tier (20 requests per minute)
+LLM_MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("OPENROUTER_RPM", "20"))
+LLM_BURST = float(os.getenv("OPENROUTER_BURST", "5"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class LLMDispatcher:
+    """
+    Central gate for every OpenRouter request.
+    Caps in-flight calls, paces them with a token bucket and lets
+    higher-priority callers (lower number) jump the waiting line.
+    """
+
+    def __init__(self, concurrency=LLM_MAX_CONCURRENCY, requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 burst=LLM_BURST):
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._available = concurrency
+        self._waiters = []
+        self._counter = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def _acquire(self, priority: int):
+        if self._available > 0 and not self._waiters:
+            self._available -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over right before cancellation; pass it on
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._available += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0):
+        """Hold one concurrency slot and one rate-limit token for the duration of a request."""
+        await self._acquire(priority)
+        try:
+            await self.bucket.acquire()
+            yield
+        finally:
+            self._release()
+
+    def retry_after(self, seconds: float):
+        """Back off every pending request after a 429."""
+        logger.warning(f"OpenRouter asked to back off for {seconds:.1f}s")
+        self.bucket.pause(seconds)
+
+
+dispatcher = LLMDispatcher()
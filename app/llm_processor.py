@@ -6,9 +6,15 @@ import asyncio
 from typing import Dict, List, Optional
 import httpx
 from bs4 import BeautifulSoup
-from langdetect import detect_langs
 from dotenv import load_dotenv
 
+from app.common import clean_html
+from app.models import NewsItem
+from app.ranker import source_weights
+from app.llm_dispatcher import dispatcher, parse_retry_after
+from app.llm_cache import llm_cache
+from app.lang import detect_language
+
 # Load environment variables
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
@@ -17,8 +23,16 @@ load_dotenv(dotenv_path=env_path)
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "nvidia/nemotron-3-nano-omni-30b-a3b-reasoning:free")
+OPENROUTER_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
 ENABLE_FILTERING = os.getenv("ENABLE_FILTERING", "1") == "1"
 
+# Batch mode: pack several items into one request, budgeted by estimated tokens
+LLM_BATCH_MODE = os.getenv("LLM_BATCH_MODE", "0") == "1"
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "3000"))
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "10"))
+BATCH_OUTPUT_TOKENS_PER_ITEM = 200
+BATCH_CONTENT_CHARS = 1500
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -44,6 +58,49 @@ JSON структура:
 }
 """
 
+# One-pass prompt: relevance + translation + summary + impact in a single request
+PIPELINE_PROMPT = """
+Вы — «ИИ-редактор новостей», профессиональный технологический журналист.
+За один проход обработайте сырую новость:
+1. Определите, относится ли она к ИИ, стартапам или IT-технологиям (поле "relevant").
+2. Переведите заголовок на русский язык. Имена компаний, продуктов и моделей (например, GPT-4, OpenAI) оставляйте в оригинале.
+3. Напишите заметку на русском языке:
+   - Если impact >= 4: развернуто (100-120 слов).
+   - Если impact <= 3: кратко (40-60 слов).
+4. Оцените значимость новости для индустрии (impact от 1 до 5).
+Тон: Профессиональный, объективный, без лишнего хайпа.
+Выходной формат: ТОЛЬКО чистый JSON.
+
+JSON структура:
+{
+  "relevant": true,
+  "title": "Краткий и цепляющий заголовок на русском",
+  "summary": "Основной текст новости на русском",
+  "why": "Почему это важно для индустрии (до 25 слов)",
+  "impact": 1-5
+}
+"""
+
+# Batch prompt for digest-grade items: many items in, one JSON document out
+BATCH_PROMPT = """
+Вы — «ИИ-редактор новостей», профессиональный технологический журналист.
+На входе JSON-массив новостей вида {"id": ..., "title": ..., "content": ...}.
+Для КАЖДОЙ новости:
+1. Определите, относится ли она к ИИ, стартапам или IT-технологиям (поле "relevant").
+2. Переведите заголовок на русский язык. Имена компаний, продуктов и моделей оставляйте в оригинале.
+3. Напишите краткую заметку на русском языке (40-60 слов).
+4. Оцените значимость новости для индустрии (impact от 1 до 5).
+Тон: Профессиональный, объективный, без лишнего хайпа.
+Выходной формат: ТОЛЬКО чистый JSON. Сохраните "id" каждой новости без изменений.
+
+JSON структура:
+{
+  "items": [
+    {"id": 0, "relevant": true, "title": "...", "summary": "...", "why": "...", "impact": 1-5}
+  ]
+}
+"""
+
 TRANSLATION_PROMPT = """
 Вы — профессиональный переводчик технических текстов. 
 Переведите следующий текст на русский язык. 
@@ -59,13 +116,24 @@ FILTER_PROMPT = """
 Ответьте только "relevant" или "not_relevant".
 """
 
-async def call_openrouter(prompt: str, content: str, json_mode: bool = False, retries: int = 3) -> Optional[str]:
-    """Helper to call OpenRouter API with exponential backoff."""
+async def call_openrouter(prompt: str, content: str, json_mode: bool = False, retries: int = 3,
+                          priority: int = 0, use_cache: bool = True) -> Optional[str]:
+    """
+    Helper to call OpenRouter API with exponential backoff.
+    Answers are memoized in the persistent LLM cache; misses go through the
+    shared dispatcher (concurrency + rate limit), lower `priority` values first.
+    """
+    cache_key = llm_cache.make_key(OPENROUTER_MODEL, prompt, content, json_mode) if use_cache else None
+    if cache_key:
+        cached = await llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     if not OPENROUTER_API_KEY:
         logger.error("OPENROUTER_API_KEY not found")
         return None
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    url = OPENROUTER_URL
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
@@ -87,24 +155,41 @@ async def call_openrouter(prompt: str, content: str, json_mode: bool = False, re
 
     for attempt in range(retries):
         try:
-            async with httpx.AsyncClient(timeout=45.0) as client:
-                response = await client.post(url, json=data, headers=headers)
-                
-                if response.status_code == 429: # Rate limit
-                    wait_time = (attempt + 1) * 5
-                    logger.warning(f"Rate limited. Waiting {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                    continue
-                    
-                response.raise_for_status()
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
+            async with dispatcher.slot(priority):
+                async with httpx.AsyncClient(timeout=45.0) as client:
+                    response = await client.post(url, json=data, headers=headers)
+
+            if response.status_code == 429: # Rate limit
+                wait_time = parse_retry_after(response.headers.get("Retry-After"))
+                if wait_time is None:
+                    wait_time = 5 * 2 ** attempt
+                logger.warning(f"Rate limited. Waiting {wait_time:.0f}s...")
+                dispatcher.retry_after(wait_time)
+                continue
+
+            response.raise_for_status()
+            result = response.json()
+            answer = result["choices"][0]["message"]["content"]
+            if cache_key and is_cacheable(answer, json_mode):
+                await llm_cache.put(cache_key, answer)
+            return answer
         except Exception as e:
             logger.error(f"OpenRouter API error (attempt {attempt+1}/{retries}): {e}")
             if attempt < retries - 1:
                 await asyncio.sleep((attempt + 1) * 2)
     return None
 
+def is_cacheable(answer: Optional[str], json_mode: bool) -> bool:
+    """Only keep usable answers: non-empty, and valid JSON when JSON was requested."""
+    if not answer or not answer.strip():
+        return False
+    if json_mode:
+        try:
+            json.loads(answer)
+        except ValueError:
+            return False
+    return True
+
 def clean_text(text: str) -> str:
     """Clean HTML and limit length."""
     if not text: return ""
@@ -113,74 +198,224 @@ def clean_text(text: str) -> str:
     clean = re.sub(r'\s+', ' ', clean).strip()
     return clean[:4000]
 
-def detect_language(text: str) -> str:
-    """Detect language."""
-    if not text or len(text.strip()) < 10: return "unknown"
-    try:
-        langs = detect_langs(text)
-        if langs and langs[0].prob >= 0.9:
-            return langs[0].lang
-    except:
-        pass
-    return "unknown"
-
-async def ensure_russian_text(text: str) -> str:
-    """Translate text to Russian using LLM."""
+async def ensure_russian_text(text: str, priority: int = 0, lang: Optional[str] = None) -> str:
+    """Translate text to Russian using LLM. `lang` skips detection when already known."""
     if not text: return ""
-    if detect_language(text) == "ru":
+    if (lang or detect_language(text)) == "ru":
         return text
 
     logger.info(f"Translating text via LLM: {text[:50]}...")
-    translated = await call_openrouter(TRANSLATION_PROMPT, text)
+    translated = await call_openrouter(TRANSLATION_PROMPT, text, priority=priority)
     return translated.strip() if translated else text
 
-async def filter_relevant_news(news_item: Dict) -> bool:
+async def filter_relevant_news(news_item: NewsItem, priority: int = 0) -> bool:
     """Filter news relevance."""
     if not ENABLE_FILTERING: return True
-    text = f"Title: {news_item.get('title')}\nContent: {news_item.get('summary', '')}"
-    result = await call_openrouter(FILTER_PROMPT, text)
-    return "relevant" in result.lower() if result else True
+    text = f"Title: {news_item.title}\nContent: {news_item.summary}"
+    result = await call_openrouter(FILTER_PROMPT, text, priority=priority)
+    return result.strip().strip('"').lower() == "relevant" if result else True
+
+def parse_llm_json(response: Optional[str]) -> Optional[Dict]:
+    """Parse a JSON object answer, tolerating markdown code fences."""
+    if not response:
+        return None
+    text = response.strip()
+    if text.startswith("```"):
+        text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        logger.error("Failed to parse LLM JSON response")
+        return None
+    return data if isinstance(data, dict) else None
 
-async def process_single_item(item: Dict) -> Optional[Dict]:
-    """Process a single news item (for parallel execution)."""
+def normalize_impact(value) -> int:
     try:
-        # Translate title if needed
-        item["title"] = await ensure_russian_text(item.get("title", ""))
-        
-        # Generate summary
-        content = f"Title: {item['title']}\nRaw Content: {item.get('summary', '')}"
-        response = await call_openrouter(SUMMARY_PROMPT, content, json_mode=True)
-        
-        if response:
-            try:
-                data = json.loads(response)
-                item.update({
-                    "title": data.get("title", item["title"]),
-                    "summary": data.get("summary", ""),
-                    "why": data.get("why", ""),
-                    "impact": data.get("impact", 1),
-                    "score": item.get("score", 0) + data.get("impact", 1) * 2,
-                    "summary_lang": "ru"
-                })
-                return item
-            except:
-                logger.error("Failed to parse LLM JSON response")
-        
-        # Fallback if LLM fails
-        item["summary"] = item.get("summary", item["title"])
-        item["impact"] = 1
-        return item
+        return min(5, max(1, int(value)))
+    except (TypeError, ValueError):
+        return 1
+
+def apply_summary(item: NewsItem, data: Dict) -> NewsItem:
+    """Merge an LLM summary document into the item; its text is cleaned here, never at send time."""
+    impact = normalize_impact(data.get("impact", 1))
+    item.title = clean_html(data.get("title")) or item.title
+    item.summary = clean_html(data.get("summary", ""))
+    item.why = data.get("why", "")
+    item.impact = impact
+    item.score += impact * 2
+    item.summary_lang = "ru"
+    return item
+
+async def process_single_item_fallback(item: NewsItem, priority: int = 0) -> Optional[NewsItem]:
+    """Step-by-step path (translate, filter, summarize) used when the combined call fails."""
+    # Translate title if needed
+    item.title = await ensure_russian_text(item.title, priority=priority, lang=item.title_lang)
+
+    if not await filter_relevant_news(item, priority=priority):
+        logger.info(f"Skipping irrelevant item: {item.title[:50]}")
+        return None
+
+    # Generate summary
+    content = f"Title: {item.title}\nRaw Content: {item.summary}"
+    data = parse_llm_json(await call_openrouter(SUMMARY_PROMPT, content, json_mode=True, priority=priority))
+    if data:
+        return apply_summary(item, data)
+
+    # Fallback if LLM fails: keep the raw summary
+    item.impact = 1
+    return item
+
+async def process_single_item(item: NewsItem, priority: int = 0) -> Optional[NewsItem]:
+    """
+    Process a single news item (for parallel execution).
+    One combined request translates, filters, summarizes and scores the item;
+    the separate translation/filter/summary calls only run if its answer is unusable.
+    Returns None for items the model marked as irrelevant, and for items deferred
+    because no answer came back at all (rate limit exhausted, API unreachable).
+    """
+    try:
+        content = f"Title: {item.title}\nRaw Content: {item.summary}"
+        response = await call_openrouter(PIPELINE_PROMPT, content, json_mode=True, priority=priority)
+        if response is None:
+            # The step-by-step calls would hit the same wall
+            logger.warning(f"LLM unavailable, deferring item to the next poll: {item.title[:50]}")
+            item.deferred = True
+            return None
+
+        data = parse_llm_json(response)
+        # An irrelevant verdict needs no summary
+        if data is not None and is_irrelevant(data):
+            logger.info(f"Skipping irrelevant item: {item.title[:50]}")
+            return None
+
+        if data is None or not data.get("summary"):
+            logger.warning(f"Combined LLM answer unusable, falling back: {item.title[:50]}")
+            return await process_single_item_fallback(item, priority=priority)
+
+        return apply_summary(item, data)
     except Exception as e:
         logger.error(f"Error processing single item: {e}")
         return None
 
-async def process_news_batch(news_items: List[Dict]) -> List[Dict]:
-    """Process a batch of news items in parallel."""
+def is_irrelevant(data: Dict) -> bool:
+    return ENABLE_FILTERING and data.get("relevant", True) in (False, "false", "no")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+def batch_entry(index: int, item: NewsItem) -> Dict:
+    return {
+        "id": index,
+        "title": item.title,
+        "content": item.summary[:BATCH_CONTENT_CHARS]
+    }
+
+def pack_batches(news_items: List[NewsItem], token_budget: int = None, max_items: int = None) -> List[List[NewsItem]]:
+    """Greedily pack items into batches that fit the token budget (input plus expected output)."""
+    token_budget = token_budget or LLM_BATCH_TOKEN_BUDGET
+    max_items = max_items or LLM_BATCH_MAX_ITEMS
+    budget_left = token_budget - estimate_tokens(BATCH_PROMPT)
+
+    batches = []
+    current, used = [], 0
+    for item in news_items:
+        cost = estimate_tokens(json.dumps(batch_entry(0, item), ensure_ascii=False)) + BATCH_OUTPUT_TOKENS_PER_ITEM
+        if current and (used + cost > budget_left or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+async def summarize_batch(batch: List[NewsItem], priority: int = 0) -> Dict[int, Dict]:
+    """
+    Summarize several items in one request.
+    Returns results by batch index; items the model dropped or mangled are left out.
+    Irrelevant verdicts are kept even without a title or summary.
+    Returns None when no answer came back at all.
+    """
+    content = json.dumps([batch_entry(i, item) for i, item in enumerate(batch)], ensure_ascii=False)
+    response = await call_openrouter(BATCH_PROMPT, content, json_mode=True, priority=priority)
+    if response is None:
+        return None
+    data = parse_llm_json(response)
+    if not data or not isinstance(data.get("items"), list):
+        return {}
+
+    results = {}
+    for entry in data["items"]:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            index = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < len(batch) and (is_irrelevant(entry) or (entry.get("summary") and entry.get("title"))):
+            results[index] = entry
+    return results
+
+async def process_batch(batch: List[NewsItem], priority: int = 0) -> List[Optional[NewsItem]]:
+    """
+    Process one packed batch. Items missing from the answer are retried on their own,
+    as are items scored impact >= 4 so breaking news gets the full-length write-up.
+    If the request got no answer at all, the whole batch is deferred to the next poll.
+    """
+    results = await summarize_batch(batch, priority=priority)
+    if results is None:
+        logger.warning(f"LLM unavailable, deferring a batch of {len(batch)} items to the next poll")
+        for item in batch:
+            item.deferred = True
+        return []
+    processed = []
+    retry = []
+    for index, item in enumerate(batch):
+        data = results.get(index)
+        if data is not None and is_irrelevant(data):
+            logger.info(f"Skipping irrelevant item: {item.title[:50]}")
+        elif data is None or normalize_impact(data.get("impact", 1)) >= 4:
+            retry.append(item)
+        else:
+            processed.append(apply_summary(item, data))
+
+    if retry:
+        logger.info(f"Batch of {len(batch)}: retrying {len(retry)} items individually")
+        processed.extend(await asyncio.gather(*[process_single_item(item, priority=priority) for item in retry]))
+    return processed
+
+def item_priority(item: NewsItem) -> float:
+    """Dispatcher priority of an item: heavier sources (likely breaking news) go first."""
+    return -source_weights.get(item.source_id)
+
+async def process_news_batch(news_items: List[NewsItem], batch_mode: Optional[bool] = None) -> List[NewsItem]:
+    """
+    Process a batch of news items in parallel (bounded by the LLM dispatcher).
+    In batch mode items are packed several per request instead of one request each.
+    """
     if not news_items: return []
+    if batch_mode is None:
+        batch_mode = LLM_BATCH_MODE
+
+    if batch_mode:
+        prioritized = sorted(((item_priority(item), item) for item in news_items), key=lambda p: p[0])
+        by_priority: Dict[float, List[NewsItem]] = {}
+        for priority, item in prioritized:
+            by_priority.setdefault(priority, []).append(item)
+        tasks = [
+            process_batch(batch, priority=priority)
+            for priority, items in by_priority.items()
+            for batch in pack_batches(items)
+        ]
+        logger.info(f"Processing {len(news_items)} items in {len(tasks)} batched requests...")
+        results = [r for batch_results in await asyncio.gather(*tasks) for r in batch_results]
+    else:
+        logger.info(f"Processing {len(news_items)} items in parallel...")
+        tasks = [process_single_item(item, priority=item_priority(item)) for item in news_items]
+        results = await asyncio.gather(*tasks)
     
-    logger.info(f"Processing {len(news_items)} items in parallel...")
-    tasks = [process_single_item(item) for item in news_items]
-    results = await asyncio.gather(*tasks)
-    
+    logger.info(f"LLM cache: {llm_cache.stats_line()}")
+
     # Filter out None results
     return [r for r in results if r is not None]
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from app.common import normalize_url
+
+
+def parse_published(value) -> Optional[datetime]:
+    """
+    Publication time as an aware UTC datetime, from an RFC 822 date (RSS),
+    an ISO 8601 one (Atom, JSON feeds) or a datetime. None when missing or unparseable.
+    """
+    if isinstance(value, datetime):
+        published = value
+    elif not value:
+        return None
+    else:
+        text = str(value).strip()
+        try:
+            published = datetime.fromisoformat(text)
+        except ValueError:
+            try:
+                published = parsedate_to_datetime(text)
+            except (TypeError, ValueError):
+                return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published.astimezone(timezone.utc)
+
+
+class NewsItem:
+    """
+    One fetched entry on its way through the pipeline: built by the parsers,
+    cleaned by normalize_item, filled in by the LLM stage and stored by the summarizer.
+    `published` is parsed and the URL's dedup key (url_key) derived once, at construction;
+    `url` itself stays the link as published.
+    """
+
+    __slots__ = (
+        # From the feed
+        "url", "title", "summary", "source_id", "lang", "published", "guid", "stars", "language",
+        # Derived from the feed fields
+        "url_key",
+        # Set by normalize_item
+        "title_lang", "normalized",
+        # Set by the LLM stage and on insert
+        "score", "impact", "why", "summary_lang", "id",
+        # Set when the LLM could not be reached; the entry is retried on the next poll
+        "deferred",
+    )
+
+    def __init__(self, url: str, title: str, source_id: str, lang: str, summary: str = "",
+                 published=None, guid: str = "", stars: int = 0, language: str = ""):
+        self.url = (url or "").strip()
+        self.url_key = normalize_url(url)
+        self.title = title or ""
+        self.summary = summary or ""
+        self.source_id = source_id
+        self.lang = lang
+        self.published = parse_published(published)
+        self.guid = guid or ""
+        self.stars = stars
+        self.language = language
+        self.title_lang = None
+        self.normalized = False
+        self.score = 0.0
+        self.impact = 1
+        self.why = ""
+        self.summary_lang = None
+        self.id = None
+        self.deferred = False
+
+    def __repr__(self):
+        return f"NewsItem({self.source_id!r}, {self.url!r}, {self.title[:40]!r})"
+
+    def to_row(self) -> Dict:
+        """Column values for db.add_news_items; `published` in the processed_at format (UTC)."""
+        return {
+            "url": self.url,
+            "url_key": self.url_key,
+            "title": self.title,
+            "source_id": self.source_id,
+            "published": self.published.strftime("%Y-%m-%d %H:%M:%S") if self.published else None,
+            "score": self.score,
+            "impact": self.impact,
+            "summary": self.summary,
+            "summary_lang": self.summary_lang or "unknown",
+        }
@@ -0,0 +1,199 @@
+import os
+import time
+import difflib
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from app.db import load_recent_titles, add_recent_titles
+from app.models import NewsItem
+
+logger = logging.getLogger(__name__)
+
+# Same similarity rule as the old pairwise check: difflib ratio of lowercased titles
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+NEAR_DUP_WINDOW_HOURS = float(os.getenv("NEAR_DUP_WINDOW_HOURS", "48"))
+
+# MinHash signature: SIGNATURE_SIZE slots split into bands of BAND_ROWS rows
+SIGNATURE_SIZE = 24
+BAND_ROWS = 3
+SHINGLE_SIZE = 3
+
+_MASK64 = (1 << 64) - 1
+_EMPTY = 1 << 64
+_MIX = 0x9E3779B97F4A7C15
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+def minhash_signature(title: str) -> List[int]:
+    """
+    One-permutation MinHash over character shingles: each shingle hash lands in one
+    of SIGNATURE_SIZE bins and every bin keeps its minimum, so a signature costs
+    one hash per shingle. Empty bins borrow from the next filled one (densification).
+    Signatures use Python's per-process string hash and are never persisted.
+    """
+    text = normalize_title(title)
+    signature = [_EMPTY] * SIGNATURE_SIZE
+    for i in range(max(1, len(text) - SHINGLE_SIZE + 1)):
+        h = (hash(text[i:i + SHINGLE_SIZE]) * _MIX) & _MASK64
+        slot = h % SIGNATURE_SIZE
+        value = h >> 5
+        if value < signature[slot]:
+            signature[slot] = value
+
+    for i in range(SIGNATURE_SIZE):
+        if signature[i] != _EMPTY:
+            continue
+        for offset in range(1, SIGNATURE_SIZE):
+            donor = signature[(i + offset) % SIGNATURE_SIZE]
+            if donor != _EMPTY:
+                signature[i] = donor + offset
+                break
+        else:
+            signature[i] = 0
+    return signature
+
+
+def band_keys(signature: List[int]):
+    for band, start in enumerate(range(0, SIGNATURE_SIZE, BAND_ROWS)):
+        yield band, hash(tuple(signature[start:start + BAND_ROWS]))
+
+
+def is_similar(title1: str, title2: str, threshold: float = NEAR_DUP_THRESHOLD) -> bool:
+    """Check if two normalized titles are similar enough to be considered duplicates"""
+    if not title1 or not title2:
+        return False
+    matcher = difflib.SequenceMatcher(None, title1, title2)
+    return (matcher.real_quick_ratio() >= threshold
+            and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of recent titles across all sources.
+    A lookup only verifies titles that share at least one signature band with
+    the new one, instead of comparing against every title seen so far.
+    Titles older than the time window are forgotten.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, window_hours: float = NEAR_DUP_WINDOW_HOURS,
+                 persist: bool = True):
+        self.threshold = threshold
+        self.window = window_hours * 3600
+        self.persist = persist
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(SIGNATURE_SIZE // BAND_ROWS)]
+        self._entries: Dict[int, Tuple[str, List[Tuple[int, int]], float, str]] = {}
+        self._order = deque()
+        self._next_id = 0
+        self._loaded = not persist
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            rows = load_recent_titles(time.time() - self.window)
+        except Exception as e:
+            logger.error(f"Failed to load recent titles: {e}")
+            return
+        for title, source_id, created_at in rows:
+            self.add(title, source_id, created_at)
+        logger.info(f"Loaded {len(rows)} recent titles for near-duplicate detection")
+
+    def add(self, title: str, source_id: str = "unknown", created_at: Optional[float] = None):
+        normalized = normalize_title(title)
+        keys = list(band_keys(minhash_signature(normalized)))
+        self._insert(normalized, keys, source_id, created_at or time.time())
+
+    def _insert(self, normalized: str, keys, source_id: str, created_at: float):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (normalized, keys, created_at, source_id)
+        self._order.append((created_at, entry_id))
+        for band, key in keys:
+            self._buckets[band].setdefault(key, []).append(entry_id)
+
+    def expire(self, now: Optional[float] = None):
+        """Forget titles older than the time window."""
+        cutoff = (now or time.time()) - self.window
+        while self._order and self._order[0][0] < cutoff:
+            _, entry_id = self._order.popleft()
+            _, keys, _, _ = self._entries.pop(entry_id)
+            for band, key in keys:
+                bucket = self._buckets[band].get(key)
+                if bucket:
+                    bucket.remove(entry_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+
+    def _find(self, normalized: str, keys) -> Optional[str]:
+        checked = set()
+        for band, key in keys:
+            for entry_id in self._buckets[band].get(key, ()):
+                if entry_id in checked:
+                    continue
+                checked.add(entry_id)
+                candidate = self._entries[entry_id][0]
+                if is_similar(normalized, candidate, self.threshold):
+                    return candidate
+        return None
+
+    def find(self, title: str) -> Optional[str]:
+        """Return a recent title that is a near-duplicate of `title`, if any."""
+        normalized = normalize_title(title)
+        return self._find(normalized, list(band_keys(minhash_signature(normalized))))
+
+    def filter_new(self, news_list: List[NewsItem]) -> List[NewsItem]:
+        """
+        Drop items whose title is a near-duplicate of a recent one or of an earlier
+        item in the same batch. Nothing is remembered here: record() the titles of
+        the items that end up stored.
+        """
+        self._ensure_loaded()
+        self.expire()
+
+        batch = NearDuplicateIndex(self.threshold, persist=False)
+        unique = []
+        for news in news_list:
+            title = news.title
+            if not title:
+                continue
+            normalized = normalize_title(title)
+            keys = list(band_keys(minhash_signature(normalized)))
+            duplicate_of = self._find(normalized, keys)
+            if duplicate_of is None:
+                duplicate_of = batch._find(normalized, keys)
+            if duplicate_of is not None:
+                logger.debug(f"Near-duplicate title skipped: {title[:50]} ~ {duplicate_of[:50]}")
+                continue
+            batch._insert(normalized, keys, news.source_id, 0.0)
+            unique.append(news)
+        return unique
+
+    def record(self, titles: List[Tuple[str, str]]):
+        """Remember (title, source_id) pairs of stored items for later lookups."""
+        self._ensure_loaded()
+        now = time.time()
+        added = []
+        for title, source_id in titles:
+            if not title:
+                continue
+            normalized = normalize_title(title)
+            self._insert(normalized, list(band_keys(minhash_signature(normalized))), source_id, now)
+            added.append((normalized, source_id, now))
+
+        if self.persist and added:
+            try:
+                add_recent_titles(added)
+            except Exception as e:
+                logger.error(f"Failed to store recent titles: {e}")
+
+
+near_dup_index = NearDuplicateIndex()
@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List
+from xml.etree import ElementTree
+
+import feedparser
+from bs4 import BeautifulSoup
+
+from app.common import clean_html
+from app.lang import detect_language
+from app.models import NewsItem
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes for feed parsing; 0 parses inline (debugging, tests)
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", "2"))
+# Bytes read from the network per step in streaming RSS mode
+RSS_STREAM_CHUNK_SIZE = int(os.getenv("RSS_STREAM_CHUNK_SIZE", "65536"))
+
+
+def parse_rss(content: bytes, source_id: str, lang: str) -> List[NewsItem]:
+    feed = feedparser.parse(content)
+    return [
+        NewsItem(
+            url=entry.get("link", ""),
+            title=entry.get("title", ""),
+            source_id=source_id,
+            lang=lang,
+            summary=entry.get("summary", ""),
+            published=entry.get("published", ""),
+            guid=entry.get("id", "")
+        )
+        for entry in feed.entries
+    ]
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class RSSStreamParser:
+    """
+    Incremental RSS 2.0 / RSS 1.0 / Atom parser: feed() takes body chunks and
+    returns the NewsItems completed so far, like parse_rss.
+    Finished entries are detached from the tree, so memory stays bounded by
+    one chunk and one entry whatever the feed size.
+    Raises ElementTree.ParseError on malformed XML; callers fall back to feedparser.
+    """
+
+    ENTRY_TAGS = {"item", "entry"}
+
+    def __init__(self, source_id: str, lang: str):
+        self.source_id = source_id
+        self.lang = lang
+        self._parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self._open = []
+
+    def feed(self, chunk: bytes) -> List[NewsItem]:
+        self._parser.feed(chunk)
+        return self._read_entries()
+
+    def close(self) -> List[NewsItem]:
+        self._parser.close()
+        return self._read_entries()
+
+    def _read_entries(self) -> List[NewsItem]:
+        entries = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                self._open.append(elem)
+                continue
+            self._open.pop()
+            if _local_name(elem.tag) in self.ENTRY_TAGS:
+                entries.append(self._entry(elem))
+                if self._open:
+                    self._open[-1].remove(elem)
+        return entries
+
+    def _entry(self, elem) -> NewsItem:
+        fields = {}
+        for child in elem:
+            name = _local_name(child.tag)
+            if name == "link" and child.get("href"):
+                # Atom: <link rel="alternate" href="..."/>
+                if child.get("rel", "alternate") == "alternate":
+                    fields.setdefault("link", child.get("href"))
+            else:
+                fields.setdefault(name, "".join(child.itertext()).strip())
+        return NewsItem(
+            url=fields.get("link", ""),
+            title=fields.get("title", ""),
+            source_id=self.source_id,
+            lang=self.lang,
+            summary=fields.get("description") or fields.get("summary", ""),
+            published=fields.get("pubDate") or fields.get("published") or fields.get("date", ""),
+            guid=fields.get("guid") or fields.get("id", "")
+        )
+
+
+def parse_github_trending(content: bytes, source_id: str, lang: str) -> List[NewsItem]:
+    soup = BeautifulSoup(content.decode("utf-8", errors="replace"), "html.parser")
+    result = []
+    for repo in soup.select("article.Box-row"):
+        repo_name = repo.h2.a.text.strip().replace("\n", "")
+
+        stars = 0
+        stars_element = repo.select_one(".mr-3 svg[aria-label='star']")
+        if stars_element and stars_element.parent:
+            stars_text = stars_element.parent.text.strip()
+            match = re.search(r'([\d,]+)', stars_text)
+            if match:
+                stars = int(match.group(1).replace(',', ''))
+
+        description = ""
+        if repo.p:
+            description = repo.p.text.strip()
+
+        language = ""
+        lang_element = repo.select_one("[itemprop='programmingLanguage']")
+        if lang_element:
+            language = lang_element.text.strip()
+
+        result.append(NewsItem(
+            url="https://github.com" + repo.h2.a["href"],
+            title=repo_name,
+            source_id=source_id,
+            lang=lang,
+            summary=description,
+            published=datetime.now(timezone.utc),
+            stars=stars,
+            language=language
+        ))
+    return result
+
+
+def parse_json_feed(content: bytes, source_id: str, lang: str) -> List[NewsItem]:
+    # JSON Feed structure: { "items": [ { "title": "...", "url": "...", ... } ] }
+    items = json.loads(content).get("items", [])
+    return [
+        NewsItem(
+            url=item.get("url", item.get("id", "")),
+            title=item.get("title", ""),
+            source_id=source_id,
+            lang=lang,
+            summary=item.get("summary", item.get("content_text", "")),
+            published=item.get("date_published", ""),
+            guid=str(item.get("id", ""))
+        )
+        for item in items if item.get("title") or item.get("url")
+    ]
+
+
+def parse_taaft(content: bytes, source_id: str, lang: str) -> List[NewsItem]:
+    return [
+        NewsItem(
+            url=entry.get("url", ""),
+            title=entry.get("name", ""),
+            source_id=source_id,
+            lang=lang,
+            summary=entry.get("description", ""),
+            published=entry.get("published_at", "")
+        )
+        for entry in json.loads(content)
+    ]
+
+
+PARSERS = {
+    "rss": parse_rss,
+    "scrap": parse_github_trending,
+    "json_feed": parse_json_feed,
+    "api": parse_taaft,
+}
+
+
+def normalize_item(item: NewsItem) -> NewsItem:
+    """
+    Strip HTML from title/summary and record the detected title language.
+    Sets item.normalized so later stages (and repeated calls) skip the work.
+    """
+    if item.normalized:
+        return item
+    item.title = clean_html(item.title)
+    item.summary = clean_html(item.summary)
+    item.title_lang = detect_language(item.title)
+    item.normalized = True
+    return item
+
+
+def normalize_items(items: List[NewsItem]) -> List[NewsItem]:
+    return [normalize_item(item) for item in items]
+
+
+def parse_feed(feed_type: str, content: bytes, source_id: str, lang: str) -> List[NewsItem]:
+    """
+    Parse a raw feed body into NewsItem records. Runs in a worker process.
+    Text is left as is: only entries that pass the seen-entry filter get normalized.
+    """
+    return PARSERS[feed_type](content, source_id, lang)
+
+
+def parse_and_normalize(feed_type: str, content: bytes, source_id: str, lang: str) -> List[NewsItem]:
+    """Parse a raw feed body into NewsItem records with cleaned text."""
+    return normalize_items(parse_feed(feed_type, content, source_id, lang))
+
+
+class ParsePool:
+    """Process pool for CPU-bound parsing so the event loop only does I/O."""
+
+    def __init__(self, workers: int = PARSE_POOL_WORKERS):
+        self.workers = workers
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def parse(self, feed_type: str, content: bytes, source_id: str, lang: str) -> List[NewsItem]:
+        if self.workers <= 0:
+            return parse_feed(feed_type, content, source_id, lang)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), parse_feed,
+                                          feed_type, content, source_id, lang)
+
+    async def normalize(self, items: List[NewsItem]) -> List[NewsItem]:
+        """Normalize parsed items (HTML cleanup, title language) in the pool."""
+        if self.workers <= 0 or not items:
+            return normalize_items(items)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), normalize_items, items)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+parse_pool = ParsePool()
@@ -0,0 +1,93 @@
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+from app.db import get_seen_entry_history
+
+logger = logging.getLogger(__name__)
+
+ADAPTIVE_SCHEDULING = os.getenv("ADAPTIVE_SCHEDULING", "1") == "1"
+# Upper bound for sources without `max_interval` in config (minutes)
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL_MINUTES", "120"))
+# Aim for about this many new entries per poll
+POLL_TARGET_NEW_ITEMS = float(os.getenv("POLL_TARGET_NEW_ITEMS", "1"))
+POLL_HISTORY_DAYS = int(os.getenv("POLL_HISTORY_DAYS", "7"))
+# Weight of the latest poll in the moving average of the publish rate
+RATE_ALPHA = 0.3
+# Random spread of each run, as a share of the interval
+JITTER_SHARE = 0.1
+
+
+class SourceCadence:
+    def __init__(self, rate: Optional[float] = None):
+        self.rate = rate            # new entries per minute (EWMA), None until known
+        self.interval = None        # effective interval in minutes
+        self.last_poll = None       # monotonic time of the previous poll
+
+
+class PollIntervals:
+    """
+    Learns each source's publish cadence and derives its poll interval.
+    The rate is seeded from seen_entries history and updated after every poll
+    (unchanged feeds count as zero new entries). The interval is the time
+    expected to produce POLL_TARGET_NEW_ITEMS, clamped to the source's bounds:
+    `interval` from config is the floor, `max_interval` (or POLL_MAX_INTERVAL) the ceiling.
+    """
+
+    def __init__(self, enabled: bool = ADAPTIVE_SCHEDULING, target: float = POLL_TARGET_NEW_ITEMS,
+                 max_interval: float = POLL_MAX_INTERVAL):
+        self.enabled = enabled
+        self.target = target
+        self.max_interval = max_interval
+        self._sources: Dict[str, SourceCadence] = {}
+
+    def load_history(self, days: int = POLL_HISTORY_DAYS):
+        try:
+            history = get_seen_entry_history(days)
+        except Exception as e:
+            logger.error(f"Failed to load publish history: {e}")
+            return
+        for source_id, (new_entries, minutes) in history.items():
+            self._sources[source_id] = SourceCadence(new_entries / minutes)
+        logger.info(f"Loaded publish history for {len(history)} sources")
+
+    def bounds(self, config: Dict):
+        low = float(config.get("interval", 60))
+        high = max(low, float(config.get("max_interval", self.max_interval)))
+        return low, high
+
+    def interval(self, source_id: str, config: Dict) -> float:
+        """Effective poll interval in minutes."""
+        low, high = self.bounds(config)
+        if not self.enabled:
+            return low
+        state = self._sources.setdefault(source_id, SourceCadence())
+        if state.rate is None:
+            interval = low
+        elif state.rate <= 0:
+            interval = high
+        else:
+            interval = min(high, max(low, self.target / state.rate))
+        state.interval = interval
+        return interval
+
+    def observe(self, source_id: str, config: Dict, new_entries: int) -> float:
+        """Record one poll and return the updated interval."""
+        state = self._sources.setdefault(source_id, SourceCadence())
+        now = time.monotonic()
+        if state.last_poll is not None:
+            observed = new_entries / max((now - state.last_poll) / 60, 1e-6)
+            state.rate = observed if state.rate is None else RATE_ALPHA * observed + (1 - RATE_ALPHA) * state.rate
+        # The first poll in a process has no elapsed time and may be a whole-feed backfill
+        state.last_poll = now
+        return self.interval(source_id, config)
+
+    def effective(self, source_id: str) -> Optional[float]:
+        state = self._sources.get(source_id)
+        return state.interval if state else None
+
+    @staticmethod
+    def jitter(interval: float) -> int:
+        """Seconds of random spread for a job running every `interval` minutes."""
+        return int(interval * 60 * JITTER_SHARE)
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable
+
+from app import async_db
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of IDs claimed in one round
+PUBLISH_BATCH = 20
+# Sweep the database for unsent breaking news this often, however busy the queue is
+BACKLOG_SWEEP_SECONDS = 600
+# A failed send is retried after this delay, doubled per failure; past the sweep interval the sweep takes over
+RETRY_SECONDS = 30
+
+
+class Publisher:
+    """
+    Single task that publishes breaking news.
+    Ingestion submits IDs of newly stored high-impact items; the publisher claims
+    them in the database (sent 0 -> 2) before sending, so a row can only be
+    sent by whoever claimed it, then marks it sent (-> 1) or releases it (-> 0).
+    Released IDs come back through the queue with a backoff; a periodic sweep of
+    the database catches everything else.
+    """
+
+    def __init__(self, send: Callable[[Dict], Awaitable[bool]],
+                 sweep_seconds: float = BACKLOG_SWEEP_SECONDS, retry_seconds: float = RETRY_SECONDS):
+        self.send = send
+        self.sweep_seconds = sweep_seconds
+        self.retry_seconds = retry_seconds
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._failures: Dict[int, int] = {}
+        self._task = None
+
+    def submit(self, news_ids: Iterable[int]):
+        for news_id in news_ids:
+            self.queue.put_nowait(news_id)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        # Catch up on breaking news stored before this process started
+        await self.publish_backlog()
+        next_sweep = loop.time() + self.sweep_seconds
+        while True:
+            timeout = next_sweep - loop.time()
+            if timeout <= 0:
+                await self.publish_backlog()
+                next_sweep = loop.time() + self.sweep_seconds
+                continue
+            try:
+                news_ids = [await asyncio.wait_for(self.queue.get(), timeout)]
+            except asyncio.TimeoutError:
+                continue
+            while not self.queue.empty() and len(news_ids) < PUBLISH_BATCH:
+                news_ids.append(self.queue.get_nowait())
+            try:
+                rows = await async_db.claim_news(news_ids)
+                await self.publish(rows)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Publisher failed on {news_ids}: {e}")
+
+    async def publish_backlog(self) -> int:
+        """Claim and send unsent breaking news straight from the database."""
+        try:
+            rows = await async_db.claim_unsent_breaking_news()
+        except Exception as e:
+            logger.error(f"Failed to load breaking news backlog: {e}")
+            return 0
+        return await self.publish(rows)
+
+    async def publish(self, rows) -> int:
+        """Send claimed rows in order; rows that fail to send are released and retried later."""
+        sent_count = 0
+        try:
+            for news in rows:
+                try:
+                    sent = await self.send(news)
+                except Exception as e:
+                    logger.error(f"Failed to send news {news['id']}: {e}")
+                    sent = False
+                if sent:
+                    sent_count += 1
+                    self._failures.pop(news['id'], None)
+                else:
+                    await async_db.release_news([news['id']])
+                    self._retry_later(news['id'])
+        except asyncio.CancelledError:
+            # Only still-claimed rows are affected, already sent ones stay sent
+            await async_db.release_news([row['id'] for row in rows])
+            raise
+        return sent_count
+
+    def _retry_later(self, news_id: int):
+        failures = self._failures.get(news_id, 0) + 1
+        delay = self.retry_seconds * 2 ** (failures - 1)
+        if delay >= self.sweep_seconds:
+            # Left to the periodic sweep from here on
+            self._failures.pop(news_id, None)
+            return
+        self._failures[news_id] = failures
+        asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, news_id)
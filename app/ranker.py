@@ -1,7 +1,43 @@
+import logging
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Dict, List, Optional
+
+from app.db import get_source_weights, FRESHNESS_WINDOW_HOURS
+from app.learned_weights import LEARNED_WEIGHTS
+from app.models import NewsItem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE_WEIGHT = 1.0
+
+
+class SourceWeights:
+    """
+    In-memory copy of the source weights: the learned ones where known,
+    sources.weight otherwise. Loaded on first use and reloaded by refresh()
+    after /toggle or a weight update, so scoring never opens a connection per item.
+    """
+
+    def __init__(self, learned: bool = LEARNED_WEIGHTS):
+        self.learned = learned
+        self._weights: Optional[Dict[str, float]] = None
+
+    def refresh(self):
+        self._weights = {source_id: float(weight)
+                         for source_id, weight in get_source_weights(learned=self.learned).items()}
+        logger.info(f"Loaded weights of {len(self._weights)} sources")
+
+    def snapshot(self) -> Dict[str, float]:
+        if self._weights is None:
+            self.refresh()
+        return self._weights
+
+    def get(self, source_id: str) -> float:
+        return self.snapshot().get(source_id, DEFAULT_SOURCE_WEIGHT)
+
+
+source_weights = SourceWeights()
 
-from app.db import get_source_weight
 
 def compute_hours_old(published: datetime) -> float:
 
@@ -12,17 +48,28 @@ def compute_hours_old(published: datetime) -> float:
     delta = now - published
     return delta.total_seconds() / 3600
 
+def freshness_bonus(published: Optional[datetime]) -> float:
+    """Decays linearly to zero over FRESHNESS_WINDOW_HOURS; mirrored by db.RANK_SQL at send selection."""
+    if published is None:
+        return 0.0
+    return max(0.0, FRESHNESS_WINDOW_HOURS - compute_hours_old(published))
+
 def compute_score(url: str, title: str, source_id: str, published: datetime, stars: Optional[int] = 0,
                   upvotes: Optional[int] = 0) -> float:
     stars_val = float(stars or 0)
     upvotes_val = float(upvotes or 0)
     base = stars_val + upvotes_val
 
-    source_weight: Optional[int] = get_source_weight(source_id)
-    sw_value = 1 if source_weight is None else float(source_weight)
-
-    hours_old = compute_hours_old(published)
-    freshness_bonus = max(0.0, 48.0 - hours_old)
+    score = base + source_weights.get(source_id) + freshness_bonus(published)
+    return round(score, 2)
 
-    score = base + sw_value + freshness_bonus
-    return round(score, 2)
\ No newline at end of file
+def score_items(items: List[NewsItem]) -> List[NewsItem]:
+    """
+    Static part of the score for a whole batch: engagement plus source weight,
+    from one weights snapshot. The LLM stage adds impact on top; freshness is
+    not stored but applied when unsent news is selected, so it reflects send time.
+    """
+    weights = source_weights.snapshot()
+    for item in items:
+        item.score = float(item.stars or 0) + weights.get(item.source_id, DEFAULT_SOURCE_WEIGHT)
+    return items
@@ -0,0 +1,128 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from app import async_db
+from app.db import (
+    AUTO_VACUUM_INCREMENTAL, delete_old_news_batch, delete_orphan_reactions_batch, delete_expired_rows_batch,
+    enable_incremental_vacuum, get_storage_stats, incremental_vacuum, optimize,
+)
+
+logger = logging.getLogger(__name__)
+
+# News, their reactions, near-duplicate titles and send keys are kept this long
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
+# Seen feed entries are kept longer so entries lingering in a feed are not re-ingested; 0 keeps them forever
+SEEN_RETENTION_DAYS = int(os.getenv("SEEN_RETENTION_DAYS", "180"))
+# Each delete runs in its own write transaction, sized to hold the write lock about this long
+RETENTION_BATCH_MS = float(os.getenv("RETENTION_BATCH_MS", "5"))
+RETENTION_PAUSE = float(os.getenv("RETENTION_PAUSE", "0.05"))
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 2000
+# Free pages returned to the filesystem per incremental vacuum step
+VACUUM_STEP_PAGES = 256
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+class Retention:
+    """
+    Removes expired rows in small write transactions on the bulk DB thread,
+    pausing between them so reaction callbacks and sends never wait long for the lock.
+    The batch size adapts to keep each transaction near RETENTION_BATCH_MS.
+    Daily rollups are left as they are, so statistics cover removed news too.
+    A database created before incremental auto-vacuum gets its one full VACUUM
+    here, after the deletes, rather than at startup.
+    """
+
+    def __init__(self, days: int = RETENTION_DAYS, seen_days: int = SEEN_RETENTION_DAYS,
+                 batch_ms: float = RETENTION_BATCH_MS, pause: float = RETENTION_PAUSE):
+        self.days = days
+        self.seen_days = seen_days
+        self.batch_ms = batch_ms
+        self.pause = pause
+        self.batch_size = 100
+        self.batches = 0
+        self.longest_batch_ms = 0.0
+        self.last_report: Optional[Dict[str, int]] = None
+        self._lock = asyncio.Lock()
+
+    async def _batch(self, func, *args):
+        result, elapsed = await async_db.run_db_bulk(_timed, func, *args, self.batch_size)
+        self.batches += 1
+        self.longest_batch_ms = max(self.longest_batch_ms, elapsed)
+        if elapsed > self.batch_ms:
+            self.batch_size = max(MIN_BATCH_SIZE, self.batch_size // 2)
+        elif elapsed < self.batch_ms / 4:
+            self.batch_size = min(MAX_BATCH_SIZE, self.batch_size * 2)
+        await asyncio.sleep(self.pause)
+        return result
+
+    async def run(self) -> Optional[Dict[str, int]]:
+        """One retention pass. Returns the removed row counts and bytes reclaimed, or None if a pass is running."""
+        if self._lock.locked():
+            return None
+        async with self._lock:
+            return await self._run()
+
+    async def _run(self) -> Dict[str, int]:
+        self.batches = 0
+        self.longest_batch_ms = 0.0
+        before = await async_db.run_db_bulk(get_storage_stats)
+        cutoff = time.time() - self.days * 86400
+        report = dict.fromkeys(
+            ("news", "reactions", "orphan_reactions", "seen_entries", "title_index", "outbound_messages"), 0
+        )
+
+        while True:
+            news, reactions = await self._batch(delete_old_news_batch, cutoff)
+            if not news:
+                break
+            report["news"] += news
+            report["reactions"] += reactions
+
+        # Reactions left behind by earlier unbatched cleanups
+        after_id = 0
+        while after_id is not None:
+            removed, after_id = await self._batch(delete_orphan_reactions_batch, after_id)
+            report["orphan_reactions"] += removed
+
+        cutoffs = {"title_index": cutoff, "outbound_messages": cutoff}
+        if self.seen_days > 0:
+            cutoffs["seen_entries"] = time.time() - self.seen_days * 86400
+        for table, table_cutoff in cutoffs.items():
+            while True:
+                removed = await self._batch(delete_expired_rows_batch, table, table_cutoff)
+                if not removed:
+                    break
+                report[table] += removed
+
+        report["full_vacuum"] = 0
+        if before["auto_vacuum"] == AUTO_VACUUM_INCREMENTAL:
+            while await async_db.run_db_bulk(incremental_vacuum, VACUUM_STEP_PAGES):
+                await asyncio.sleep(self.pause)
+        else:
+            size_mib = before["page_count"] * before["page_size"] / 2**20
+            logger.info(f"Retention: enabling incremental auto-vacuum, one-time VACUUM of {size_mib:.1f} MiB")
+            seconds = await async_db.run_db_bulk(enable_incremental_vacuum)
+            logger.info(f"Retention: VACUUM done in {seconds:.1f}s")
+            report["full_vacuum"] = 1
+        await async_db.run_db_bulk(optimize)
+
+        after = await async_db.run_db_bulk(get_storage_stats)
+        report["bytes_reclaimed"] = (before["page_count"] - after["page_count"]) * before["page_size"]
+        self.last_report = report
+        logger.info(
+            "Retention: " + ", ".join(f"{key} {value}" for key, value in report.items())
+            + f"; {self.batches} batches, longest {self.longest_batch_ms:.1f} ms"
+        )
+        return report
+
+
+retention = Retention()
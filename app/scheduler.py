@@ -1,11 +1,13 @@
 import os
 import json
 import re
+import hashlib
 import asyncio
 import logging
 from datetime import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from pytz import timezone
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.enums import ParseMode
@@ -14,10 +16,20 @@ from app.fetchers.rss import RSSFetcher
 from app.fetchers.github import GitHubTrendingFetcher
 from app.fetchers.taaft import TAAFTFetcher
 from app.fetchers.json_feed import JSONFeedFetcher
-from app.db import init_db, add_source, get_connection, mark_as_sent, get_news_reactions, is_source_active
+from app.fetchers.http import FetcherHTTP
+from app.parsing import parse_pool
+from app.seen import SeenIndex, entry_key
+from app.poll_interval import PollIntervals
+from app.publisher import Publisher
+from app.telegram_sender import telegram_sender, DeliveryUnknown
+from app.db import init_db, add_source, is_source_active, release_stale_claims, BREAKING_IMPACT
+from app.db import close_connections
+from app import async_db
 from app.summarizer import process_news
-from app.ranker import compute_score
-from app.common import logger, get_bot, clean_html
+from app.ranker import source_weights
+from app.retention import retention
+from app.learned_weights import LEARNED_WEIGHTS, LEARNING_INTERVAL_HOURS, update_learned_weights
+from app.common import logger, get_bot
 from app.llm_processor import ensure_russian_text, detect_language
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -33,6 +45,15 @@ def load_config():
 
 scheduler = AsyncIOScheduler(timezone=timezone('Europe/Kiev'))
 
+# One pooled HTTP session shared by every fetcher (keep-alive, DNS cache, per-host caps)
+http_pool = FetcherHTTP()
+
+# Entries already processed per source, checked before any cleaning or LLM work
+seen_index = SeenIndex()
+
+# Learned per-source poll intervals
+poll_intervals = PollIntervals()
+
 FETCHER_CLASSES = {
     'rss': RSSFetcher,
     'scrap': GitHubTrendingFetcher,
@@ -40,14 +61,8 @@ FETCHER_CLASSES = {
     'json_feed': JSONFeedFetcher
 }
 
-def create_reaction_keyboard(news_id):
-    reactions = get_news_reactions(news_id)
-    likes = 0
-    dislikes = 0
-    for r in reactions:
-        if r['reaction_type'] == 'like': likes = r['count']
-        elif r['reaction_type'] == 'dislike': dislikes = r['count']
-
+def build_reaction_keyboard(news_id, likes=0, dislikes=0):
+    """Like/dislike buttons with the given counts (from the news_items counters)."""
     buttons = [[
         InlineKeyboardButton(text=f"👍 {likes}", callback_data=f"reaction:{news_id}:like"),
         InlineKeyboardButton(text=f"👎 {dislikes}", callback_data=f"reaction:{news_id}:dislike")
@@ -56,12 +71,12 @@ def create_reaction_keyboard(news_id):
 
 def format_news_item(news):
     try:
-        # news is a sqlite3.Row or dict
+        # news is a sqlite3.Row or dict; title and summary were cleaned at ingest
         news_id = news['id']
         url = news['url']
-        title = clean_html(news['title'])
+        title = news['title']
         impact = news['impact']
-        summary = clean_html(news['summary'] or "")
+        summary = news['summary'] or ""
 
         stars = "★" * impact
         if not summary or summary == title:
@@ -80,116 +95,219 @@ async def send_news_item(news):
 
     try:
         formatted_message, news_id = format_news_item(news)
-        keyboard = create_reaction_keyboard(news_id)
+        keyboard = build_reaction_keyboard(news_id, news.get('likes') or 0, news.get('dislikes') or 0)
         
-        message = await bot.send_message(
-            chat_id=CHANNEL_ID,
-            text=formatted_message,
+        message_id = await telegram_sender.send_message(
+            bot, CHANNEL_ID, formatted_message,
+            idempotency_key=f"news:{news_id}",
             parse_mode=ParseMode.MARKDOWN,
             reply_markup=keyboard
         )
-        mark_as_sent(news_id, message.message_id)
+        await async_db.mark_as_sent(news_id, message_id)
+        return True
+    except DeliveryUnknown as e:
+        # Possibly posted already: count it as sent rather than risk a duplicate
+        logger.warning(f"Delivery of news {news.get('id')} unknown, marking as sent: {e}")
+        await async_db.mark_as_sent(news['id'])
         return True
     except Exception as e:
         logger.error(f"Failed to send news item: {e}")
         return False
 
-async def send_breaking_news():
-    with get_connection() as conn:
-        cursor = conn.execute("SELECT * FROM news_items WHERE sent = 0 AND impact >= 4 ORDER BY score DESC LIMIT 20")
-        breaking_news = cursor.fetchall()
+# Single sender of breaking news, fed with IDs by ingestion
+publisher = Publisher(send_news_item)
 
-    sent_count = 0
-    for news in breaking_news:
-        if await send_news_item(news):
-            sent_count += 1
-            await asyncio.sleep(1)
-    return sent_count
+async def send_breaking_news():
+    """Send every unsent breaking news item now (admin command); claims rows like the publisher."""
+    return await publisher.publish_backlog()
 
 async def send_digest():
     bot = get_bot()
     if not bot: return 0
     from app.common import CHANNEL_ID
 
-    with get_connection() as conn:
-        cursor = conn.execute("SELECT * FROM news_items WHERE sent = 0 AND impact < 4 ORDER BY impact DESC, score DESC LIMIT 40")
-        digest_news = cursor.fetchall()
+    digest_news = await async_db.claim_unsent_digest_news()
 
     if not digest_news: return 0
 
     current_date = datetime.now().strftime("%d.%m.%Y")
     header = f"📰 *AI News Digest ({current_date})*\n\n"
     
+    # Each message carries the IDs of the items it lists
     messages = []
     current_content = header
+    current_ids = []
     
     for news in digest_news:
-        title = clean_html(news['title'])
+        title = news['title']
         url = news['url']
         stars = "★" * news['impact']
         entry = f"{stars} {title} — [Link]({url})\n\n"
         
         if len(current_content) + len(entry) > 3900:
-            messages.append(current_content)
+            messages.append((current_content, current_ids))
             current_content = header + "*(продолжение)*\n\n" + entry
+            current_ids = [news['id']]
         else:
             current_content += entry
+            current_ids.append(news['id'])
     
     if current_content:
-        messages.append(current_content)
+        messages.append((current_content, current_ids))
 
-    for msg in messages:
-        await bot.send_message(chat_id=CHANNEL_ID, text=msg, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True)
-        await asyncio.sleep(1)
-    
-    # Mark all as sent
-    for news in digest_news:
-        mark_as_sent(news['id'])
+    sent_count = 0
+    for index, (msg, news_ids) in enumerate(messages):
+        # Same items give the same key, so a retried digest never reposts a part
+        digest_key = "digest:" + hashlib.sha1(",".join(map(str, news_ids)).encode()).hexdigest()
+        try:
+            await telegram_sender.send_message(
+                bot, CHANNEL_ID, msg, idempotency_key=digest_key,
+                parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True
+            )
+        except DeliveryUnknown as e:
+            logger.warning(f"Delivery of digest part {index + 1}/{len(messages)} unknown, marking as sent: {e}")
+        except Exception as e:
+            logger.error(f"Failed to send digest part {index + 1}/{len(messages)}: {e}")
+            # Items of unsent parts go back to the queue for the next digest
+            await async_db.release_news([news_id for _, ids in messages[index:] for news_id in ids])
+            break
+        for news_id in news_ids:
+            await async_db.mark_as_sent(news_id)
+        sent_count += len(news_ids)
     
-    return len(digest_news)
+    return sent_count
+
+def fetcher_options(source_id, config):
+    """Optional fetcher arguments from a source's config: streaming, new-item cap and seen streak (RSS only)."""
+    if config['type'] != 'rss':
+        return {}
+
+    async def is_seen(item):
+        key = entry_key(item)
+        return bool(key) and await async_db.run_db_bulk(seen_index.is_seen, source_id, key)
+
+    options = {"stream": bool(config.get('stream')), "max_items": config.get('max_items'), "is_seen": is_seen}
+    if 'seen_streak' in config:
+        options["seen_streak"] = config['seen_streak']
+    return options
 
 async def process_source(source_id, config):
+    """Fetch and process one source. Returns the number of new entries, or None on error."""
     try:
         fetcher_class = FETCHER_CLASSES.get(config['type'])
-        if not fetcher_class: return
+        if not fetcher_class: return None
         
-        fetcher = fetcher_class(source_id, config['url'], config.get('lang', 'en'))
+        fetcher = fetcher_class(source_id, config['url'], config.get('lang', 'en'), http=http_pool,
+                                **fetcher_options(source_id, config))
         raw_news = await fetcher.fetch()
-        if not raw_news: return
-        
-        processed = await process_news(raw_news)
+        new_news = await async_db.run_db_bulk(seen_index.filter_new, source_id, raw_news) if raw_news else []
+        if not new_news:
+            await async_db.run_db_bulk(fetcher.commit_validator)
+            return 0
+
+        # HTML cleanup and language detection only for entries not seen before
+        new_news = await parse_pool.normalize(new_news)
+        processed = await process_news(new_news)
+        # Remember entries and ETag/Last-Modified/hash only after the items made it through the pipeline.
+        # Entries the LLM could not be reached for stay unseen, and the feed is fetched in full again.
+        deferred = [item for item in new_news if item.deferred]
+        await async_db.run_db_bulk(seen_index.mark_seen, source_id, [item for item in new_news if not item.deferred])
+        if deferred:
+            logger.warning(f"Source {source_id}: {len(deferred)} items deferred until the LLM is available")
+        else:
+            await async_db.run_db_bulk(fetcher.commit_validator)
         logger.info(f"Source {source_id}: processed {len(processed)} new items")
         
-        # Immediate send for breaking news
-        await send_breaking_news()
+        # Hand breaking news to the publisher task
+        publisher.submit(item.id for item in processed if item.impact >= BREAKING_IMPACT)
+        return len(new_news)
     except Exception as e:
         logger.error(f"Error processing source {source_id}: {e}")
+        return None
+
+def schedule_source(source_id, config):
+    """(Re)schedule the polling job of a source at its current effective interval."""
+    interval = poll_intervals.interval(source_id, config)
+    scheduler.add_job(
+        poll_source, IntervalTrigger(minutes=interval, jitter=poll_intervals.jitter(interval)),
+        id=f"fetch_{source_id}", args=[source_id, config], replace_existing=True
+    )
+
+async def poll_source(source_id, config):
+    """Scheduled job: process the source, then adapt its interval to the observed cadence."""
+    previous = poll_intervals.effective(source_id)
+    new_entries = await process_source(source_id, config)
+    if new_entries is None:
+        return
+    interval = poll_intervals.observe(source_id, config, new_entries)
+    # Only move the job when the interval changed noticeably
+    if previous is None or abs(interval - previous) > previous * 0.1:
+        job = scheduler.get_job(f"fetch_{source_id}")
+        if job:
+            job.reschedule(IntervalTrigger(minutes=interval, jitter=poll_intervals.jitter(interval)))
+            logger.info(f"Source {source_id}: poll interval {interval:.0f} min")
+
+async def process_single_source(source_id):
+    """Process one source on demand (admin command). Returns a status message."""
+    config = load_config()
+    if source_id not in config:
+        return f"Source {source_id} not found in config"
+    new_entries = await process_source(source_id, config[source_id])
+    if new_entries is None:
+        return f"Source {source_id}: processing failed, see logs"
+    return f"Source {source_id}: {new_entries} new entries"
 
 async def run_all_sources():
     config = load_config()
     tasks = []
     for s_id, s_config in config.items():
-        if is_source_active(s_id):
+        if await async_db.is_source_active(s_id):
             tasks.append(process_source(s_id, s_config))
     if tasks:
         await asyncio.gather(*tasks)
 
+async def refresh_learned_weights():
+    try:
+        await async_db.run_db_bulk(update_learned_weights)
+        await async_db.run_db(source_weights.refresh)
+    except Exception as e:
+        logger.error(f"Failed to update learned source weights: {e}")
+
 async def init_scheduler():
     init_db()
+    released = release_stale_claims()
+    if released:
+        logger.warning(f"Returned {released} news items left claimed by a previous run to the queue")
     config = load_config()
+    poll_intervals.load_history()
     for s_id, s_config in config.items():
         add_source(s_id, s_id, weight=s_config.get('weight', 1))
-        interval = s_config.get('interval', 60)
-        scheduler.add_job(process_source, 'interval', minutes=interval, args=[s_id, s_config])
+        if is_source_active(s_id):
+            schedule_source(s_id, s_config)
+    if LEARNED_WEIGHTS:
+        update_learned_weights()
+        scheduler.add_job(refresh_learned_weights, IntervalTrigger(hours=LEARNING_INTERVAL_HOURS))
+    source_weights.refresh()
     
     # Daily digest at 08:00
     scheduler.add_job(send_digest, CronTrigger(hour=8, minute=0))
+    # Nightly retention pass, away from the digest
+    scheduler.add_job(retention.run, CronTrigger(hour=4, minute=30))
     scheduler.start()
+    publisher.start()
     logger.info("Scheduler started")
 
+async def shutdown():
+    """Stop scheduled jobs and release pooled resources."""
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    await publisher.stop()
+    await http_pool.close()
+    parse_pool.shutdown()
+    async_db.shutdown()
+    close_connections()
+    logger.info("Scheduler stopped")
+
 if __name__ == "__main__":
-    async def main():
-        from app.bot import main as bot_main
-        await init_scheduler()
-        await bot_main()
-    asyncio.run(main())
+    from app.bot import start_services
+    asyncio.run(start_services())
@@ -0,0 +1,69 @@
+import logging
+from typing import Dict, List, Set
+
+from app.db import get_seen_entry_keys, add_seen_entry_keys
+from app.models import NewsItem
+
+logger = logging.getLogger(__name__)
+
+# Per-source in-memory keys are dropped past this size and reloaded from SQLite on demand
+MAX_CACHED_KEYS = 5000
+
+
+def entry_key(item: NewsItem) -> str:
+    """Stable identity of a feed entry: normalized URL, falling back to GUID or title"""
+    return item.url_key or (item.guid or item.title).strip()
+
+
+class SeenIndex:
+    """
+    Persistent per-source set of feed entries that already went through the pipeline.
+    Checked right after fetch so unchanged entries never reach HTML cleaning or the LLM.
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, Set[str]] = {}
+
+    def _known(self, source_id: str) -> Set[str]:
+        known = self._cache.setdefault(source_id, set())
+        if len(known) > MAX_CACHED_KEYS:
+            known.clear()
+        return known
+
+    def is_seen(self, source_id: str, key: str) -> bool:
+        known = self._known(source_id)
+        if key in known:
+            return True
+        if get_seen_entry_keys(source_id, [key]):
+            known.add(key)
+            return True
+        return False
+
+    def filter_new(self, source_id: str, items: List[NewsItem]) -> List[NewsItem]:
+        """Return only entries not seen before (also drops repeats inside the batch)"""
+        known = self._known(source_id)
+        keyed = []
+        batch_keys = set()
+        for item in items:
+            key = entry_key(item)
+            if not key or key in known or key in batch_keys:
+                continue
+            batch_keys.add(key)
+            keyed.append((key, item))
+
+        if not keyed:
+            return []
+
+        stored = get_seen_entry_keys(source_id, batch_keys)
+        known.update(stored)
+        new_items = [item for key, item in keyed if key not in stored]
+        logger.info(f"[{source_id}] {len(new_items)} new of {len(items)} fetched entries")
+        return new_items
+
+    def mark_seen(self, source_id: str, items: List[NewsItem]):
+        keys = {entry_key(item) for item in items}
+        keys.discard("")
+        if not keys:
+            return
+        add_seen_entry_keys(source_id, keys)
+        self._known(source_id).update(keys)
@@ -1,47 +1,33 @@
-import difflib
-from typing import List, Dict
-from app.db import add_news_item, is_duplicate_url
-from app.llm_processor import process_news_batch, ensure_russian_text, detect_language
+from typing import List, Tuple
+from app.async_db import add_news_items, get_existing_url_keys, run_db_bulk
+from app.llm_processor import process_news_batch
 import logging
-from app.common import clean_html
+from app.near_dup import near_dup_index
+from app.parsing import normalize_item
+from app.models import NewsItem
+from app.ranker import score_items
 
 logger = logging.getLogger(__name__)
 
 
-def is_similar(title1: str, title2: str, threshold: float = 0.85) -> bool:
-    """Check if two titles are similar enough to be considered duplicates"""
-    if not title1 or not title2:
-        return False
-    return difflib.SequenceMatcher(None, title1.lower(), title2.lower()).ratio() >= threshold
+def remove_title_duplicates(news_list: List[NewsItem]) -> List[NewsItem]:
+    """Remove items whose title nearly matches one stored recently from any source"""
+    return near_dup_index.filter_new(news_list)
 
 
-def remove_title_duplicates(news_list: List[Dict]) -> List[Dict]:
-    """Remove items with similar titles from the news list"""
-    unique = []
-    seen = []
+def remember_titles(titles: List[Tuple[str, str]]):
+    """Record (title as fetched, source_id) of stored items in the near-duplicate index"""
+    near_dup_index.record(titles)
 
-    for news in news_list:
-        title = news.get("title", "")
-        if not title:
-            continue
-
-        if any(is_similar(title, s) for s in seen):
-            continue
-        seen.append(title)
-        unique.append(news)
-
-    return unique
 
-
-async def process_news_async(news_items: List[Dict]) -> List[Dict]:
+async def process_news_async(news_items: List[NewsItem]) -> List[NewsItem]:
     """
-    Process news items asynchronously:
-    1. Clean HTML in all fields
-    2. Translate titles to Russian
-    3. Remove duplicates by title
-    4. Filter out items already in DB
-    5. Process through LLM pipeline
-    6. Store in database
+    Process news items asynchronously (items not normalized yet get HTML stripped first):
+    1. Remove near-duplicate titles (across sources, within a time window)
+    2. Filter out items already in DB
+    3. Score the batch (engagement and source weight)
+    4. Process through LLM pipeline (translation, relevance, summary and impact in one call)
+    5. Store in database and record the stored titles for near-duplicate detection
     """
     if not news_items:
         logger.warning("Received empty news_items list")
@@ -49,53 +35,41 @@ async def process_news_async(news_items: List[Dict]) -> List[Dict]:
 
     logger.info(f"Starting to process {len(news_items)} items")
 
-    # Предварительная очистка HTML во всех полях
-    for item in news_items:
-        if "title" in item:
-            item["title"] = clean_html(item["title"])
-        if "summary" in item:
-            item["summary"] = clean_html(item["summary"])
-        if "content" in item:
-            item["content"] = clean_html(item["content"])
-
-    # Принудительный перевод заголовков на русский язык
+    # process_source normalizes new entries in the parse pool; only items from elsewhere are cleaned here
     for item in news_items:
-        if "title" in item and item["title"]:
-            title_lang = detect_language(item["title"])
-            if title_lang != "ru" and len(item["title"]) > 10:
-                logger.info(f"Translating title to Russian: {item['title'][:50]}...")
-                try:
-                    item["title"] = await ensure_russian_text(item["title"])
-                    logger.info(f"Translation result: {item['title'][:50]}...")
-                except Exception as e:
-                    logger.error(f"Error translating title: {e}")
+        if not item.normalized:
+            normalize_item(item)
 
     # Step 1: Remove title duplicates
-    unique_items = remove_title_duplicates(news_items)
+    unique_items = await run_db_bulk(remove_title_duplicates, news_items)
     logger.info(f"After title deduplication: {len(unique_items)} items")
 
-    # Step 2: Filter out items already in DB
+    # Step 2: Filter out items already in DB (one set-based lookup for the whole batch)
     filtered_items = []
     for item in unique_items:
-        url = item.get("url") or item.get("link", "")
-        if not url:
-            logger.warning(f"Skipping item with no URL: {item.get('title', 'Unknown')}")
-            continue
-
-        if is_duplicate_url(url):
-            logger.debug(f"Skipping duplicate URL: {url}")
+        if not item.url:
+            logger.warning(f"Skipping item with no URL: {item.title or 'Unknown'}")
             continue
-
-        item["url"] = url
         filtered_items.append(item)
 
+    existing_keys = await get_existing_url_keys([item.url_key for item in filtered_items])
+    if existing_keys:
+        logger.debug(f"Skipping {len(existing_keys)} duplicate URLs")
+        filtered_items = [item for item in filtered_items if item.url_key not in existing_keys]
+
     logger.info(f"After URL deduplication: {len(filtered_items)} items")
 
     if not filtered_items:
         logger.info("No new items to process after filtering")
         return []
 
-    # Step 3: Process through LLM pipeline
+    # The LLM rewrites titles; the index compares titles as fetched
+    fetched_titles = {item.url: item.title for item in filtered_items}
+
+    # Step 3: Static score from one source-weights snapshot
+    score_items(filtered_items)
+
+    # Step 4: Process through LLM pipeline
     try:
         processed_items = await process_news_batch(filtered_items)
         logger.info(f"Successfully processed {len(processed_items)} items through LLM")
@@ -104,53 +78,36 @@ async def process_news_async(news_items: List[Dict]) -> List[Dict]:
         # If LLM processing fails, use basic processing for the items
         processed_items = []
         for item in filtered_items:
-            item.update({
-                "summary": item.get("title", ""),
-                "impact": 1,
-                "summary_lang": "unknown"
-            })
+            item.summary = item.title
+            item.impact = 1
+            item.summary_lang = "unknown"
             processed_items.append(item)
         logger.info(f"Fallback: using {len(processed_items)} items with basic processing")
 
-    # Step 4: Store in database
+    # Step 5: Store in database (single transaction for the whole batch).
+    # Errors propagate so the caller does not mark the entries as seen.
+    rows = [item.to_row() for item in processed_items]
+    try:
+        stored = await add_news_items(rows)
+    except Exception as e:
+        logger.error(f"Error adding items to database: {e}")
+        raise
+
+    stored_ids = {row["url"]: row["id"] for row in stored}
     result = []
     for item in processed_items:
-        try:
-            url = item.get("url", "")
-            title = item.get("title", "")
-            source_id = item.get("source_id", "unknown")
-            published = item.get("published")
-            score = item.get("score", 0)
-            impact = item.get("impact", 1)
-            summary = item.get("summary", "")
-            summary_lang = item.get("summary_lang", "unknown")
-
-            logger.debug(f"Adding to DB: {title} (impact: {impact})")
-
-            success = add_news_item(
-                url=url,
-                title=title,
-                source_id=source_id,
-                published=published,
-                score=score,
-                impact=impact,
-                summary=summary,
-                summary_lang=summary_lang
-            )
-
-            if success:
-                result.append(item)
-                logger.debug(f"Successfully added {title} to database")
-            else:
-                logger.warning(f"Failed to add {title} to database")
-
-        except Exception as e:
-            logger.error(f"Error adding item to database: {e}, item: {item.get('title', 'Unknown')}")
+        if item.url in stored_ids:
+            item.id = stored_ids.pop(item.url)
+            result.append(item)
+
+    # Only stored items block later near-duplicates
+    if result:
+        await run_db_bulk(remember_titles, [(fetched_titles.get(item.url, item.title), item.source_id) for item in result])
 
     logger.info(f"Added {len(result)} new items to database")
     return result
 
 
-async def process_news(news_items: List[Dict]) -> List[Dict]:
+async def process_news(news_items: List[NewsItem]) -> List[NewsItem]:
     """Main entry function for news processing"""
     return await process_news_async(news_items)
\ No newline at end of file
@@ -0,0 +1,124 @@
+import os
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from app import async_db
+from app.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Bot API limits: about 30 messages per second overall, 20 per minute into one group or channel
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RPM = float(os.getenv("TELEGRAM_CHAT_RPM", "20"))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_SEND_RETRIES = int(os.getenv("TELEGRAM_SEND_RETRIES", "4"))
+LATENCY_WINDOW = 200
+
+
+class DeliveryUnknown(Exception):
+    """The request timed out: the message may or may not have been posted."""
+
+
+class TelegramSender:
+    """
+    Outbound Telegram messages: paced by a global and a per-chat token bucket,
+    paused by RetryAfter, retried on server and connection errors.
+    A send with an idempotency key is posted at most once: the key and the
+    resulting message_id are stored, and a timed-out request is never retried.
+    """
+
+    def __init__(self, global_rate=TELEGRAM_GLOBAL_RATE, chat_rpm=TELEGRAM_CHAT_RPM,
+                 chat_burst=TELEGRAM_CHAT_BURST, retries=TELEGRAM_SEND_RETRIES):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rpm / 60.0
+        self.chat_burst = chat_burst
+        self.retries = retries
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._pending = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chat_buckets.get(str(chat_id))
+        if bucket is None:
+            bucket = self._chat_buckets[str(chat_id)] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    @property
+    def queue_depth(self) -> int:
+        """Sends waiting for a rate-limit token or a retry."""
+        return self._pending
+
+    def latency(self, quantile: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * quantile))]
+
+    def stats_line(self) -> str:
+        return (f"{self.sent} sent, {self.failed} failed, {self.retried} retries, queue {self.queue_depth}, "
+                f"latency p50 {self.latency(0.5):.2f}s / p95 {self.latency(0.95):.2f}s")
+
+    async def send_message(self, bot, chat_id, text: str, idempotency_key: Optional[str] = None, **kwargs):
+        """
+        Send a message and return its message_id.
+        Returns the stored message_id without posting when the key was already delivered.
+        """
+        if idempotency_key:
+            message_id = await async_db.get_outbound_message(idempotency_key)
+            if message_id is not None:
+                logger.info(f"Message {idempotency_key} already posted as {message_id}, skipping")
+                return message_id
+
+        chat_bucket = self._chat_bucket(chat_id)
+        start = time.monotonic()
+        self._pending += 1
+        try:
+            for attempt in range(self.retries + 1):
+                await chat_bucket.acquire()
+                await self.global_bucket.acquire()
+                try:
+                    message = await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                    break
+                except TelegramRetryAfter as e:
+                    # Flood control: nothing was posted, wait as told
+                    logger.warning(f"Telegram flood control for chat {chat_id}: retry after {e.retry_after}s")
+                    chat_bucket.pause(e.retry_after)
+                    error = e
+                except TelegramNetworkError as e:
+                    if "timeout" in str(e).lower():
+                        raise DeliveryUnknown(str(e)) from e
+                    chat_bucket.pause(2 ** attempt)
+                    error = e
+                except TelegramServerError as e:
+                    chat_bucket.pause(2 ** attempt)
+                    error = e
+                if attempt < self.retries:
+                    self.retried += 1
+                    logger.warning(f"Retrying send to {chat_id} ({attempt + 1}/{self.retries}): {error}")
+            else:
+                raise error
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        self.sent += 1
+        self._latencies.append(time.monotonic() - start)
+        if idempotency_key:
+            try:
+                await async_db.save_outbound_message(idempotency_key, chat_id, message.message_id)
+            except Exception as e:
+                # The message is out: report it as sent, a lost key only weakens the duplicate guard
+                logger.error(f"Could not record outbound message {idempotency_key} ({message.message_id}): {e}")
+        return message.message_id
+
+
+telegram_sender = TelegramSender()
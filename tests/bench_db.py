@@ -0,0 +1,87 @@
+"""
+Microbenchmark: open-per-call SQLite connections (old get_connection)
+against the pooled long-lived connections, for the hot-path queries
+is_duplicate_url, add_reaction and get_unsent_news.
+
+Run: python -m tests.bench_db
+"""
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+# Also points DB_URL at a temporary database and disables Sentry
+from tests.conftest import NewsFactory
+from app import db
+
+NEWS_COUNT = 2_000
+ITERATIONS = 2_000
+UNSENT_ITERATIONS = 200
+
+pooled_get_connection = db.get_connection
+
+
+@contextmanager
+def legacy_get_connection():
+    conn = sqlite3.connect(db.DB_PATH, timeout=20)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+def seed():
+    db.init_db()
+    db.add_source("bench", "bench")
+    news = NewsFactory()
+    db.add_news_items([
+        news.row(str(i), source_id="bench", score=i % 50, impact=i % 5 + 1, summary="text " * 40)
+        for i in range(NEWS_COUNT)
+    ])
+    with db.get_connection() as conn:
+        conn.execute("UPDATE news_items SET sent = 1 WHERE id % 10 != 0")
+        conn.commit()
+
+
+def run_cases():
+    results = {}
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        db.is_duplicate_url(f"https://example.com/{i * 7 % (NEWS_COUNT * 2)}")
+    results["is_duplicate_url"] = (time.perf_counter() - start) / ITERATIONS
+
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        db.add_reaction(i % NEWS_COUNT + 1, None, "like" if i % 3 else "dislike", i % 97, "user")
+    results["add_reaction"] = (time.perf_counter() - start) / ITERATIONS
+
+    start = time.perf_counter()
+    for _ in range(UNSENT_ITERATIONS):
+        db.get_unsent_news()
+    results["get_unsent_news"] = (time.perf_counter() - start) / UNSENT_ITERATIONS
+    return results
+
+
+def main():
+    seed()
+
+    db.get_connection = legacy_get_connection
+    before = run_cases()
+    db.get_connection = pooled_get_connection
+    after = run_cases()
+    db.close_connections()
+
+    print(f"{'query':<18} | {'open-per-call':>14} | {'pooled':>10} | speedup")
+    for name in before:
+        print(f"{name:<18} | {before[name] * 1e6:>12.0f}us | {after[name] * 1e6:>8.0f}us | {before[name] / after[name]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
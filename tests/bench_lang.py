@@ -0,0 +1,61 @@
+"""
+Benchmark: langdetect on every title (old detect_language) against the
+layered detector (script ratio, memo, seeded langdetect fallback),
+on the labeled titles from tests/test_lang.py.
+
+Run: python -m tests.bench_lang
+"""
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+os.environ.setdefault("SENTRY_DSN", "")
+
+from langdetect import detect_langs
+
+from app.lang import detect_language
+from tests.test_lang import LABELED_TITLES
+
+ROUNDS = 20
+
+
+def legacy_detect_language(text):
+    if not text or len(text.strip()) < 10: return "unknown"
+    try:
+        langs = detect_langs(text)
+        if langs and langs[0].prob >= 0.9:
+            return langs[0].lang
+    except Exception:
+        pass
+    return "unknown"
+
+
+def layered_cold(text):
+    detect_language.cache_clear()
+    return detect_language(text)
+
+
+def run(detect):
+    titles = [title for title, _ in LABELED_TITLES]
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for title in titles:
+            detect(title)
+    per_call = (time.perf_counter() - start) / (ROUNDS * len(titles))
+    accuracy = sum(detect(title) == label for title, label in LABELED_TITLES) / len(LABELED_TITLES)
+    return per_call, accuracy
+
+
+def main():
+    print(f"{len(LABELED_TITLES)} labeled titles, {ROUNDS} rounds")
+    for name, detect in (("langdetect", legacy_detect_language),
+                         ("layered (no memo)", layered_cold),
+                         ("layered (memo)", detect_language)):
+        per_call, accuracy = run(detect)
+        print(f"{name:<18} | {per_call * 1e6:>9.1f}us per title | accuracy {accuracy:.1%}")
+
+
+if __name__ == "__main__":
+    main()
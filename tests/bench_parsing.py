@@ -0,0 +1,132 @@
+"""
+Benchmark: parsing the configured sources inline on the event loop against
+the parse pool. Each source gets the sample of its format from tests/fixtures/feeds
+(arXiv RSS, WordPress RSS, Reddit Atom, a GitHub trending page, a TAAFT API answer),
+with the entries repeated to a typical feed length: arXiv-sized for arxiv sources.
+No configured source uses JSON Feed, so its sample is benchmarked on its own.
+
+Reports wall time and the longest event-loop stall while all sources are parsed.
+
+Run: python -m tests.bench_parsing
+"""
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+os.environ.setdefault("SENTRY_DSN", "")
+
+from app.parsing import ParsePool, parse_and_normalize
+from app.scheduler import load_config
+
+SAMPLES_DIR = os.path.join(current_dir, "fixtures", "feeds")
+ENTRIES = 30
+ARXIV_ENTRIES = 300
+GITHUB_ENTRIES = 25
+
+# Sample per feed type, and per source where a source's feed differs from the usual one
+TYPE_SAMPLES = {
+    "rss": "wordpress_rss.xml",
+    "scrap": "github_trending.html",
+    "json_feed": "json_feed.json",
+    "api": "taaft.json",
+}
+SOURCE_SAMPLES = {
+    "arxiv": "arxiv_rss.xml",
+    "reddit": "reddit_atom.xml",
+}
+ENTRY_PATTERNS = {
+    ".xml": re.compile(rb"<(item|entry)[\s>].*?</\1>", re.S),
+    ".html": re.compile(rb'<article class="Box-row">.*?</article>', re.S),
+}
+
+
+def load_sample(name, count):
+    """A sample with its entries repeated (in order) up to `count`."""
+    with open(os.path.join(SAMPLES_DIR, name), "rb") as f:
+        content = f.read()
+    extension = os.path.splitext(name)[1]
+    if extension == ".json":
+        data = json.loads(content)
+        entries = data["items"] if isinstance(data, dict) else data
+        repeated = list(itertools.islice(itertools.cycle(entries), count))
+        if isinstance(data, dict):
+            return json.dumps({**data, "items": repeated}).encode()
+        return json.dumps(repeated).encode()
+
+    matches = list(ENTRY_PATTERNS[extension].finditer(content))
+    entries = [match.group(0) for match in matches]
+    body = b"\n".join(itertools.islice(itertools.cycle(entries), count))
+    return content[:matches[0].start()] + body + content[matches[-1].end():]
+
+
+def sample_for(source_id, feed_type):
+    for marker, name in SOURCE_SAMPLES.items():
+        if marker in source_id:
+            return name
+    return TYPE_SAMPLES[feed_type]
+
+
+def build_fixtures():
+    fixtures = []
+    for source_id, config in load_config().items():
+        feed_type = config["type"]
+        if feed_type == "scrap":
+            count = GITHUB_ENTRIES
+        else:
+            count = ARXIV_ENTRIES if "arxiv" in source_id else ENTRIES
+        content = load_sample(sample_for(source_id, feed_type), count)
+        fixtures.append((feed_type, content, source_id, config.get("lang", "en")))
+    if not any(fixture[0] == "json_feed" for fixture in fixtures):
+        fixtures.append(("json_feed", load_sample(TYPE_SAMPLES["json_feed"], ENTRIES), "json_feed_sample", "en"))
+    return fixtures
+
+
+async def measure(fixtures, parse):
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(parse(*fixture) for fixture in fixtures))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+    return elapsed, max(lags), sum(len(items) for items in results)
+
+
+async def parse_inline(feed_type, content, source_id, lang):
+    return parse_and_normalize(feed_type, content, source_id, lang)
+
+
+async def main():
+    fixtures = build_fixtures()
+    print(f"{len(fixtures)} sources, {sum(len(f[1]) for f in fixtures) / 1024:.0f} KiB of fixtures")
+
+    pool = ParsePool(workers=max(2, os.cpu_count() or 1))
+    # Warm up the workers so process start-up is not counted
+    await asyncio.gather(*(pool.parse(*fixture) for fixture in fixtures[:pool.workers]))
+
+    async def parse_in_pool(feed_type, content, source_id, lang):
+        return await pool.normalize(await pool.parse(feed_type, content, source_id, lang))
+
+    for name, parse in (("inline", parse_inline), ("parse pool", parse_in_pool)):
+        elapsed, max_lag, items = await measure(fixtures, parse)
+        print(f"{name:<10} | {items} items | wall {elapsed * 1000:>7.0f}ms | max loop stall {max_lag * 1000:>7.1f}ms")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
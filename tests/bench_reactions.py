@@ -0,0 +1,55 @@
+"""
+Benchmark: a burst of concurrent reaction clicks on one hot post, through
+async_db on the interactive executor. Prints per-click latency percentiles
+and the time to clear the whole burst.
+
+Run: python -m tests.bench_reactions
+"""
+import asyncio
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+# Also points DB_URL at a temporary database and disables Sentry
+from tests.conftest import NewsFactory
+from app import async_db
+from app import db
+
+USERS = 900
+SWITCHES = 100
+
+
+async def burst(news_id):
+    async def click(user_id, reaction_type):
+        start = time.perf_counter()
+        await async_db.add_reaction(news_id, 1, reaction_type, user_id, f"user{user_id}")
+        return time.perf_counter() - start
+
+    clicks = [click(user_id, "like" if user_id % 3 else "dislike") for user_id in range(USERS)]
+    clicks += [click(user_id, "dislike") for user_id in range(1, SWITCHES * 2, 2)]
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*clicks)
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    db.init_db()
+    news_id = NewsFactory().store_post("bench-reactions", source_id="bench")
+
+    elapsed, latencies = asyncio.run(burst(news_id))
+    async_db.shutdown()
+    db.close_connections()
+
+    def percentile(p):
+        return latencies[int(len(latencies) * p) - 1] * 1000
+
+    print(f"{len(latencies)} clicks in {elapsed * 1000:.0f}ms "
+          f"(workers {async_db.DB_EXECUTOR_WORKERS})")
+    print(f"p50 {percentile(0.5):.1f}ms | p95 {percentile(0.95):.1f}ms | max {latencies[-1] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: pairwise difflib title dedup (the old remove_title_duplicates)
+against the MinHash/LSH NearDuplicateIndex at 1k / 10k / 100k titles.
+
+Run: python -m tests.bench_title_dedup
+"""
+import difflib
+import os
+import random
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+os.environ.setdefault("SENTRY_DSN", "")
+
+from app.models import NewsItem
+from app.near_dup import NearDuplicateIndex
+
+SIZES = (1_000, 10_000, 100_000)
+# Full pairwise runs above this size take hours; their time is extrapolated instead
+DIFFLIB_FULL_LIMIT = 1_000
+DIFFLIB_SAMPLE = 300
+DUPLICATE_SHARE = 0.1
+
+
+def legacy_is_similar(title1, title2, threshold=0.85):
+    if not title1 or not title2:
+        return False
+    return difflib.SequenceMatcher(None, title1.lower(), title2.lower()).ratio() >= threshold
+
+
+def legacy_remove_title_duplicates(titles):
+    unique = []
+    seen = []
+    for title in titles:
+        if any(legacy_is_similar(title, s) for s in seen):
+            continue
+        seen.append(title)
+        unique.append(title)
+    return unique
+
+
+def make_vocabulary(rng, size=4000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_titles(count, rng, vocabulary):
+    titles = []
+    for _ in range(count):
+        if titles and rng.random() < DUPLICATE_SHARE:
+            words = rng.choice(titles).split()
+            edit = rng.random()
+            if edit < 0.4:
+                words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            elif edit < 0.7:
+                words.insert(rng.randrange(len(words)), rng.choice(("the", "a", "new", "now")))
+            else:
+                words[0] = words[0].upper()
+            titles.append(" ".join(words))
+        else:
+            titles.append(" ".join(rng.choice(vocabulary) for _ in range(rng.randint(6, 14))))
+    return titles
+
+
+def bench_index(titles):
+    index = NearDuplicateIndex(persist=False)
+    items = [NewsItem("", title, "bench", "en") for title in titles]
+    start = time.perf_counter()
+    unique = index.filter_new(items)
+    return time.perf_counter() - start, [item.title for item in unique]
+
+
+def bench_difflib(titles):
+    if len(titles) <= DIFFLIB_FULL_LIMIT:
+        start = time.perf_counter()
+        unique = legacy_remove_title_duplicates(titles)
+        return time.perf_counter() - start, unique, False
+
+    # Estimate from the per-comparison cost measured on a prefix
+    sample = titles[:DIFFLIB_SAMPLE]
+    start = time.perf_counter()
+    legacy_remove_title_duplicates(sample)
+    elapsed = time.perf_counter() - start
+    per_pair = elapsed / (len(sample) * (len(sample) - 1) / 2)
+    return per_pair * len(titles) * (len(titles) - 1) / 2, None, True
+
+
+def main():
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    print(f"{'titles':>8} | {'difflib':>18} | {'index':>9} | {'speedup':>9} | agreement")
+    for size in SIZES:
+        titles = make_titles(size, rng, vocabulary)
+        index_time, index_unique = bench_index(titles)
+        difflib_time, difflib_unique, estimated = bench_difflib(titles)
+
+        agreement = "-"
+        if difflib_unique is not None:
+            same = len(set(index_unique) & set(difflib_unique))
+            agreement = f"{same}/{len(difflib_unique)} kept titles match ({len(index_unique)} kept by index)"
+
+        label = f"{difflib_time:.2f}s" + (" (est.)" if estimated else "")
+        print(f"{size:>8} | {label:>18} | {index_time:>8.2f}s | {difflib_time / index_time:>8.0f}x | {agreement}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Make `app` importable and keep tests away from the real database and Sentry
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+os.environ["SENTRY_DSN"] = ""
+os.environ["DB_URL"] = os.path.join(tempfile.mkdtemp(prefix="ai_news_bot_tests_"), "news.db")
+
+from app import db
+
+
+class NewsFactory:
+    """
+    news_items rows for db.add_news_items. URLs and titles derive from `key`,
+    so tests sharing the session database only collide if they reuse a key.
+    """
+
+    DEFAULTS = {
+        "source_id": "test", "published": None, "score": 0, "impact": 1, "summary": "text", "summary_lang": "ru",
+    }
+
+    def row(self, key, **fields):
+        return {"url": f"https://example.com/{key}", "title": f"News {key}", **self.DEFAULTS, **fields}
+
+    def rows(self, prefix, count, **fields):
+        return [self.row(f"{prefix}/{i}", **fields) for i in range(count)]
+
+    def store(self, prefix, count=1, **fields):
+        """Store `count` rows and return their IDs."""
+        return [item["id"] for item in db.add_news_items(self.rows(prefix, count, **fields))]
+
+    def store_post(self, key, **fields):
+        """Store one breaking (impact 5) post and return its ID."""
+        return db.add_news_items([self.row(key, **{"impact": 5, **fields})])[0]["id"]
+
+
+@pytest.fixture
+def news():
+    return NewsFactory()
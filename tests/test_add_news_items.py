@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+from app import db
+
+db.init_db()
+
+
+def stored_urls(prefix):
+    with db.get_connection() as conn:
+        rows = conn.execute("SELECT url FROM news_items WHERE url LIKE ?", (f"https://example.com/{prefix}/%",))
+        return {row["url"] for row in rows}
+
+
+def rollup(source_id):
+    with db.get_connection() as conn:
+        row = conn.execute(
+            "SELECT SUM(news_count), SUM(breaking_count), SUM(impact_sum) FROM source_daily_stats WHERE source_id = ?",
+            (source_id,)
+        ).fetchone()
+    return tuple(row)
+
+
+def test_duplicates_within_the_batch_are_stored_once(news):
+    rows = news.rows("ingest/batch", 3, source_id="ingest_batch")
+    # Same URL twice, and a tracking-parameter variant of a third
+    repeat = dict(rows[0], title="Repeated row")
+    variant = dict(rows[1], url=rows[1]["url"] + "?utm_source=rss", title="Variant row")
+
+    stored = db.add_news_items(rows + [repeat, variant])
+
+    assert [item["url"] for item in stored] == [row["url"] for row in rows]
+    assert stored_urls("ingest/batch") == {row["url"] for row in rows}
+    assert rollup("ingest_batch")[0] == 3
+
+
+def test_rows_already_stored_are_skipped(news):
+    first = news.rows("ingest/stored", 2, source_id="ingest_stored")
+    db.add_news_items(first)
+    second = first + news.rows("ingest/stored-new", 2, source_id="ingest_stored")
+
+    stored = db.add_news_items(second)
+
+    assert [item["url"] for item in stored] == [row["url"] for row in second[2:]]
+    assert db.add_news_items(second) == []
+    assert rollup("ingest_stored")[0] == 4
+
+
+def test_returned_ids_belong_to_the_stored_rows(news):
+    rows = news.rows("ingest/ids", 5, source_id="ingest_ids")
+    stored = db.add_news_items(rows)
+
+    ids = [item["id"] for item in stored]
+    assert len(set(ids)) == 5 and all(isinstance(news_id, int) for news_id in ids)
+    with db.get_connection() as conn:
+        by_id = {
+            row["id"]: row["url"]
+            for row in conn.execute(f"SELECT id, url FROM news_items WHERE id IN ({','.join('?' * 5)})", ids)
+        }
+    assert by_id == {item["id"]: item["url"] for item in stored}
+
+
+def test_rollups_count_impact_and_breaking_news(news):
+    db.add_news_items(
+        news.rows("ingest/rollup-low", 3, source_id="ingest_rollup", impact=2)
+        + news.rows("ingest/rollup-high", 2, source_id="ingest_rollup", impact=5)
+    )
+    assert rollup("ingest_rollup") == (5, 2, 3 * 2 + 2 * 5)
+
+
+def test_failure_rolls_back_the_whole_batch(news, monkeypatch):
+    db.add_news_items(news.rows("ingest/rollback-before", 1, source_id="ingest_rollback"))
+    before = rollup("ingest_rollback")
+    original = db._add_to_daily_stats
+
+    def fail_after_counting(conn, news_ids):
+        # Rows inserted and rollups updated, then the transaction fails
+        original(conn, news_ids)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(db, "_add_to_daily_stats", fail_after_counting)
+    rows = news.rows("ingest/rollback", 4, source_id="ingest_rollback")
+    with pytest.raises(sqlite3.OperationalError):
+        db.add_news_items(rows)
+
+    assert stored_urls("ingest/rollback") == set()
+    assert rollup("ingest_rollback") == before
+
+    # The pooled connection is usable again and the same rows go in
+    monkeypatch.setattr(db, "_add_to_daily_stats", original)
+    assert len(db.add_news_items(rows)) == 4
+    assert rollup("ingest_rollback")[0] == before[0] + 4
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from app import async_db
+from app import db
+
+db.init_db()
+
+
+def test_db_calls_run_off_the_event_loop():
+    async def scenario():
+        loop_thread = threading.current_thread()
+        interactive = await async_db.run_db(threading.current_thread)
+        bulk = await async_db.run_db_bulk(threading.current_thread)
+        return loop_thread, interactive, bulk
+
+    loop_thread, interactive, bulk = asyncio.run(scenario())
+    assert loop_thread not in (interactive, bulk)
+    assert interactive.name.startswith("db-interactive")
+    assert bulk.name.startswith("db-bulk")
+
+
+def test_reactions_are_not_queued_behind_bulk_work(news):
+    gate = threading.Event()
+
+    async def scenario():
+        news_id = (await async_db.add_news_items(news.rows("async-db/gate", 1)))[0]["id"]
+        # Hold the bulk thread the way a long ingest transaction would
+        blocked = asyncio.ensure_future(async_db.run_db_bulk(gate.wait, 30))
+        ticks = 0
+        try:
+            for user_id in range(20):
+                assert await async_db.add_reaction(news_id, 1, "like", user_id, f"user{user_id}")
+                await asyncio.sleep(0)
+                ticks += 1
+            reactions = await async_db.get_news_reactions(news_id)
+            # Everything above finished while the bulk thread was still busy
+            still_blocked = not blocked.done()
+        finally:
+            gate.set()
+            await blocked
+        return reactions, ticks, still_blocked
+
+    reactions, ticks, still_blocked = asyncio.run(scenario())
+    assert still_blocked
+    assert ticks == 20
+    assert {r["reaction_type"]: r["count"] for r in reactions} == {"like": 20}
+
+
+def test_reactions_during_bulk_ingest_are_all_stored(news):
+    async def scenario():
+        news_id = (await async_db.add_news_items(news.rows("async-db/seed", 1)))[0]["id"]
+
+        async def ingest():
+            for batch in range(20):
+                await async_db.add_news_items(news.rows(f"async-db/{batch}", 500, summary="x" * 500))
+
+        ingest_task = asyncio.create_task(ingest())
+        for user_id in range(100):
+            assert await async_db.add_reaction(news_id, 1, "like", user_id, f"user{user_id}")
+            await asyncio.sleep(0)
+        await ingest_task
+        return {r["reaction_type"]: r["count"] for r in await async_db.get_news_reactions(news_id)}
+
+    assert asyncio.run(scenario()) == {"like": 100}
@@ -0,0 +1,114 @@
+import html
+import random
+import re
+
+from bs4 import BeautifulSoup
+
+from app.common import clean_html
+from app.llm_processor import apply_summary
+from app.models import NewsItem
+from app.parsing import normalize_item
+from app.scheduler import format_news_item
+
+
+def legacy_clean_html(text):
+    """clean_html before the fast path, kept as the reference output."""
+    if not text:
+        return ""
+
+    soup = BeautifulSoup(text, "html.parser")
+    clean_text = soup.get_text(separator=" ", strip=True)
+
+    clean_text = html.unescape(clean_text)
+
+    clean_text = re.sub(r'url статьи:', '', clean_text)
+    clean_text = re.sub(r'URL:', '', clean_text)
+    clean_text = re.sub(r'Комментарии URL:', '', clean_text)
+    clean_text = re.sub(r'<a href\s*=\s*["\'][^"\']*["\'].*?>', '', clean_text)
+    clean_text = re.sub(r'</a>', '', clean_text)
+
+    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
+
+    return clean_text
+
+
+CORPUS = [
+    "",
+    None,
+    "   ",
+    "OpenAI releases GPT-5 with improved reasoning",
+    "  Leading and trailing   whitespace\n\tinside  ",
+    "Google DeepMind: новая модель для робототехники",
+    "Comparison: a > b and c >= d",
+    "Fish & Chips &amp; more &lt;tags&gt; &#8212; &nbsp;done",
+    "AT&T partners with Anthropic",
+    "<p>Researchers <b>present</b> a new <i>approach</i>.</p><p>Second paragraph.</p>",
+    "<![CDATA[<p>Wrapped in CDATA</p>]]>",
+    "<div><a href=\"https://example.com\">Link text</a> after link</div>",
+    "Статья на Хабре url статьи: https://habr.com/ru/articles/1/ Комментарии URL: https://habr.com/ru/articles/1/#comments",
+    "<p>Article URL: <a href=\"https://example.com/a\">https://example.com/a</a></p>"
+    "<p>Comments URL: <a href=\"https://news.ycombinator.com/item?id=1\">link</a></p>",
+    "Escaped anchor &lt;a href='https://example.com'&gt;text&lt;/a&gt; inside",
+    "Escaped anchor with double quotes &lt;a href=\"https://example.com\" rel=\"nofollow\"&gt;x&lt;/a&gt;",
+    "<img src=\"x.png\" alt=\"image\"/><br/>Text after image<br>line",
+    "Unclosed <b>bold and <i>italic",
+    "<script>var x = 1;</script>Visible",
+    "<ul><li>One</li><li>Two</li></ul>",
+    "Plain text with URL: label but no markup",
+    "Emoji 🚀 and non-breaking space",
+    "<p>Multi\n\nline\r\nparagraph</p>",
+    "Tab\tseparated\ttext",
+    "Math: 2 < 3 and 5 > 4",
+    "&",
+    "<",
+    "&unknown; entity",
+]
+
+
+def test_clean_html_matches_legacy_on_corpus():
+    for text in CORPUS:
+        assert clean_html(text) == legacy_clean_html(text), repr(text)
+
+
+def test_clean_html_matches_legacy_on_generated_text():
+    rng = random.Random(13)
+    alphabet = "abc АБВ 123\t\n .,:;!?\"'/=-_()[]{}#%+"
+    fragments = ["URL:", "url статьи:", "Комментарии URL:", "<b>", "</b>", "<p>", "</a>",
+                 "<a href='https://example.com'>", "&amp;", "&lt;", "&gt;", "&quot;", "&#39;", " > "]
+    for _ in range(2000):
+        parts = []
+        for _ in range(rng.randint(1, 12)):
+            if rng.random() < 0.3:
+                parts.append(rng.choice(fragments))
+            else:
+                parts.append("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 15))))
+        text = "".join(parts)
+        assert clean_html(text) == legacy_clean_html(text), repr(text)
+
+
+def test_normalize_item_runs_once():
+    item = NewsItem("https://example.com/a", "<b>Title</b> &amp; more", "test", "en", summary="<p>Body</p>")
+    normalize_item(item)
+    assert item.title == "Title & more"
+    assert item.summary == "Body"
+    assert item.normalized is True
+
+    item.title = "<b>untouched</b>"
+    normalize_item(item)
+    assert item.title == "<b>untouched</b>"
+
+
+def test_llm_output_is_cleaned_once_at_ingest():
+    item = NewsItem("https://example.com/llm-html", "Raw", "test", "en", summary="raw")
+    apply_summary(item, {"title": "<b>Заголовок</b>", "summary": "Текст &amp; <i>детали</i>", "impact": 3})
+    assert item.title == "Заголовок"
+    assert item.summary == "Текст & детали"
+
+
+def test_format_news_item_sends_stored_text_as_is():
+    row = {"id": 1, "url": "https://example.com/stored", "title": "A <b> tag in prose",
+           "summary": "Five &lt; six", "impact": 2}
+    message, news_id = format_news_item(row)
+    assert news_id == 1
+    assert "*A <b> tag in prose*" in message
+    assert "Five &lt; six" in message
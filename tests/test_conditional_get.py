@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+
+from aiohttp import web
+
+from app import db
+from app import scheduler
+from app import summarizer
+from app.fetchers.http import FetcherHTTP
+from app.fetchers.rss import RSSFetcher
+from app.parsing import parse_pool
+
+db.init_db()
+parse_pool.workers = 0
+
+
+def rss_feed(name):
+    items = "".join(
+        f"<item><title>{name} conditional entry {i}</title><link>https://example.com/{name}/{i}</link>"
+        f"<guid>{name}-{i}</guid><description>Body {i}</description></item>"
+        for i in range(3)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{name}</title>{items}</channel></rss>'.encode()
+
+
+class FeedServer:
+    """Serves one feed, with an ETag unless `etag` is None, and records request headers."""
+
+    def __init__(self, body, etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    async def handle(self, request):
+        self.requests.append(dict(request.headers))
+        if self.etag and request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304)
+        headers = {"ETag": self.etag} if self.etag else {}
+        return web.Response(body=self.body, headers=headers, content_type="application/rss+xml")
+
+    async def run(self, scenario):
+        app = web.Application()
+        app.router.add_get("/feed", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(f"http://127.0.0.1:{port}/feed")
+        finally:
+            await runner.cleanup()
+
+
+def cache_stats(source_id):
+    [stats] = db.get_feed_cache_stats(source_id)
+    return stats["hits"], stats["misses"]
+
+
+def test_not_modified_feed_is_skipped():
+    server = FeedServer(rss_feed("cond_304"))
+
+    async def scenario(url):
+        fetcher = RSSFetcher("cond_304", url, "en")
+        first = await fetcher.fetch()
+        fetcher.commit_validator()
+        second = await RSSFetcher("cond_304", url, "en").fetch()
+        return first, second
+
+    first, second = asyncio.run(server.run(scenario))
+    assert len(first) == 3 and second == []
+    assert "If-None-Match" not in server.requests[0]
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert cache_stats("cond_304") == (1, 1)
+
+
+def test_identical_body_without_validators_is_a_hash_hit():
+    server = FeedServer(rss_feed("cond_hash"), etag=None)
+
+    async def scenario(url):
+        fetcher = RSSFetcher("cond_hash", url, "en")
+        first = await fetcher.fetch()
+        fetcher.commit_validator()
+        second = await RSSFetcher("cond_hash", url, "en").fetch()
+        return first, second
+
+    first, second = asyncio.run(server.run(scenario))
+    assert len(first) == 3 and second == []
+    assert len(server.requests) == 2
+    assert cache_stats("cond_hash") == (1, 1)
+    assert db.get_feed_validator("cond_hash")["content_hash"]
+
+
+def test_validator_not_saved_when_the_pipeline_fails(monkeypatch):
+    async def passthrough(items):
+        return items
+
+    async def locked(rows):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(summarizer, "process_news_batch", passthrough)
+    monkeypatch.setattr(summarizer, "add_news_items", locked)
+    server = FeedServer(rss_feed("cond_fail"))
+
+    async def scenario(url):
+        http = FetcherHTTP()
+        monkeypatch.setattr(scheduler, "http_pool", http)
+        try:
+            config = {"type": "rss", "url": url, "lang": "en"}
+            return await scheduler.process_source("cond_fail", config), await scheduler.process_source("cond_fail", config)
+        finally:
+            await http.close()
+
+    assert asyncio.run(server.run(scenario)) == (None, None)
+    # Only the hit/miss counters were recorded
+    assert db.get_feed_validator("cond_fail") == {"etag": None, "last_modified": None, "content_hash": None}
+    # Without a stored ETag the retry downloads the whole feed again
+    assert ["If-None-Match" in headers for headers in server.requests] == [False, False]
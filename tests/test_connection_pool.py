@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app import db
+
+db.init_db()
+
+
+def test_pragmas_applied_once_per_connection(tmp_path, monkeypatch):
+    pool = db.ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    opened = []
+    connect = pool._connect
+    monkeypatch.setattr(pool, "_connect", lambda: opened.append(1) or connect())
+
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 20000
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    statements = []
+    conn.set_trace_callback(statements.append)
+    pool.release(conn)
+
+    for _ in range(10):
+        again = pool.acquire()
+        assert again is conn
+        again.execute("SELECT 1")
+        pool.release(again)
+
+    assert len(opened) == 1
+    assert not [sql for sql in statements if sql.upper().startswith("PRAGMA")]
+    pool.close()
+
+
+def test_connection_returned_and_rolled_back_on_exception(news):
+    pool = db.get_pool()
+    idle_before = pool._idle.qsize()
+    url = news.row("pool/rollback")["url"]
+
+    with pytest.raises(RuntimeError):
+        with db.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO news_items (url, title) VALUES (?, 'x')", (url,))
+            raise RuntimeError("handler failed")
+
+    assert pool._idle.qsize() == max(idle_before, 1)
+    with db.get_connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT 1 FROM news_items WHERE url = ?", (url,)).fetchone() is None
+        # The write lock was released with the rollback
+        conn.execute("BEGIN IMMEDIATE")
+        conn.rollback()
+
+
+def test_concurrent_checkouts_from_threads(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "threads.db"), size=4)
+    setup = pool.acquire()
+    setup.execute("CREATE TABLE hits (thread INTEGER)")
+    setup.commit()
+    pool.release(setup)
+
+    workers = 12
+    barrier = threading.Barrier(workers)
+    borrowed = []
+    errors = []
+
+    def work(index):
+        try:
+            conn = pool.acquire()
+            borrowed.append(conn)
+            # Every thread holds a connection at the same time, none waits on the pool
+            barrier.wait(timeout=10)
+            conn.execute("INSERT INTO hits VALUES (?)", (index,))
+            conn.commit()
+            pool.release(conn)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len({id(conn) for conn in borrowed}) == workers
+    # Only `size` connections are kept; the extra ones were closed on release
+    assert pool._idle.qsize() == 4
+    check = pool.acquire()
+    assert check.execute("SELECT COUNT(*) FROM hits").fetchone()[0] == workers
+    pool.release(check)
+    pool.close()
+
+
+def test_close_connections_closes_idle_connections():
+    with db.get_connection() as conn:
+        conn.execute("SELECT 1")
+    pool = db.get_pool()
+
+    db.close_connections()
+
+    assert pool._idle.empty()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    # A new pool is opened on the next use, and closing twice is harmless
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+    assert db.get_pool() is not pool
+    db.close_connections()
+    db.close_connections()
@@ -0,0 +1,81 @@
+from app import db
+
+db.init_db()
+
+
+def make_rows(news, source_id, count, impact, lang):
+    return news.rows(f"daily-stats/{source_id}/{impact}/{lang}", count,
+                     source_id=source_id, impact=impact, summary_lang=lang)
+
+
+def scanned_source_stats(source_id):
+    """The aggregate the admin commands used to compute from news_items."""
+    with db.get_connection() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*), SUM(impact >= 4), SUM(likes), SUM(dislikes) FROM news_items WHERE source_id = ?",
+            (source_id,)
+        ).fetchone()
+    return tuple(row)
+
+
+def rollup_source_stats(source_id):
+    with db.get_connection() as conn:
+        row = conn.execute(
+            "SELECT SUM(news_count), SUM(breaking_count), SUM(likes), SUM(dislikes) "
+            "FROM source_daily_stats WHERE source_id = ?",
+            (source_id,)
+        ).fetchone()
+    return tuple(row)
+
+
+def test_rollups_follow_inserts_and_reactions(news):
+    stored = db.add_news_items(make_rows(news, "stats_a", 5, 2, "ru") + make_rows(news, "stats_a", 3, 5, "en"))
+    db.add_news_items(make_rows(news, "stats_a", 5, 2, "ru"))  # duplicates are not counted twice
+    ids = [item["id"] for item in stored]
+
+    for user_id in range(4):
+        db.add_reaction(ids[0], 1, "like", user_id, "u")
+    db.add_reaction(ids[1], 2, "dislike", 10, "u")
+    db.add_reaction(ids[0], 1, "dislike", 0, "u")  # switch
+    db.add_reaction(ids[0], 1, "like", 1, "u")     # toggle off
+
+    assert scanned_source_stats("stats_a") == (8, 3, 2, 2)
+    assert rollup_source_stats("stats_a") == (8, 3, 2, 2)
+    assert ("stats_a", 8, 2, 2) in db.get_source_reaction_stats(30)
+    assert ("stats_a", 8) in db.get_news_stats(7)["sources"]
+    info = db.get_source_info("stats_a")
+    assert (info["total_news"], info["likes"], info["dislikes"]) == (8, 2, 2)
+
+    total, langs = db.get_language_stats(7)
+    assert total >= 8
+    assert dict(langs)["ru"] >= 5 and dict(langs)["en"] >= 3
+
+
+def test_rebuild_matches_incremental_rollups(news):
+    db.add_news_items(make_rows(news, "stats_b", 4, 4, "ru"))
+    with db.get_connection() as conn:
+        before = conn.execute("SELECT * FROM source_daily_stats ORDER BY day, source_id").fetchall()
+        langs_before = conn.execute("SELECT * FROM language_daily_stats ORDER BY day, lang").fetchall()
+
+    db.rebuild_daily_stats()
+
+    with db.get_connection() as conn:
+        after = conn.execute("SELECT * FROM source_daily_stats ORDER BY day, source_id").fetchall()
+        langs_after = conn.execute("SELECT * FROM language_daily_stats ORDER BY day, lang").fetchall()
+    assert [tuple(r) for r in after] == [tuple(r) for r in before]
+    assert [tuple(r) for r in langs_after] == [tuple(r) for r in langs_before]
+
+
+def test_periods_are_whole_days(news):
+    stored = db.add_news_items(make_rows(news, "stats_c", 2, 1, "en"))
+    with db.get_connection() as conn:
+        conn.execute(
+            "UPDATE news_items SET processed_at = datetime('now', '-10 days') WHERE id = ?", (stored[0]["id"],)
+        )
+        conn.commit()
+    db.rebuild_daily_stats()
+
+    recent = dict((sid, n) for sid, n, _, _ in db.get_source_reaction_stats(7))
+    month = dict((sid, n) for sid, n, _, _ in db.get_source_reaction_stats(30))
+    assert recent["stats_c"] == 1
+    assert month["stats_c"] == 2
@@ -46,7 +46,7 @@ async def test_fetcher():
 
         # Print first news item
         if news:
-            print(f"First news title: {news[0].get('title')}")
+            print(f"First news title: {news[0].title}")
 
         return True
     except Exception as e:
@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+from aiohttp import web
+
+from app import db
+from app.fetchers.http import FetcherHTTP
+from app.fetchers.json_feed import JSONFeedFetcher
+from app.fetchers.rss import RSSFetcher
+from app.parsing import parse_pool
+
+db.init_db()
+parse_pool.workers = 0
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "feeds")
+
+
+def sample(name):
+    with open(os.path.join(SAMPLES_DIR, name), "rb") as f:
+        return f.read()
+
+
+async def serve_feeds(scenario):
+    """Serve an RSS and a JSON feed; returns scenario's result and the client ports seen per request."""
+    ports = []
+
+    def handler(body, content_type):
+        async def handle(request):
+            ports.append(request.transport.get_extra_info("peername")[1])
+            return web.Response(body=body, content_type=content_type)
+        return handle
+
+    app = web.Application()
+    app.router.add_get("/rss", handler(sample("arxiv_rss.xml"), "application/rss+xml"))
+    app.router.add_get("/json", handler(sample("json_feed.json"), "application/json"))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await scenario(f"http://127.0.0.1:{port}"), ports
+    finally:
+        await runner.cleanup()
+
+
+def test_fetchers_share_one_session_and_connection():
+    http = FetcherHTTP()
+
+    async def scenario(base):
+        sessions = await asyncio.gather(*(http.get_session() for _ in range(5)))
+        rss = RSSFetcher("http_shared_rss", f"{base}/rss", "en", http=http)
+        feed = JSONFeedFetcher("http_shared_json", f"{base}/json", "en", http=http)
+        results = [await rss.fetch(), await feed.fetch()]
+        session = await http.get_session()
+        await http.close()
+        return sessions, session, results
+
+    (sessions, session, (rss_items, json_items)), ports = asyncio.run(serve_feeds(scenario))
+
+    # Concurrent first use opens a single session, which both fetchers then use
+    assert all(s is session for s in sessions)
+    assert (len(rss_items), len(json_items)) == (4, 3)
+    # Both requests went over the same kept-alive connection
+    assert len(ports) == 2 and ports[0] == ports[1]
+
+
+def test_close_is_idempotent_and_session_reopens():
+    http = FetcherHTTP()
+
+    async def scenario():
+        await http.close()  # never opened
+        first = await http.get_session()
+        await http.close()
+        await http.close()
+        second = await http.get_session()
+        await http.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.closed and second.closed
+    assert first is not second
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import EditMessageReplyMarkup
+
+from app import async_db
+from app import db
+from app.keyboard_updater import KeyboardUpdater
+
+db.init_db()
+
+
+class FakeBot:
+    def __init__(self, flood_once=False):
+        self.edits = []
+        self.flood_once = flood_once
+
+    async def edit_message_reply_markup(self, chat_id, message_id, reply_markup):
+        if self.flood_once:
+            self.flood_once = False
+            raise TelegramRetryAfter(EditMessageReplyMarkup(chat_id=chat_id, message_id=message_id),
+                                     "Flood control exceeded", 1)
+        buttons = reply_markup.inline_keyboard[0]
+        self.edits.append((message_id, buttons[0].text, buttons[1].text))
+
+
+def test_burst_of_clicks_is_coalesced_into_few_edits(news):
+    news_id = news.store_post("keyboard/burst")
+    bot = FakeBot()
+
+    async def run():
+        updater = KeyboardUpdater(window=0.2)
+        start = time.monotonic()
+        for user_id in range(200):
+            await async_db.add_reaction(news_id, 77, "like", user_id, f"user{user_id}")
+            updater.schedule(bot, -100, 77, news_id)
+            await asyncio.sleep(0.002)
+        clicking = time.monotonic() - start
+        await asyncio.sleep(0.5)
+        await updater.close()
+        return updater, clicking
+
+    updater, clicking = asyncio.run(run())
+    # A leading edit plus at most one trailing edit per window
+    assert 1 <= len(bot.edits) <= clicking / 0.2 + 2
+    assert updater.coalesced >= 190
+    assert bot.edits[-1] == (77, "👍 200", "👎 0")
+
+
+def test_flood_control_delays_edit_and_keeps_latest_counts(news):
+    news_id = news.store_post("keyboard/flood")
+    bot = FakeBot(flood_once=True)
+
+    async def run():
+        updater = KeyboardUpdater(window=0.05)
+        db.add_reaction(news_id, 78, "dislike", 1, "a")
+        updater.schedule(bot, -100, 78, news_id)
+        await asyncio.sleep(0.01)
+        db.add_reaction(news_id, 78, "dislike", 2, "b")
+        updater.schedule(bot, -100, 78, news_id)
+        await asyncio.sleep(1.3)
+        await updater.close()
+
+    asyncio.run(run())
+    assert bot.edits == [(78, "👍 0", "👎 2")]
+
+
+def test_unchanged_counts_are_not_reedited(news):
+    news_id = news.store_post("keyboard/unchanged")
+    bot = FakeBot()
+
+    async def run():
+        updater = KeyboardUpdater(window=0.05)
+        db.add_reaction(news_id, 79, "like", 1, "a")
+        updater.schedule(bot, -100, 79, news_id)
+        await asyncio.sleep(0.1)
+        # like toggled off and on again before the next edit
+        db.add_reaction(news_id, 79, "like", 1, "a")
+        db.add_reaction(news_id, 79, "like", 1, "a")
+        updater.schedule(bot, -100, 79, news_id)
+        await asyncio.sleep(0.1)
+        await updater.close()
+
+    asyncio.run(run())
+    assert bot.edits == [(79, "👍 1", "👎 0")]
@@ -0,0 +1,93 @@
+import random
+
+from app.lang import detect_by_script, detect_language
+
+# Titles in the style of the configured sources, labeled by hand
+LABELED_TITLES = [
+    ("OpenAI releases GPT-5 with improved reasoning and longer context", "en"),
+    ("Anthropic raises $4B to expand Claude across enterprise customers", "en"),
+    ("Google DeepMind unveils Gemini 2.5 with native tool use", "en"),
+    ("Meta open-sources Llama 4 Scout and Maverick models", "en"),
+    ("How we cut our LLM inference bill by 60% with speculative decoding", "en"),
+    ("Show HN: A tiny vector database written in Rust", "en"),
+    ("Ask HN: What are you using for local LLM inference in 2025?", "en"),
+    ("Nvidia reports record data center revenue as AI demand surges", "en"),
+    ("The EU AI Act: what changes for foundation model providers", "en"),
+    ("Microsoft integrates Copilot deeper into Windows and Office", "en"),
+    ("Scaling Laws for Mixture-of-Experts Language Models", "en"),
+    ("Diffusion Transformers for High-Resolution Image Synthesis", "en"),
+    ("A Survey on Retrieval-Augmented Generation for Large Language Models", "en"),
+    ("Efficient Fine-Tuning of LLMs with Low-Rank Adapters on Consumer GPUs", "en"),
+    ("Robotics startup Figure demos humanoid robot folding laundry", "en"),
+    ("Why vector search alone is not enough for RAG", "en"),
+    ("Mistral launches a coding model that runs on a laptop", "en"),
+    ("Apple quietly acquires a computer vision startup", "en"),
+    ("Building an AI agent with tool calling in 50 lines of Python", "en"),
+    ("Stable Diffusion 3.5 is now available under a community license", "en"),
+    ("xAI opens Grok API to developers", "en"),
+    ("Hugging Face launches open-source robotics library LeRobot", "en"),
+    ("New benchmark shows LLMs still struggle with multi-step planning", "en"),
+    ("AI chip startup Groq valued at $2.8 billion", "en"),
+    ("Perplexity introduces a shopping assistant for Pro users", "en"),
+    ("TinyML: running neural networks on microcontrollers", "en"),
+    ("DeepSeek-R1: Incentivizing Reasoning Capability in LLMs via RL", "en"),
+    ("Inside the race to build AI data centers in the desert", "en"),
+    ("Pandas 3.0 brings copy-on-write by default", "en"),
+    ("Top 10 AI tools for marketers this week", "en"),
+    ("OpenAI представила GPT-5 с улучшенными рассуждениями", "ru"),
+    ("Яндекс выпустил YandexGPT 5 Pro для бизнеса", "ru"),
+    ("Сбер открыл доступ к GigaChat Max через API", "ru"),
+    ("Как мы ускорили инференс LLM в три раза с помощью vLLM", "ru"),
+    ("Нейросеть Kandinsky 4.0 научилась генерировать видео", "ru"),
+    ("Разбираем архитектуру трансформеров на пальцах", "ru"),
+    ("Google DeepMind показала модель для управления роботами", "ru"),
+    ("Anthropic привлекла $4 млрд инвестиций", "ru"),
+    ("Обзор open-source моделей для распознавания речи", "ru"),
+    ("ИИ-ассистенты в разработке: опыт нашей команды", "ru"),
+    ("Пишем RAG-систему на Python и PostgreSQL с pgvector", "ru"),
+    ("Nvidia представила новые GPU Blackwell Ultra", "ru"),
+    ("Microsoft встроит Copilot в Windows 11", "ru"),
+    ("Почему LLM галлюцинируют и что с этим делать", "ru"),
+    ("Как обучить свою модель на датасете из Hugging Face", "ru"),
+    ("Meta выпустила Llama 4 с открытыми весами", "ru"),
+    ("Тренды машинного обучения 2025 года", "ru"),
+    ("Стартап из Москвы привлёк инвестиции на ИИ-поиск", "ru"),
+    ("Fine-tuning Mistral 7B на одной видеокарте: пошаговое руководство", "ru"),
+    ("Apple запустила Apple Intelligence в Европе", "ru"),
+    ("Как устроен MCP и зачем он нужен AI-агентам", "ru"),
+    ("Искусственный интеллект помог открыть новый антибиотик", "ru"),
+    ("Запускаем Stable Diffusion XL локально на Mac M3", "ru"),
+    ("Что нового в PyTorch 2.6", "ru"),
+    ("OpenAI o3-mini теперь доступна бесплатно в ChatGPT", "ru"),
+    ("Российские компании внедряют генеративный ИИ", "ru"),
+    ("Китайская DeepSeek обошла ChatGPT в App Store", "ru"),
+    ("LangChain против LlamaIndex: что выбрать для RAG", "ru"),
+    ("Гайд по промпт-инжинирингу для Claude 3.7 Sonnet", "ru"),
+    ("Исследователи MIT создали робота-хирурга", "ru"),
+]
+
+
+def test_accuracy_on_labeled_titles():
+    correct = sum(detect_language(title) == label for title, label in LABELED_TITLES)
+    assert correct / len(LABELED_TITLES) >= 0.95
+
+
+def test_fast_path_decides_most_titles():
+    decided = sum(detect_by_script(title) is not None for title, _ in LABELED_TITLES)
+    assert decided / len(LABELED_TITLES) >= 0.8
+
+
+def test_deterministic():
+    titles = [title for title, _ in LABELED_TITLES]
+    first = [detect_language(title) for title in titles]
+    detect_language.cache_clear()
+    shuffled = titles[:]
+    random.Random(7).shuffle(shuffled)
+    second = dict((title, detect_language(title)) for title in shuffled)
+    assert first == [second[title] for title in titles]
+
+
+def test_short_and_ambiguous_text():
+    assert detect_language("") == "unknown"
+    assert detect_language("GPT-5") == "unknown"
+    assert detect_by_script("Штучний інтелект змінює світ") is None
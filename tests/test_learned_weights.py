@@ -0,0 +1,56 @@
+from app import db
+from app.learned_weights import decayed_counts, learn_multipliers, update_learned_weights
+from app.ranker import SourceWeights
+
+db.init_db()
+
+
+def add_news_with_reactions(news, source_id, likes, dislikes):
+    db.add_source(source_id, source_id, weight=2)
+    [news_id] = news.store(f"learned/{source_id}", source_id=source_id, impact=2, summary_lang="en")
+    for user_id in range(likes):
+        db.add_reaction(news_id, 1, "like", user_id, f"u{user_id}")
+    for user_id in range(likes, likes + dislikes):
+        db.add_reaction(news_id, 1, "dislike", user_id, f"u{user_id}")
+
+
+def test_old_reactions_fade():
+    counts = decayed_counts([("a", 0, 4, 2), ("a", 7, 4, 0), ("b", 14, 8, 8)], half_life=7)
+    assert counts["a"] == (6.0, 2.0)
+    assert counts["b"] == (2.0, 2.0)
+
+
+def test_multipliers_are_smoothed_and_capped():
+    counts = {"loved": (200.0, 0.0), "hated": (0.0, 200.0), "new": (1.0, 0.0), "average": (50.0, 50.0)}
+    multipliers = learn_multipliers(counts, prior_strength=10, low=0.8, high=1.5)
+
+    assert multipliers["loved"] == 1.5
+    assert multipliers["hated"] == 0.8
+    # One like barely moves a source away from the overall rate
+    assert 1.0 < multipliers["new"] < 1.1
+    assert 0.9 < multipliers["average"] < 1.1
+    assert learn_multipliers({}) == {}
+
+
+def test_learned_weights_feed_the_ranker_cache(news):
+    add_news_with_reactions(news, "learned_liked", likes=30, dislikes=0)
+    add_news_with_reactions(news, "learned_disliked", likes=0, dislikes=30)
+    db.add_source("learned_quiet", "learned_quiet", weight=2)
+    weights = SourceWeights(learned=True)
+    configured = SourceWeights(learned=False)
+    weights.refresh()
+
+    learned = update_learned_weights()
+
+    assert learned["learned_liked"] > 2 > learned["learned_disliked"] > 0
+    assert "learned_quiet" not in learned
+    # The cache keeps serving the old snapshot until it is refreshed
+    assert weights.get("learned_liked") == 2.0
+    weights.refresh()
+    assert weights.get("learned_liked") == learned["learned_liked"]
+    assert weights.get("learned_quiet") == 2.0
+    assert configured.get("learned_liked") == 2.0
+
+    info = db.get_source_info("learned_liked")
+    assert info["weight"] == 2
+    assert info["learned_weight"] == learned["learned_liked"]
@@ -0,0 +1,191 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from app import db
+from app import llm_processor
+from app.llm_cache import llm_cache
+from app.llm_dispatcher import LLMDispatcher
+from app.models import NewsItem
+
+db.init_db()
+
+
+class StubOpenRouter:
+    """Local stand-in for the chat completions endpoint."""
+
+    def __init__(self, drop_ids=(), mangle_ids=(), breaking_ids=(), irrelevant_titles=(),
+                 rate_limited=False, garbled=False):
+        self.drop_ids = set(drop_ids)
+        self.mangle_ids = set(mangle_ids)
+        self.breaking_ids = set(breaking_ids)
+        self.irrelevant_titles = set(irrelevant_titles)
+        # Every request answered 429, or the combined request answered with non-JSON text
+        self.rate_limited = rate_limited
+        self.garbled = garbled
+        self.requests = []
+
+    def reply(self, payload):
+        return web.json_response({"choices": [{"message": {"content": json.dumps(payload, ensure_ascii=False)}}]})
+
+    async def handle(self, request):
+        data = await request.json()
+        prompt = data["messages"][0]["content"]
+        content = data["messages"][1]["content"]
+        self.requests.append(prompt)
+
+        if self.rate_limited:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        if prompt == llm_processor.BATCH_PROMPT:
+            items = []
+            for entry in json.loads(content):
+                if entry["id"] in self.drop_ids:
+                    continue
+                if entry["title"] in self.irrelevant_titles:
+                    items.append({"id": entry["id"], "relevant": False})
+                    continue
+                result = {
+                    "id": entry["id"],
+                    "relevant": True,
+                    "title": f"batch:{entry['title']}",
+                    "summary": f"summary of {entry['title']}",
+                    "why": "",
+                    "impact": 5 if entry["id"] in self.breaking_ids else 2,
+                }
+                if entry["id"] in self.mangle_ids:
+                    del result["summary"]
+                items.append(result)
+            # Answer out of order to make sure results are mapped by id
+            return self.reply({"items": list(reversed(items))})
+
+        title = content.split("\n", 1)[0].replace("Title: ", "")
+        if prompt == llm_processor.FILTER_PROMPT:
+            answer = "not_relevant" if title in self.irrelevant_titles else "relevant"
+            return web.json_response({"choices": [{"message": {"content": answer}}]})
+        if self.garbled and prompt == llm_processor.PIPELINE_PROMPT:
+            return web.json_response({"choices": [{"message": {"content": "Sorry, here is the summary:"}}]})
+        if prompt == llm_processor.TRANSLATION_PROMPT:
+            return web.json_response({"choices": [{"message": {"content": f"ru:{title}"}}]})
+        if title in self.irrelevant_titles:
+            return self.reply({"relevant": False, "summary": ""})
+        return self.reply({
+            "relevant": True,
+            "title": f"single:{title}",
+            "summary": f"summary of {title}",
+            "why": "",
+            "impact": 4,
+        })
+
+
+async def serve_stub(stub, monkeypatch, call):
+    """Run `call()` with OpenRouter requests going to the stub."""
+    app = web.Application()
+    app.router.add_post("/chat/completions", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    monkeypatch.setattr(llm_processor, "OPENROUTER_URL", f"http://127.0.0.1:{port}/chat/completions")
+    monkeypatch.setattr(llm_processor, "OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setattr(llm_processor, "dispatcher", LLMDispatcher(concurrency=8, requests_per_minute=60000, burst=100))
+    monkeypatch.setattr(llm_cache, "enabled", False)
+    try:
+        return await call()
+    finally:
+        await runner.cleanup()
+
+
+async def run_with_stub(stub, items, monkeypatch, batch_mode=True):
+    return await serve_stub(stub, monkeypatch, lambda: llm_processor.process_news_batch(items, batch_mode=batch_mode))
+
+
+def make_items(count):
+    return [NewsItem(f"https://example.com/news/{i}", f"News {i}", "test", "en", summary=f"Body {i}") for i in range(count)]
+
+
+def test_batch_mode_packs_items_into_one_request(monkeypatch):
+    stub = StubOpenRouter()
+    results = asyncio.run(run_with_stub(stub, make_items(6), monkeypatch))
+
+    assert len(stub.requests) == 1
+    assert sorted(r.title for r in results) == [f"batch:News {i}" for i in range(6)]
+    for item in results:
+        assert item.summary == f"summary of {item.title.removeprefix('batch:')}"
+        assert item.impact == 2
+
+
+def test_batch_mode_retries_dropped_mangled_and_breaking_items(monkeypatch):
+    stub = StubOpenRouter(drop_ids={1}, mangle_ids={3}, breaking_ids={4})
+    results = asyncio.run(run_with_stub(stub, make_items(6), monkeypatch))
+
+    # One batch request plus one individual request per recovered item
+    assert stub.requests.count(llm_processor.BATCH_PROMPT) == 1
+    assert stub.requests.count(llm_processor.PIPELINE_PROMPT) == 3
+    titles = {r.title for r in results}
+    assert titles == {
+        "batch:News 0", "single:News 1", "batch:News 2", "single:News 3", "single:News 4", "batch:News 5"
+    }
+    for item in results:
+        original = item.title.split(":", 1)[1]
+        assert item.summary == f"summary of {original}"
+
+
+def test_batch_mode_skips_irrelevant_items_without_retry(monkeypatch):
+    stub = StubOpenRouter(irrelevant_titles={"News 2"})
+    results = asyncio.run(run_with_stub(stub, make_items(4), monkeypatch))
+
+    assert stub.requests == [llm_processor.BATCH_PROMPT]
+    assert sorted(r.title for r in results) == ["batch:News 0", "batch:News 1", "batch:News 3"]
+
+
+def test_irrelevant_item_is_dropped_after_one_call(monkeypatch):
+    stub = StubOpenRouter(irrelevant_titles={"News 1"})
+    results = asyncio.run(run_with_stub(stub, make_items(2), monkeypatch, batch_mode=False))
+
+    # No fallback calls for an item the model rejected without a summary
+    assert stub.requests == [llm_processor.PIPELINE_PROMPT] * 2
+    assert [r.title for r in results] == ["single:News 0"]
+
+
+def test_rate_limited_items_are_deferred_without_fallback_calls(monkeypatch):
+    items = make_items(2)
+    for batch_mode in (False, True):
+        stub = StubOpenRouter(rate_limited=True)
+        results = asyncio.run(run_with_stub(stub, items, monkeypatch, batch_mode=batch_mode))
+
+        assert results == []
+        assert all(item.deferred for item in items)
+        # Only the retries of the first request: no translate/filter/summary calls after it
+        assert set(stub.requests) == {llm_processor.BATCH_PROMPT if batch_mode else llm_processor.PIPELINE_PROMPT}
+
+
+def test_unparseable_answer_uses_the_step_by_step_fallback(monkeypatch):
+    stub = StubOpenRouter(garbled=True)
+    [item] = make_items(1)
+    [result] = asyncio.run(run_with_stub(stub, [item], monkeypatch, batch_mode=False))
+
+    assert not result.deferred
+    assert stub.requests[0] == llm_processor.PIPELINE_PROMPT
+    assert llm_processor.SUMMARY_PROMPT in stub.requests
+    assert result.summary == "summary of ru:News 0"
+
+
+def test_filter_reads_not_relevant_as_irrelevant(monkeypatch):
+    stub = StubOpenRouter(irrelevant_titles={"News 0"})
+
+    async def check_all():
+        return [await llm_processor.filter_relevant_news(item) for item in make_items(2)]
+
+    assert asyncio.run(serve_stub(stub, monkeypatch, check_all)) == [False, True]
+
+
+def test_pack_batches_respects_token_budget():
+    items = [NewsItem(f"https://example.com/long/{i}", "t", "test", "en", summary="x" * 2000) for i in range(10)]
+    small = llm_processor.pack_batches(items, token_budget=2000, max_items=10)
+    large = llm_processor.pack_batches(items, token_budget=20000, max_items=10)
+
+    assert sum(len(b) for b in small) == 10
+    assert len(small) > len(large) == 1
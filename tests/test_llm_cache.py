@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from app import db
+from app import llm_processor
+from app.llm_cache import LLMCache
+from app.llm_dispatcher import LLMDispatcher
+
+db.init_db()
+
+
+def stored_keys(*keys):
+    with db.get_connection() as conn:
+        placeholders = ",".join("?" * len(keys))
+        rows = conn.execute(f"SELECT cache_key FROM llm_cache WHERE cache_key IN ({placeholders})", keys).fetchall()
+    return {row["cache_key"] for row in rows}
+
+
+def test_key_ignores_whitespace_but_not_prompt_or_mode():
+    key = LLMCache.make_key("model", "prompt", "Title: GPT-5\nRaw  Content:  text ")
+    assert key == LLMCache.make_key("model", "prompt", "Title: GPT-5 Raw Content:\ttext")
+    assert key != LLMCache.make_key("model", "other prompt", "Title: GPT-5 Raw Content: text")
+    assert key != LLMCache.make_key("model", "prompt", "Title: GPT-5 Raw Content: text", json_mode=True)
+    assert key != LLMCache.make_key("other-model", "prompt", "Title: GPT-5 Raw Content: text")
+
+
+def test_hits_misses_and_expiry():
+    async def scenario():
+        cache = LLMCache(enabled=True, ttl=0.2)
+        assert await cache.get("cache-test|ttl") is None
+        await cache.put("cache-test|ttl", "answer")
+        assert await cache.get("cache-test|ttl") == "answer"
+        await asyncio.sleep(0.3)
+        assert await cache.get("cache-test|ttl") is None
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.stats_line().startswith("33% hits")
+
+
+def test_eviction_drops_least_recently_used():
+    keys = [f"cache-test|lru|{i}" for i in range(3)]
+    for key in keys:
+        db.put_llm_cache(key, "answer")
+        time.sleep(0.01)
+    # Reading the oldest entry makes it the most recently used
+    assert db.get_llm_cache(keys[0], 3600) == "answer"
+
+    db.evict_llm_cache(max_entries=2, max_age_seconds=3600)
+    assert stored_keys(*keys) == {keys[0], keys[2]}
+
+
+def test_invalid_json_answers_are_not_cached(monkeypatch):
+    requests = []
+
+    async def handle(request):
+        requests.append(await request.json())
+        return web.json_response({"choices": [{"message": {"content": "Sure! {\"summary\": "}}]})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/chat/completions", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(llm_processor, "OPENROUTER_URL", f"http://127.0.0.1:{port}/chat/completions")
+        monkeypatch.setattr(llm_processor, "OPENROUTER_API_KEY", "test-key")
+        monkeypatch.setattr(llm_processor, "dispatcher", LLMDispatcher(concurrency=2, requests_per_minute=60000,
+                                                                        burst=100))
+        monkeypatch.setattr(llm_processor, "llm_cache", LLMCache(enabled=True))
+        try:
+            for _ in range(2):
+                await llm_processor.call_openrouter("cache test prompt", "invalid json body", json_mode=True)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+    assert len(requests) == 2
+    assert not llm_processor.is_cacheable("Sure! {\"summary\": ", json_mode=True)
+    assert llm_processor.is_cacheable("plain text answer", json_mode=False)
+    assert not llm_processor.is_cacheable("   ", json_mode=False)
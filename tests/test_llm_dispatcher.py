@@ -0,0 +1,117 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from app.llm_dispatcher import LLMDispatcher, parse_retry_after
+from app.ratelimit import TokenBucket
+
+
+def unlimited_dispatcher(concurrency=1):
+    return LLMDispatcher(concurrency=concurrency, requests_per_minute=60000, burst=100)
+
+
+def test_waiters_get_slots_by_priority():
+    async def scenario():
+        dispatcher = unlimited_dispatcher()
+        order = []
+
+        async def request(priority):
+            async with dispatcher.slot(priority):
+                order.append(priority)
+
+        async with dispatcher.slot(0):
+            tasks = [asyncio.create_task(request(priority)) for priority in (5, 1, 3, 1)]
+            await asyncio.sleep(0)
+            assert dispatcher.queue_depth == 4
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+        return order
+
+    # Equal priorities keep their arrival order
+    assert asyncio.run(scenario()) == [1, 1, 3, 5]
+
+
+def test_cancelled_waiter_passes_its_slot_on():
+    async def scenario():
+        dispatcher = unlimited_dispatcher()
+        acquired = []
+
+        async def request(name):
+            async with dispatcher.slot(0):
+                acquired.append(name)
+
+        await dispatcher._acquire(0)
+        first = asyncio.create_task(request("first"))
+        second = asyncio.create_task(request("second"))
+        await asyncio.sleep(0)
+
+        # The slot is handed to `first`, which is cancelled before it gets to run
+        dispatcher._release()
+        first.cancel()
+        # A lost slot would leave `second` waiting forever
+        await asyncio.wait_for(asyncio.gather(first, second, return_exceptions=True), timeout=5)
+        return acquired, dispatcher._available
+
+    acquired, available = asyncio.run(scenario())
+    assert acquired == ["second"]
+    assert available == 1
+
+
+def test_cancelled_queued_waiter_is_skipped():
+    async def scenario():
+        dispatcher = unlimited_dispatcher()
+        acquired = []
+
+        async def request(name):
+            async with dispatcher.slot(0):
+                acquired.append(name)
+
+        async with dispatcher.slot(0):
+            waiting = asyncio.create_task(request("cancelled"))
+            later = asyncio.create_task(request("later"))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.sleep(0)
+        await asyncio.wait_for(asyncio.gather(waiting, later, return_exceptions=True), timeout=5)
+        return acquired, dispatcher._available
+
+    assert asyncio.run(scenario()) == (["later"], 1)
+
+
+def test_pause_holds_every_acquirer():
+    async def scenario():
+        bucket = TokenBucket(rate=1000, capacity=10)
+        bucket.pause(0.2)
+        assert 0.1 < bucket.paused_for <= 0.2
+        start = time.monotonic()
+        await asyncio.gather(bucket.acquire(), bucket.acquire())
+        return time.monotonic() - start
+
+    assert asyncio.run(scenario()) >= 0.2
+
+
+def test_bucket_paces_beyond_the_burst():
+    async def scenario():
+        bucket = TokenBucket(rate=20, capacity=2)
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Two tokens from the burst, two more at 20 per second
+    assert 0.09 <= asyncio.run(scenario()) < 0.5
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-3") == 0.0
+
+    in_30s = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 28 <= parse_retry_after(in_30s) <= 30
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(minutes=5), usegmt=True)
+    assert parse_retry_after(past) == 0.0
+
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
@@ -0,0 +1,80 @@
+import os
+import pickle
+from datetime import datetime, timezone
+
+from app import db
+from app.models import NewsItem, parse_published
+from app.parsing import parse_and_normalize
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "feeds")
+
+RSS = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>Feed</title>
+<item><title>First</title><link>https://Example.com/a/?utm_source=rss</link>
+<pubDate>Mon, 06 Oct 2025 12:30:00 +0200</pubDate><description>Body</description></item>
+</channel></rss>"""
+
+JSON_FEED = b'{"items": [{"id": "1", "url": "https://example.com/b#top", "title": "Second", "date_published": "2025-10-06T10:30:00Z"}]}'
+
+TAAFT = b'[{"name": "Tool", "url": "https://example.com/c/", "description": "d", "published_at": "2025-10-06 10:30:00"}]'
+
+
+def test_parse_published_formats():
+    expected = datetime(2025, 10, 6, 10, 30, tzinfo=timezone.utc)
+    assert parse_published("Mon, 06 Oct 2025 12:30:00 +0200") == expected
+    assert parse_published("2025-10-06T10:30:00Z") == expected
+    assert parse_published("2025-10-06 10:30:00") == expected
+    assert parse_published(datetime(2025, 10, 6, 10, 30)) == expected
+    assert parse_published("") is None
+    assert parse_published("yesterday") is None
+
+
+def test_every_parser_yields_the_same_schema():
+    expected = datetime(2025, 10, 6, 10, 30, tzinfo=timezone.utc)
+    for feed_type, content, url, url_key in (
+        ("rss", RSS, "https://Example.com/a/?utm_source=rss", "https://example.com/a"),
+        ("json_feed", JSON_FEED, "https://example.com/b#top", "https://example.com/b"),
+        ("api", TAAFT, "https://example.com/c/", "https://example.com/c"),
+    ):
+        [item] = parse_and_normalize(feed_type, content, "src", "en")
+        assert isinstance(item, NewsItem)
+        assert (item.url, item.source_id, item.lang, item.published) == (url, "src", "en", expected)
+        assert item.url_key == url_key
+        assert (item.to_row()["url"], item.to_row()["url_key"]) == (url, url_key)
+        assert item.to_row()["source_id"] == "src"
+        assert item.to_row()["published"] == "2025-10-06 10:30:00"
+
+
+def test_feed_samples_parse_completely():
+    # The samples tests/bench_parsing.py times, one per format
+    for name, feed_type, count in (
+        ("arxiv_rss.xml", "rss", 4),
+        ("wordpress_rss.xml", "rss", 3),
+        ("reddit_atom.xml", "rss", 3),
+        ("github_trending.html", "scrap", 3),
+        ("json_feed.json", "json_feed", 3),
+        ("taaft.json", "api", 3),
+    ):
+        with open(os.path.join(SAMPLES_DIR, name), "rb") as f:
+            items = parse_and_normalize(feed_type, f.read(), "sample", "en")
+        assert len(items) == count, name
+        assert all(item.url.startswith("https://") and item.title and item.summary for item in items), name
+        assert all(item.published is not None for item in items), name
+
+
+def test_news_item_is_slotted_and_picklable():
+    item = NewsItem("https://example.com/x", "Title", "src", "ru", published="2025-10-06T10:30:00Z")
+    assert not hasattr(item, "__dict__")
+    copy = pickle.loads(pickle.dumps(item))
+    assert (copy.url, copy.title, copy.source_id, copy.published) == (item.url, item.title, "src", item.published)
+
+
+def test_stored_link_is_the_original_and_variants_are_duplicates():
+    db.init_db()
+    first = NewsItem("https://Example.com/url-key/?utm_source=rss&id=7", "Original link", "url-key-src", "en")
+    variant = NewsItem("https://example.com/url-key?id=7#comments", "Same link again", "url-key-src", "en")
+    [stored] = db.add_news_items([first.to_row()])
+    assert stored["url"] == "https://Example.com/url-key/?utm_source=rss&id=7"
+    assert db.get_existing_url_keys([variant.url_key]) == {"https://example.com/url-key?id=7"}
+    assert db.add_news_items([variant.to_row()]) == []
+    # Rows without a key get one derived from their URL
+    assert db.add_news_items([{"url": "https://example.com/url-key?id=7&fbclid=x", "title": "t", "source_id": "url-key-src"}]) == []
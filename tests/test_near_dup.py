@@ -0,0 +1,27 @@
+from app.models import NewsItem
+from app.near_dup import NearDuplicateIndex
+
+
+def items(*titles, source_id="near_dup"):
+    return [NewsItem(f"https://example.com/near-dup/{i}", title, source_id, "en") for i, title in enumerate(titles)]
+
+
+def test_lookup_does_not_remember_titles():
+    index = NearDuplicateIndex(persist=False)
+    batch = items("OpenAI releases a new reasoning model", "OpenAI releases a new reasoning model!",
+                  "Rust 2.0 announced")
+
+    # Repeats inside one batch are dropped, but nothing is recorded by the lookup
+    assert [item.title for item in index.filter_new(batch)] == [
+        "OpenAI releases a new reasoning model", "Rust 2.0 announced"
+    ]
+    assert len(index) == 0
+    assert len(index.filter_new(batch)) == 2
+
+
+def test_recorded_titles_block_other_sources():
+    index = NearDuplicateIndex(persist=False)
+    index.record([("OpenAI releases a new reasoning model", "first")])
+
+    later = items("OpenAI Releases a New Reasoning Model", "Unrelated news about databases", source_id="second")
+    assert [item.title for item in index.filter_new(later)] == ["Unrelated news about databases"]
@@ -0,0 +1,81 @@
+from app import db
+from app import poll_interval
+from app.poll_interval import PollIntervals
+
+db.init_db()
+
+CONFIG = {"interval": 3, "max_interval": 120}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_quiet_source_stretches_to_max(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(poll_interval.time, "monotonic", clock)
+    intervals = PollIntervals(enabled=True)
+
+    assert intervals.interval("quiet", CONFIG) == 3
+    for _ in range(20):
+        interval = intervals.observe("quiet", CONFIG, 0)
+        clock.now += interval * 60
+    assert intervals.effective("quiet") == 120
+
+
+def test_busy_source_stays_at_floor(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(poll_interval.time, "monotonic", clock)
+    intervals = PollIntervals(enabled=True)
+
+    for _ in range(10):
+        interval = intervals.observe("busy", CONFIG, 5)
+        clock.now += interval * 60
+    assert intervals.effective("busy") == 3
+
+
+def test_interval_follows_publish_rate(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(poll_interval.time, "monotonic", clock)
+    intervals = PollIntervals(enabled=True, target=1)
+
+    # One entry every 30 minutes: each poll collects what was published since the last one
+    published = 0
+    for _ in range(100):
+        total = int((clock.now - 1000.0) / 1800)
+        interval = intervals.observe("half_hourly", CONFIG, total - published)
+        published = total
+        clock.now += interval * 60
+    assert 15 <= intervals.effective("half_hourly") <= 60
+
+
+def test_history_seeds_rate():
+    with db.get_connection() as conn:
+        # Initial backfill, then 24 entries over the following day
+        conn.executemany(
+            "INSERT INTO seen_entries (source_id, entry_key, seen_at) VALUES (?, ?, datetime('now', '-2 days'))",
+            [("seeded", f"backfill-{i}") for i in range(50)]
+        )
+        conn.executemany(
+            "INSERT INTO seen_entries (source_id, entry_key, seen_at) VALUES (?, ?, datetime('now', ?))",
+            [("seeded", f"new-{i}", f"-{i} hours") for i in range(24)]
+        )
+        conn.commit()
+
+    new_entries, minutes = db.get_seen_entry_history(7)["seeded"]
+    assert new_entries == 24
+    assert 2 * 1440 - 70 <= minutes <= 2 * 1440
+
+    intervals = PollIntervals(enabled=True)
+    intervals.load_history()
+    assert 100 <= intervals.interval("seeded", CONFIG) <= 120
+
+
+def test_disabled_uses_config_interval():
+    intervals = PollIntervals(enabled=False)
+    assert intervals.interval("any", CONFIG) == 3
+    assert PollIntervals.jitter(10) == 60
@@ -0,0 +1,124 @@
+import asyncio
+
+from app import db
+from app import publisher as publisher_module
+from app.publisher import Publisher
+
+db.init_db()
+
+
+def sent_states(news_ids):
+    with db.get_connection() as conn:
+        rows = conn.execute(
+            f"SELECT id, sent FROM news_items WHERE id IN ({','.join('?' * len(news_ids))})", news_ids
+        ).fetchall()
+    return {row["id"]: row["sent"] for row in rows}
+
+
+def test_each_item_is_sent_once_under_concurrency(news):
+    news_ids = news.store("publisher/race", 10, impact=5)
+    posted = []
+
+    async def send(news):
+        await asyncio.sleep(0.01)
+        posted.append(news["id"])
+        db.mark_as_sent(news["id"], 1000 + news["id"])
+        return True
+
+    async def scenario():
+        first, second = Publisher(send), Publisher(send)
+        first.submit(news_ids)
+        second.submit(news_ids)
+        first.start()
+        second.start()
+        # An admin /breaking running at the same time claims from the database
+        await first.publish_backlog()
+        while not (first.queue.empty() and second.queue.empty()):
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(scenario())
+
+    # The backlog sweep may also pick up breaking rows stored by other tests
+    assert len(posted) == len(set(posted))
+    assert set(news_ids) <= set(posted)
+    assert set(sent_states(news_ids).values()) == {db.SENT_DONE}
+
+
+def test_failed_send_releases_claim(news):
+    news_ids = news.store("publisher/fail", 3, impact=5)
+
+    async def send(news):
+        return news["id"] != news_ids[1]
+
+    async def scenario():
+        rows = await publisher_module.async_db.claim_news(news_ids)
+        assert set(sent_states(news_ids).values()) == {db.SENT_CLAIMED}
+        return await Publisher(send).publish(rows)
+
+    assert asyncio.run(scenario()) == 2
+    assert sent_states(news_ids)[news_ids[1]] == db.SENT_PENDING
+    # Only the released row can be claimed again, and only once
+    assert [row["id"] for row in db.claim_news(news_ids)] == [news_ids[1]]
+    assert db.claim_news(news_ids) == []
+
+
+def test_backlog_is_swept_while_the_queue_stays_busy(news):
+    [news_id] = news.store("publisher/sweep", 1, impact=5)
+    posted = []
+
+    async def send(news):
+        posted.append(news["id"])
+        db.mark_as_sent(news["id"], 2000 + news["id"])
+        return True
+
+    async def scenario():
+        publisher = Publisher(send, sweep_seconds=0.3)
+        publisher.start()
+        # Let the start-up sweep pass, then put the row back as unsent, as a failed send elsewhere would
+        await asyncio.sleep(0.1)
+        with db.get_connection() as conn:
+            conn.execute("UPDATE news_items SET sent = ? WHERE id = ?", (db.SENT_PENDING, news_id))
+            conn.commit()
+        posted.clear()
+        # IDs keep arriving (already sent ones, claimed by no one), so the queue is never idle
+        for _ in range(20):
+            publisher.submit([0])
+            await asyncio.sleep(0.05)
+        await publisher.stop()
+
+    asyncio.run(scenario())
+    assert news_id in posted
+    assert sent_states([news_id])[news_id] == db.SENT_DONE
+
+
+def test_failed_send_is_retried_with_backoff(news):
+    [news_id] = news.store("publisher/retry", 1, impact=5)
+    attempts = []
+
+    async def send(news):
+        if news["id"] != news_id:
+            db.mark_as_sent(news["id"], 3000 + news["id"])
+            return True
+        attempts.append(asyncio.get_running_loop().time())
+        if len(attempts) < 3:
+            return False
+        db.mark_as_sent(news_id, 3000 + news_id)
+        return True
+
+    async def scenario():
+        publisher = Publisher(send, sweep_seconds=60, retry_seconds=0.1)
+        publisher.start()
+        for _ in range(100):
+            if len(attempts) >= 3:
+                break
+            await asyncio.sleep(0.02)
+        await publisher.stop()
+
+    asyncio.run(scenario())
+    # The start-up sweep, then two retries through the queue long before the next sweep
+    assert len(attempts) == 3
+    assert attempts[2] - attempts[1] > attempts[1] - attempts[0]
+    assert sent_states([news_id])[news_id] == db.SENT_DONE
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+from app import db
+from app import ranker
+from app.models import NewsItem
+from app.ranker import SourceWeights, score_items
+
+db.init_db()
+
+
+def test_batch_scoring_reads_weights_once(monkeypatch):
+    db.add_source("rank_heavy", "rank_heavy", weight=5)
+    weights = SourceWeights()
+    calls = []
+    original = ranker.get_source_weights
+    monkeypatch.setattr(ranker, "get_source_weights", lambda **kwargs: calls.append(1) or original(**kwargs))
+    monkeypatch.setattr(ranker, "source_weights", weights)
+
+    items = [NewsItem(f"https://example.com/rank/{i}", f"t{i}", "rank_heavy" if i % 2 else "rank_unknown", "en",
+                      stars=i) for i in range(1000)]
+    score_items(items)
+    score_items(items)
+
+    assert len(calls) == 1
+    assert [item.score for item in items[:4]] == [1.0, 6.0, 3.0, 8.0]
+
+
+def test_weight_changes_show_after_refresh():
+    weights = SourceWeights()
+    db.add_source("rank_changing", "rank_changing", weight=2)
+    assert weights.get("rank_changing") == 2.0
+
+    # Config weight changes are applied on startup by add_source
+    db.add_source("rank_changing", "rank_changing", weight=7)
+    assert weights.get("rank_changing") == 2.0
+    weights.refresh()
+    assert weights.get("rank_changing") == 7.0
+
+
+def test_unsent_order_reflects_freshness_at_selection_time():
+    now = datetime.now(timezone.utc)
+    rows = [
+        # Higher static score, but two days old: no freshness left
+        {"url": "https://example.com/rank/old", "title": "old", "source_id": "rank", "score": 20, "impact": 2,
+         "published": (now - timedelta(hours=50)).strftime("%Y-%m-%d %H:%M:%S"), "summary": "", "summary_lang": "ru"},
+        # Lower static score, published an hour ago: +47
+        {"url": "https://example.com/rank/fresh", "title": "fresh", "source_id": "rank", "score": 5, "impact": 2,
+         "published": (now - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S"), "summary": "", "summary_lang": "ru"},
+        # Legacy RFC 822 date: falls back to processed_at (now)
+        {"url": "https://example.com/rank/legacy", "title": "legacy", "source_id": "rank", "score": 10, "impact": 2,
+         "published": "Mon, 06 Oct 2025 10:00:00 GMT", "summary": "", "summary_lang": "ru"},
+    ]
+    db.add_news_items(rows)
+
+    order = [row["title"] for row in db.get_unsent_news() if row["source_id"] == "rank"]
+    assert order == ["legacy", "fresh", "old"]
+
+    # Once aged, the static score decides again
+    with db.get_connection() as conn:
+        conn.execute("UPDATE news_items SET published = datetime('now', '-47 hours') WHERE title = 'fresh'")
+        conn.execute("UPDATE news_items SET processed_at = datetime('now', '-3 days') WHERE title = 'legacy'")
+        conn.commit()
+    order = [row["title"] for row in db.get_unsent_news() if row["source_id"] == "rank"]
+    assert order == ["old", "legacy", "fresh"]
@@ -0,0 +1,48 @@
+import asyncio
+
+from app import async_db
+from app import db
+from app.scheduler import build_reaction_keyboard
+
+db.init_db()
+
+
+def aggregated(news_id):
+    counts = {r["reaction_type"]: r["count"] for r in db.get_news_reactions(news_id)}
+    return counts.get("like", 0), counts.get("dislike", 0)
+
+
+def test_toggle_and_switch_keep_counters_in_step(news):
+    news_id = news.store_post("reactions/toggle")
+    assert db.add_reaction(news_id, 1, "like", 1, "a") == (1, 0)
+    assert db.add_reaction(news_id, 1, "like", 2, "b") == (2, 0)
+    assert db.add_reaction(news_id, 1, "dislike", 1, "a") == (1, 1)
+    assert db.add_reaction(news_id, 1, "like", 2, "b") == (0, 1)
+    assert db.get_reaction_counts(news_id) == aggregated(news_id) == (0, 1)
+
+
+def test_thousand_concurrent_clicks_on_hot_post(news):
+    news_id = news.store_post("reactions/hot")
+
+    async def scenario():
+        async def click(user_id, reaction_type):
+            counts = await async_db.add_reaction(news_id, 1, reaction_type, user_id, f"user{user_id}")
+            assert counts is not None
+
+        # 900 users react, then 100 of them change their mind, all in flight at once.
+        # Latency of the same burst: python -m tests.bench_reactions
+        clicks = [click(user_id, "like" if user_id % 3 else "dislike") for user_id in range(900)]
+        clicks += [click(user_id, "dislike") for user_id in range(1, 200, 2)]
+        await asyncio.gather(*clicks)
+
+    asyncio.run(scenario())
+
+    # Second clicks of users whose first reaction was a dislike remove it, the others switch to dislike
+    second = range(1, 200, 2)
+    toggled_off = sum(1 for user_id in second if user_id % 3 == 0)
+    switched = len(second) - toggled_off
+    expected = (600 - switched, 300 - toggled_off + switched)
+    # No lost updates: the counters, the reaction rows and the clicks all agree
+    assert db.get_reaction_counts(news_id) == aggregated(news_id) == expected
+    keyboard = build_reaction_keyboard(news_id, *expected)
+    assert keyboard.inline_keyboard[0][0].text == f"👍 {expected[0]}"
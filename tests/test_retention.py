@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import sqlite3
+import time
+
+from app import db
+from app.retention import Retention
+
+db.init_db()
+
+
+def add_news(news, source_id, count, age_days, summary="text"):
+    ids = news.store(f"retention/{source_id}/{age_days}", count,
+                     source_id=source_id, impact=2, summary=summary, summary_lang="en")
+    for news_id in ids:
+        db.add_reaction(news_id, 1, "like", 1, "u1")
+    if age_days:
+        # Age the rows and their rollups together, as if stored back then
+        with db.get_connection() as conn:
+            placeholders = ",".join("?" * len(ids))
+            conn.execute(
+                f"UPDATE news_items SET processed_at = datetime('now', ?) WHERE id IN ({placeholders})",
+                (f"-{age_days} days", *ids)
+            )
+            conn.execute("DELETE FROM source_daily_stats WHERE source_id = ?", (source_id,))
+            conn.commit()
+        db.rebuild_daily_stats()
+    return ids
+
+
+def rollups(source_id):
+    with db.get_connection() as conn:
+        row = conn.execute(
+            "SELECT SUM(news_count), SUM(likes) FROM source_daily_stats WHERE source_id = ?", (source_id,)
+        ).fetchone()
+    return tuple(row)
+
+
+def count(sql, *params):
+    with db.get_connection() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def test_old_news_removed_in_batches_with_reactions(news):
+    old = add_news(news, "retention_src", 60, age_days=40, summary="x" * 4000)
+    fresh = add_news(news, "retention_src", 3, age_days=0)
+    claimed = add_news(news, "retention_claimed", 1, age_days=40)
+    db.claim_news(claimed)
+    stats_before = rollups("retention_src")
+    with db.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO news_reactions (news_id, message_id, reaction_type, user_id, username) "
+            "VALUES (-1, 1, 'like', 7, 'orphan')"
+        )
+        conn.commit()
+
+    retention = Retention(days=30, batch_ms=5, pause=0)
+    retention.batch_size = 16
+    report = asyncio.run(retention.run())
+
+    assert report["news"] >= 60 and report["reactions"] >= 60
+    assert report["orphan_reactions"] >= 1
+    assert retention.batches > 4
+    assert report["bytes_reclaimed"] > 0
+    placeholders = ",".join("?" * len(old))
+    assert count(f"SELECT COUNT(*) FROM news_items WHERE id IN ({placeholders})", *old) == 0
+    assert count(f"SELECT COUNT(*) FROM news_reactions WHERE news_id IN ({placeholders})", *old) == 0
+    assert count("SELECT COUNT(*) FROM news_reactions WHERE news_id = -1") == 0
+    assert count("SELECT COUNT(*) FROM news_items WHERE id IN (?, ?, ?, ?)", *fresh, *claimed) == 4
+    # Statistics still cover the removed news
+    assert rollups("retention_src") == stats_before
+
+
+def test_reaction_to_removed_news_is_rejected(news):
+    news_id = add_news(news, "retention_gone", 1, age_days=40)[0]
+    db.cleanup_old_news(days=30)
+
+    assert db.add_reaction(news_id, 1, "like", 2, "u2") is None
+    assert count("SELECT COUNT(*) FROM news_reactions WHERE news_id = ?", news_id) == 0
+
+
+def test_expired_bookkeeping_rows_removed():
+    now = time.time()
+    db.add_recent_titles([("retention old title", "retention_src", now - 40 * 86400),
+                          ("retention new title", "retention_src", now)])
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO seen_entries (source_id, entry_key, seen_at) "
+                     "VALUES ('retention_src', 'old', datetime('now', '-200 days'))")
+        conn.execute("INSERT INTO seen_entries (source_id, entry_key) VALUES ('retention_src', 'new')")
+        conn.commit()
+
+    report = asyncio.run(Retention(days=30, seen_days=180, pause=0).run())
+
+    assert report["title_index"] >= 1 and report["seen_entries"] >= 1
+    assert count("SELECT COUNT(*) FROM title_index WHERE title LIKE 'retention%'") == 1
+    assert db.get_seen_entry_keys("retention_src", ["old", "new"]) == {"new"}
+
+
+def test_full_vacuum_runs_in_retention_not_at_startup(tmp_path, monkeypatch, caplog):
+    # A file from before incremental auto-vacuum: tables exist, auto_vacuum is off
+    legacy = tmp_path / "legacy.db"
+    conn = sqlite3.connect(legacy)
+    conn.execute("CREATE TABLE sources (id TEXT PRIMARY KEY, name TEXT, weight INTEGER DEFAULT 1, active BOOLEAN DEFAULT 1)")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db, "DB_PATH", str(legacy))
+
+    caplog.set_level(logging.INFO, logger="app")
+    db.init_db()
+    assert db.get_storage_stats()["auto_vacuum"] == 0
+    assert "VACUUM" not in caplog.text
+
+    report = asyncio.run(Retention(pause=0).run())
+    assert report["full_vacuum"] == 1
+    assert db.get_storage_stats()["auto_vacuum"] == db.AUTO_VACUUM_INCREMENTAL
+    assert "one-time VACUUM" in caplog.text
+    assert asyncio.run(Retention(pause=0).run())["full_vacuum"] == 0
+    db.close_connections()
+
+
+def test_new_database_starts_with_incremental_vacuum(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "fresh.db"))
+    db.init_db()
+    assert db.get_storage_stats()["auto_vacuum"] == db.AUTO_VACUUM_INCREMENTAL
+    db.close_connections()
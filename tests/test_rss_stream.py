@@ -0,0 +1,180 @@
+import asyncio
+import tracemalloc
+
+from aiohttp import web
+
+from app import db
+from app.fetchers.rss import RSSFetcher
+from app.parsing import RSSStreamParser, normalize_items, parse_pool, parse_rss
+
+db.init_db()
+parse_pool.workers = 0
+
+SUMMARY = "<p>We study <b>agents</b> &amp; tools, see <a href=\"https://example.com/{i}\">paper</a>.</p>"
+
+
+def rss_feed(count, entity=""):
+    items = "".join(
+        f"<item><title>Paper {i}: scaling laws{entity}</title>"
+        f"<link>https://arxiv.example.org/abs/{i}</link><guid>oai:arxiv:{i}</guid>"
+        f"<pubDate>Mon, 06 Oct 2025 10:{i % 60:02d}:00 GMT</pubDate>"
+        f"<description><![CDATA[{SUMMARY.format(i=i)}]]></description></item>"
+        for i in range(count)
+    )
+    return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel><title>arXiv</title>"
+            f"<link>https://arxiv.example.org</link>{items}</channel></rss>").encode()
+
+
+def atom_feed(count):
+    entries = "".join(
+        f"<entry><title type=\"html\">Release {i} &lt;b&gt;beta&lt;/b&gt;</title>"
+        f"<link rel=\"alternate\" href=\"https://blog.example.org/{i}\"/>"
+        f"<link rel=\"replies\" href=\"https://blog.example.org/{i}#comments\"/>"
+        f"<id>tag:blog.example.org,2025:{i}</id><published>2025-10-06T10:00:00Z</published>"
+        f"<summary>Notes for release {i}</summary></entry>"
+        for i in range(count)
+    )
+    return ("<?xml version=\"1.0\" encoding=\"utf-8\"?><feed xmlns=\"http://www.w3.org/2005/Atom\">"
+            f"<title>Blog</title>{entries}</feed>").encode()
+
+
+def stream_parse(content, chunk_size=100):
+    parser = RSSStreamParser("arxiv", "en")
+    items = []
+    for i in range(0, len(content), chunk_size):
+        items.extend(parser.feed(content[i:i + chunk_size]))
+    items.extend(parser.close())
+    return items
+
+
+def comparable(items):
+    fields = ("title", "url", "guid", "summary", "published", "source_id")
+    return [tuple(getattr(item, f) for f in fields) for item in normalize_items(items)]
+
+
+def test_stream_parser_matches_feedparser():
+    for content in (rss_feed(40), atom_feed(10)):
+        assert comparable(stream_parse(content)) == comparable(parse_rss(content, "arxiv", "en"))
+
+
+def stream_peak(content):
+    """Peak traced memory while streaming `content` in 64 KiB chunks, discarding entries."""
+    tracemalloc.start()
+    parser = RSSStreamParser("arxiv", "en")
+    count = 0
+    for i in range(0, len(content), 65536):
+        count += len(parser.feed(content[i:i + 65536]))
+    count += len(parser.close())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, peak
+
+
+def test_stream_parser_memory_is_flat():
+    small, large = rss_feed(1000), rss_feed(30000)
+    assert len(large) > 8_000_000
+
+    small_count, small_peak = stream_peak(small)
+    large_count, large_peak = stream_peak(large)
+    assert (small_count, large_count) == (1000, 30000)
+    # 30x the feed, same footprint: one chunk plus one entry
+    assert large_peak < small_peak * 1.5
+    assert large_peak < 1_000_000
+
+
+async def serve(body, scenario):
+    sent = []
+
+    async def handle(request):
+        response = web.StreamResponse(headers={"Content-Type": "application/rss+xml"})
+        await response.prepare(request)
+        try:
+            for i in range(0, len(body), 16384):
+                await response.write(body[i:i + 16384])
+                sent.append(16384)
+            await response.write_eof()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        return response
+
+    app = web.Application()
+    app.router.add_get("/feed", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await scenario(f"http://127.0.0.1:{port}/feed"), sum(sent)
+    finally:
+        await runner.cleanup()
+
+
+def test_streaming_fetch_stops_at_cap_without_reading_the_body():
+    body = rss_feed(30000)
+
+    async def scenario(url):
+        return await RSSFetcher("stream_cap", url, "en", stream=True, max_items=10).fetch()
+
+    items, sent = asyncio.run(serve(body, scenario))
+    assert [item.guid for item in items] == [f"oai:arxiv:{i}" for i in range(10)]
+    # Normalization is left to process_source, after the seen-entry filter
+    assert not any(item.normalized for item in items)
+    # The connection was dropped long before the server got the whole feed out
+    assert sent < len(body) / 2
+
+
+def test_streaming_fetch_skips_seen_entries():
+    body = rss_feed(200)
+    seen = {f"oai:arxiv:{i}" for i in range(5, 15)}
+
+    async def is_seen(item):
+        return item.guid in seen
+
+    async def scenario(url):
+        return await RSSFetcher("stream_seen", url, "en", stream=True, max_items=10, is_seen=is_seen).fetch()
+
+    items, _ = asyncio.run(serve(body, scenario))
+    # A run of seen entries shorter than the streak is skipped, and the cap counts new entries only
+    expected = [f"oai:arxiv:{i}" for i in list(range(5)) + list(range(15, 20))]
+    assert [item.guid for item in items] == expected
+
+
+def test_streaming_fetch_stops_after_seen_streak():
+    body = rss_feed(200)
+
+    async def is_seen(item):
+        return 3 <= int(item.guid.split(":")[-1]) < 100
+
+    async def scenario(url):
+        return await RSSFetcher("stream_streak", url, "en", stream=True, is_seen=is_seen, seen_streak=5).fetch()
+
+    items, _ = asyncio.run(serve(body, scenario))
+    assert [item.guid for item in items] == [f"oai:arxiv:{i}" for i in range(3)]
+
+
+def test_non_streaming_cap_applies_after_the_seen_filter():
+    body = rss_feed(60)
+
+    async def is_seen(item):
+        return int(item.guid.split(":")[-1]) < 40
+
+    async def scenario(url):
+        return await RSSFetcher("plain_cap", url, "en", max_items=5, is_seen=is_seen).fetch()
+
+    items, _ = asyncio.run(serve(body, scenario))
+    assert [item.guid for item in items] == [f"oai:arxiv:{i}" for i in range(40, 45)]
+
+
+def test_malformed_xml_falls_back_to_feedparser():
+    # &nbsp; is not defined in XML: expat rejects it, feedparser copes
+    body = rss_feed(20, entity="&nbsp;")
+
+    async def scenario(url):
+        return await RSSFetcher("stream_fallback", url, "en", stream=True, max_items=5).fetch()
+
+    items, _ = asyncio.run(serve(body, scenario))
+    assert [item.guid for item in items] == [f"oai:arxiv:{i}" for i in range(5)]
+    # One poll, one cache miss: the aborted stream is not counted
+    [stats] = db.get_feed_cache_stats("stream_fallback")
+    assert (stats["hits"], stats["misses"]) == (0, 1)
@@ -23,7 +23,7 @@ from app.ranker import compute_score
 
 # Import required libraries
 import json
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from pytz import timezone
@@ -65,41 +65,22 @@ async def process_fetcher_results(source_id, fetcher):
             logger.info(f"No news items fetched from {source_id}")
             return 0
 
+        # Fetchers return NewsItem records with source_id set and `published` already parsed
         for item in news_items:
-            item['source_id'] = source_id
-
-            if 'published' in item and isinstance(item['published'], str):
-                try:
-                    for fmt in ('%a, %d %b %Y %H:%M:%S %z', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%d %H:%M:%S'):
-                        try:
-                            item['published'] = datetime.strptime(item['published'], fmt)
-                            break
-                        except ValueError:
-                            continue
-
-                    if isinstance(item['published'], str):
-                        item['published'] = datetime.now()
-                except Exception as e:
-                    logger.warning(f"Failed to parse date for {item.get('title', 'unknown')}: {e}")
-                    item['published'] = datetime.now()
-            else:
-                item['published'] = datetime.now()
-
-            item['score'] = compute_score(
-                url=item.get('link', ''),
-                title=item.get('title', ''),
+            item.score = compute_score(
+                url=item.url,
+                title=item.title,
                 source_id=source_id,
-                published=item['published'],
-                stars=item.get('stars', 0),
-                upvotes=item.get('upvotes', 0)
+                published=item.published or datetime.now(dt_timezone.utc),
+                stars=item.stars
             )
 
-        processed = process_news(news_items)
+        processed = await process_news(news_items)
         logger.info(f"Processed {len(processed)} unique items from {source_id}")
 
         breaking_count = 0
         for item in processed:
-            if item.get('impact', 0) >= 4:
+            if item.impact >= 4:
                 breaking_count += 1
 
         if breaking_count > 0:
@@ -0,0 +1,128 @@
+import asyncio
+import sqlite3
+import time
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from app import async_db
+from app import db
+from app.telegram_sender import TelegramSender
+
+db.init_db()
+
+TOKEN = "123456:TEST"
+CHAT_ID = -100123
+
+
+class FakeBotAPI:
+    """Local stand-in for api.telegram.org: sendMessage with scripted failures."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.posted = []
+        self.calls = []
+
+    async def handle(self, request):
+        data = await request.post()
+        self.calls.append((time.monotonic(), data["text"]))
+        if self.failures:
+            status, payload = self.failures.pop(0)
+            return web.json_response(payload, status=status)
+        self.posted.append(data["text"])
+        return web.json_response({"ok": True, "result": {
+            "message_id": len(self.posted), "date": int(time.time()),
+            "chat": {"id": int(data["chat_id"]), "type": "channel"}, "text": data["text"],
+        }})
+
+
+async def with_fake_api(api, scenario):
+    app = web.Application()
+    app.router.add_post(f"/bot{TOKEN}/sendMessage", api.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"))
+    bot = Bot(TOKEN, session=session)
+    try:
+        return await scenario(bot)
+    finally:
+        await session.close()
+        await runner.cleanup()
+
+
+def test_retry_after_and_server_errors_are_retried_once_delivered():
+    api = FakeBotAPI(failures=[
+        (429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+               "parameters": {"retry_after": 1}}),
+        (502, {"ok": False, "error_code": 502, "description": "Bad Gateway"}),
+    ])
+    sender = TelegramSender(global_rate=100, chat_rpm=6000, chat_burst=10)
+
+    async def scenario(bot):
+        return [await sender.send_message(bot, CHAT_ID, f"post {i}", idempotency_key=f"test:retry:{i}")
+                for i in range(3)]
+
+    message_ids = asyncio.run(with_fake_api(api, scenario))
+
+    assert api.posted == ["post 0", "post 1", "post 2"]
+    assert message_ids == [1, 2, 3]
+    assert sender.sent == 3 and sender.retried == 2 and sender.failed == 0
+    # The retry after the 429 waited for retry_after
+    first_call, retry_call = api.calls[0][0], api.calls[1][0]
+    assert retry_call - first_call >= 0.9
+
+
+def test_idempotency_key_prevents_duplicate_posts():
+    api = FakeBotAPI()
+    sender = TelegramSender(global_rate=100, chat_rpm=6000, chat_burst=10)
+
+    async def scenario(bot):
+        first = await sender.send_message(bot, CHAT_ID, "breaking", idempotency_key="test:once")
+        again = await sender.send_message(bot, CHAT_ID, "breaking", idempotency_key="test:once")
+        return first, again
+
+    first, again = asyncio.run(with_fake_api(api, scenario))
+    assert first == again
+    assert api.posted == ["breaking"]
+
+
+def test_failed_key_write_still_reports_the_sent_message(monkeypatch):
+    async def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(async_db, "save_outbound_message", locked)
+    api = FakeBotAPI()
+    sender = TelegramSender(global_rate=100, chat_rpm=6000, chat_burst=10)
+
+    async def scenario(bot):
+        return await sender.send_message(bot, CHAT_ID, "posted anyway", idempotency_key="test:unsaved")
+
+    assert asyncio.run(with_fake_api(api, scenario)) == 1
+    assert api.posted == ["posted anyway"]
+    assert (sender.sent, sender.failed) == (1, 0)
+
+
+def test_per_chat_pacing_and_metrics():
+    api = FakeBotAPI()
+    # 120 per minute = one message every 0.5s after a burst of 2
+    sender = TelegramSender(global_rate=100, chat_rpm=120, chat_burst=2)
+
+    async def scenario(bot):
+        start = time.monotonic()
+        tasks = [asyncio.create_task(sender.send_message(bot, CHAT_ID, f"paced {i}")) for i in range(4)]
+        await asyncio.sleep(0.1)
+        depth = sender.queue_depth
+        await asyncio.gather(*tasks)
+        return time.monotonic() - start, depth
+
+    elapsed, depth = asyncio.run(with_fake_api(api, scenario))
+    assert len(api.posted) == 4
+    assert elapsed >= 0.9
+    assert depth >= 2
+    assert sender.queue_depth == 0
+    assert sender.latency(0.95) >= sender.latency(0.5) > 0